@@ -1,12 +1,12 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
 from django.urls import reverse
-from django.utils.safestring import mark_safe
 from django_summernote.admin import SummernoteModelAdmin
 from django.http import HttpResponseRedirect
 from .models import (
     Category, Subcategory, Adventure, AdventureImage, PricingTier
 )
+from .services import AdventureImageIngestService, ImageVariantService, PricingService
 
 
 @admin.register(Category)
@@ -90,7 +90,7 @@ class AdventureImageInline(admin.TabularInline):
     
     def image_preview(self, obj):
         if obj.image:
-            return mark_safe(f'<img src="{obj.image.url}" width="150" />')
+            return format_html('<img src="{}" width="150" />', ImageVariantService.best_url(obj.image.name, 320))
         return "Sem imagem"
     image_preview.short_description = "Prévia"
     
@@ -209,6 +209,12 @@ class AdventureAdmin(SummernoteModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('category', 'subcategory')
     
+    def get_changelist_instance(self, request):
+        # Resolve os preços da página inteira de uma vez
+        changelist = super().get_changelist_instance(request)
+        PricingService.resolve(changelist.result_list)
+        return changelist
+    
     def has_add_permission(self, request):
         return True
     
@@ -218,25 +224,14 @@ class AdventureAdmin(SummernoteModelAdmin):
         
         # Processa as imagens da galeria após salvar o objeto principal
         if request.FILES.getlist('images'):
-            self.process_uploaded_images(request, obj.id)
+            self.process_uploaded_images(request, obj)
     
-    def process_uploaded_images(self, request, adventure_id):
-        """Processa imagens enviadas sem salvar a aventura"""
-        if 'images' in request.FILES:
-            for image_file in request.FILES.getlist('images'):
-                AdventureImage.objects.create(
-                    adventure_id=adventure_id,
-                    image=image_file
-                )
-            return True
-        return False
-        
-    def save_model(self, request, obj, form, change):
-        """Sobrescreve o método save_model para garantir que as imagens sejam salvas"""
-        super().save_model(request, obj, form, change)
-        # Processa as imagens após salvar o modelo
-        if 'images' in request.FILES:
-            self.process_uploaded_images(request, obj.id)
+    def process_uploaded_images(self, request, adventure):
+        """Valida e grava em paralelo as imagens enviadas junto com o formulário"""
+        images, errors = AdventureImageIngestService.ingest(adventure, request.FILES.getlist('images'))
+        for name, error in errors:
+            self.message_user(request, f"{name}: {error}", level=messages.WARNING)
+        return bool(images)
     
     # Removendo os métodos add_view e change_view personalizados para permitir
     # que o Django processe o formulário normalmente
@@ -272,7 +267,7 @@ class AdventureImageAdmin(admin.ModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" style="max-width: 200px; max-height: 200px;" />',
-                obj.image.url
+                ImageVariantService.best_url(obj.image.name, 320)
             )
         return "Sem imagem"
     image_preview.short_description = "Preview da Imagem"
@@ -5,3 +5,6 @@ class AdventuresConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'adventures'
     verbose_name = 'Aventuras'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
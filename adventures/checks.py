@@ -0,0 +1,18 @@
+from django.core.checks import Tags, Warning, register
+
+from services.checks import cache_is_process_local
+
+
+@register(Tags.caches, deploy=True)
+def check_page_cache_backend(app_configs, **kwargs):
+    """
+    AdventurePageCache invalida as páginas incrementando versões no cache: com um
+    cache local a cada processo, os outros workers continuam servindo a página antiga
+    """
+    if not cache_is_process_local():
+        return []
+    return [Warning(
+        'O cache padrão é local a cada processo: páginas de aventuras alteradas continuam em cache nos outros workers.',
+        hint='Em produção use um cache compartilhado (CACHE_BACKEND e CACHE_LOCATION, ex: memcached).',
+        id='adventures.W001',
+    )]
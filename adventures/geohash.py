@@ -0,0 +1,80 @@
+"""
+Geohash: codifica latitude/longitude em células retangulares identificadas por
+uma string base32. Células com o mesmo prefixo estão contidas na célula do
+prefixo, então uma região vira uma ou mais consultas "começa com" em um índice.
+"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+MAX_PRECISION = 12
+
+
+def encode(lat, lng, precision=9):
+    """
+    Geohash do ponto com `precision` caracteres
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    lat = min(max(float(lat), -90.0), 90.0)
+    lng = normalize_lng(float(lng))
+
+    code = []
+    bits = 0
+    value = 0
+    even = True
+    while len(code) < precision:
+        # Bits alternados: longitude nos pares, latitude nos ímpares
+        interval, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            code.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(code)
+
+
+def cell_size(precision):
+    """
+    (altura, largura) em graus de uma célula com `precision` caracteres
+    """
+    total_bits = precision * 5
+    lat_bits = total_bits // 2
+    lng_bits = total_bits - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def covering_cells(lat_min, lat_max, lng_min, lng_max, precision, max_samples=None):
+    """
+    Células de `precision` caracteres que cobrem a caixa (longitudes podem passar
+    de ±180). None se for preciso amostrar mais de `max_samples` pontos.
+    """
+    height, width = cell_size(precision)
+    lat_min = max(lat_min, -90.0)
+    lat_max = min(lat_max, 90.0)
+    if lng_max - lng_min >= 360:
+        lng_min, lng_max = -180.0, 180.0
+    lat_count = max(int(math.ceil((lat_max - lat_min) / height)), 0) + 1
+    lng_count = max(int(math.ceil((lng_max - lng_min) / width)), 0) + 1
+    if max_samples is not None and lat_count * lng_count > max_samples:
+        return None
+    lats = _steps(lat_min, lat_max, height)
+    lngs = _steps(lng_min, lng_max, width)
+    return {encode(lat, lng, precision) for lat in lats for lng in lngs}
+
+
+def normalize_lng(lng):
+    return (lng + 180.0) % 360.0 - 180.0 if not -180.0 <= lng < 180.0 else lng
+
+
+def _steps(start, end, step):
+    # Um ponto por célula atravessada, incluindo as duas bordas da caixa
+    count = max(int(math.ceil((end - start) / step)), 0)
+    return [start + index * step for index in range(count)] + [end]
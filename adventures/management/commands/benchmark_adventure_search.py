@@ -0,0 +1,119 @@
+import random
+import time
+import uuid
+from datetime import timedelta, time as dt_time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from adventures.models import Adventure, Category
+from adventures.services import AdventureSearchService
+from bookings.models import AdventureEvent
+from bookings.services import EventAvailabilityService
+
+WORDS = (
+    'trilha cachoeira rapel escalada montanha canion serra gaúcha caminhada acampamento '
+    'travessia rio caiaque bote mirante pôr do sol noturna família iniciantes técnica '
+    'vale cânion gruta mata atlântica araucárias lagoa praia ilha costão'
+).split()
+PLACES = ['Cambará do Sul', 'Gramado', 'Canela', 'Urubici', 'Praia Grande', 'Bento Gonçalves', 'Nova Petrópolis']
+
+
+class Command(BaseCommand):
+    help = (
+        'Latência da busca de aventuras (texto, preço, datas e facetas) sobre um catálogo '
+        'sintético, comparada com ADVENTURE_SEARCH_BUDGET_MS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--adventures', type=int, default=10000, help='Aventuras sintéticas')
+        parser.add_argument('--events', type=int, default=500000, help='Eventos sintéticos')
+        parser.add_argument('--repeat', type=int, default=20, help='Execuções de cada consulta')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        rng = random.Random(42)
+        today = timezone.localdate()
+        categories = [Category.objects.create(name=f'Benchmark {tag} {i}') for i in range(8)]
+        difficulties = [value for value, _ in Adventure.DIFFICULTY_CHOICES]
+        try:
+            self.stdout.write(f'Criando {options["adventures"]} aventuras e {options["events"]} eventos...')
+            with transaction.atomic():
+                for start in range(0, options['adventures'], 2000):
+                    Adventure.objects.bulk_create([
+                        Adventure(
+                            title=f'{" ".join(rng.choices(WORDS, k=3)).capitalize()} {tag} {i}',
+                            slug=f'benchmark-{tag}-{i}',
+                            category=rng.choice(categories),
+                            short_description=' '.join(rng.choices(WORDS, k=20)),
+                            description='-',
+                            difficulty=rng.choice(difficulties),
+                            duration_hours=rng.randint(2, 48),
+                            location=rng.choice(PLACES),
+                            meeting_point='-',
+                            base_price=Decimal(rng.randint(50, 900)),
+                            what_includes='-',
+                            what_to_bring='-',
+                            safety_requirements='-',
+                            main_image='adventures/main/benchmark.jpg',
+                        )
+                        for i in range(start, min(start + 2000, options['adventures']))
+                    ])
+                adventure_ids = list(Adventure.objects.filter(
+                    category__in=categories
+                ).values_list('pk', flat=True))
+                for start in range(0, options['events'], 5000):
+                    AdventureEvent.objects.bulk_create([
+                        AdventureEvent(
+                            adventure_id=adventure_ids[i % len(adventure_ids)],
+                            date=today + timedelta(days=i // len(adventure_ids) + rng.randint(0, 3)),
+                            start_time=dt_time(6 + i % 12, 0),
+                            max_participants=20,
+                            current_participants=rng.randint(0, 20),
+                        )
+                        for i in range(start, min(start + 5000, options['events']))
+                    ], ignore_conflicts=True)
+
+            # bulk_create não passa pelo save: índices reconstruídos de uma vez
+            started = time.perf_counter()
+            EventAvailabilityService.rebuild(batch_size=5000)
+            AdventureSearchService.rebuild()
+            self.stdout.write(f'Índices reconstruídos em {time.perf_counter() - started:.1f}s\n')
+
+            catalog = Adventure.objects.for_listing().filter(category__in=categories, is_active=True)
+            queries = [
+                {'q': 'cachoeira'},
+                {'q': 'serra trilha', 'difficulty': 'moderado'},
+                {'min_price': '100', 'max_price': '300', 'sort': 'price'},
+                {'date_from': str(today + timedelta(days=7)), 'date_to': str(today + timedelta(days=21))},
+                {'q': 'rio', 'date_from': str(today + timedelta(days=3)), 'price_range': '1', 'sort': 'date'},
+                {'category': categories[0].slug, 'sort': '-price'},
+            ]
+            budget = getattr(settings, 'ADVENTURE_SEARCH_BUDGET_MS', 150)
+            for params in queries:
+                timings = []
+                for _ in range(options['repeat']):
+                    # Sem cache de facetas: mede a consulta completa
+                    cache.clear()
+                    started = time.perf_counter()
+                    adventures, facets = AdventureSearchService.search(
+                        catalog, AdventureSearchService.parse_filters(params)
+                    )
+                    list(adventures[:12])
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+                style = self.style.SUCCESS if p95 <= budget else self.style.ERROR
+                self.stdout.write(style(
+                    f'{str(params):<80} p95 {p95:>7.1f} ms   {facets["total"]:>6} resultados'
+                ))
+        finally:
+            Adventure.objects.filter(category__in=categories).delete()
+            Category.objects.filter(pk__in=[category.pk for category in categories]).delete()
+            AdventureSearchService.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Benchmark concluído (orçamento {budget} ms)'))
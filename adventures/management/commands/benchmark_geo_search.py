@@ -0,0 +1,97 @@
+import random
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from adventures.models import Adventure, Category
+from adventures.services import GeoSearchService
+
+# Centros de concentração das aventuras (Serra Gaúcha, Chapada Diamantina, Serra do Mar...)
+CLUSTERS = [(-29.17, -51.18), (-12.56, -41.39), (-23.35, -44.84), (-27.28, -49.98), (-15.79, -47.88)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a busca por proximidade (geohash + caixa + haversine) com o cálculo '
+        'de distância em Python sobre todas as aventuras'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--adventures', type=int, default=50000, help='Aventuras com coordenadas')
+        parser.add_argument('--queries', type=int, default=50, help='Buscas por raio')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        rng = random.Random(42)
+        category = Category.objects.create(name=f'Benchmark {tag}')
+        try:
+            self.stdout.write(f'Criando {options["adventures"]} aventuras com coordenadas...')
+            with transaction.atomic():
+                for start in range(0, options['adventures'], 2000):
+                    batch = []
+                    for i in range(start, min(start + 2000, options['adventures'])):
+                        center_lat, center_lng = rng.choice(CLUSTERS)
+                        lat = round(rng.gauss(center_lat, 2.0), 6)
+                        lng = round(rng.gauss(center_lng, 2.0), 6)
+                        batch.append(Adventure(
+                            title=f'Benchmark {tag} {i}',
+                            slug=f'benchmark-{tag}-{i}',
+                            category=category,
+                            short_description='-',
+                            description='-',
+                            difficulty='iniciante',
+                            duration_hours=4,
+                            location='-',
+                            meeting_point='-',
+                            base_price=Decimal('100.00'),
+                            what_includes='-',
+                            what_to_bring='-',
+                            safety_requirements='-',
+                            main_image='adventures/main/benchmark.jpg',
+                            coordinates_lat=Decimal(str(lat)),
+                            coordinates_lng=Decimal(str(lng)),
+                            # bulk_create não passa pelo save
+                            geohash=GeoSearchService.encode_point(lat, lng),
+                        ))
+                    Adventure.objects.bulk_create(batch)
+
+            adventures = Adventure.objects.filter(category=category)
+            for radius_km in (10, 50, 200):
+                points = [
+                    (rng.gauss(center_lat, 2.0), rng.gauss(center_lng, 2.0))
+                    for center_lat, center_lng in (rng.choice(CLUSTERS) for _ in range(options['queries']))
+                ]
+                naive, indexed = [], []
+                for lat, lng in points:
+                    started = time.perf_counter()
+                    expected = self.naive_nearby(adventures, lat, lng, radius_km)
+                    naive.append((time.perf_counter() - started) * 1000)
+
+                    started = time.perf_counter()
+                    found = GeoSearchService.nearby(adventures, lat, lng, radius_km)
+                    indexed.append((time.perf_counter() - started) * 1000)
+                    if [adventure.pk for adventure in found] != expected:
+                        self.stdout.write(self.style.ERROR(f'Resultado divergente em ({lat:.4f}, {lng:.4f})'))
+
+                self.stdout.write(
+                    f'raio {radius_km:>4} km   Python {statistics.median(naive):>8.1f} ms   '
+                    f'geohash {statistics.median(indexed):>7.1f} ms   (medianas)'
+                )
+        finally:
+            Adventure.objects.filter(category=category).delete()
+            category.delete()
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark concluído'))
+
+    def naive_nearby(self, adventures, lat, lng, radius_km):
+        distances = []
+        for pk, candidate_lat, candidate_lng in adventures.values_list('pk', 'coordinates_lat', 'coordinates_lng'):
+            distance = GeoSearchService.haversine(lat, lng, float(candidate_lat), float(candidate_lng))
+            if distance <= radius_km:
+                distances.append((distance, pk))
+        distances.sort()
+        return [pk for _, pk in distances[:20]]
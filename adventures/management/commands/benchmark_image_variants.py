@@ -0,0 +1,55 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from adventures.models import Adventure
+from adventures.services import ImageVariantService
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara os bytes de imagem transferidos por página de listagem: originais '
+        'contra as variantes que o srcset escolhe para cards de ~400px'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=12, help='Cards por página (listagem usa 12)')
+        parser.add_argument('--card-width', type=int, default=400, help='Largura do card em CSS px')
+        parser.add_argument('--dpr', type=float, default=2, help='Densidade de pixels do dispositivo')
+
+    def handle(self, *args, **options):
+        adventures = list(Adventure.objects.for_listing().filter(is_active=True)[:options['page_size']])
+        if not adventures:
+            self.stdout.write(self.style.WARNING('Nenhuma aventura ativa para medir.'))
+            return
+
+        target = options['card_width'] * options['dpr']
+        original_bytes = {'jpg': 0, 'webp': 0}
+        variant_bytes = {'jpg': 0, 'webp': 0}
+        missing = 0
+        for adventure in adventures:
+            name = adventure.cover_image.name
+            if not name or not default_storage.exists(name):
+                missing += 1
+                continue
+            size = default_storage.size(name)
+            manifest = ImageVariantService.manifest(name) or ImageVariantService.generate(name)
+            # O navegador escolhe a menor largura do srcset que cobre o card
+            width = next((w for w in manifest['widths'] if w >= target), manifest['widths'][-1])
+            for image_format in variant_bytes:
+                original_bytes[image_format] += size
+                variant_bytes[image_format] += os.path.getsize(
+                    ImageVariantService.path(name, f'{width}w.{image_format}')
+                )
+
+        measured = len(adventures) - missing
+        self.stdout.write(f'{measured} cards medidos ({missing} sem imagem em disco)')
+        for image_format, label in (('jpg', 'JPEG'), ('webp', 'WebP')):
+            original = original_bytes[image_format]
+            variant = variant_bytes[image_format]
+            saving = (1 - variant / original) * 100 if original else 0
+            self.stdout.write(
+                f'{label:<5} originais {original / 1024:>9.1f} KB   '
+                f'variantes {variant / 1024:>9.1f} KB   economia {saving:>5.1f}%'
+            )
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark concluído'))
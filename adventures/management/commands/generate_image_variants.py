@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from adventures.models import Adventure, AdventureImage
+from adventures.services import ImageVariantService
+
+
+class Command(BaseCommand):
+    help = 'Gera as variantes responsivas (WebP/JPEG) das imagens existentes das aventuras'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regerar mesmo as imagens já processadas')
+        parser.add_argument('--workers', type=int, default=4, help='Imagens processadas em paralelo')
+
+    def handle(self, *args, **options):
+        names = set(Adventure.objects.exclude(main_image='').values_list('main_image', flat=True))
+        names.update(AdventureImage.objects.exclude(image='').values_list('image', flat=True))
+
+        def generate(name):
+            try:
+                ImageVariantService.generate(name, force=options['force'])
+                return True
+            except Exception as e:
+                self.stderr.write(f'Erro em {name}: {e}')
+                return False
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            results = list(executor.map(generate, sorted(names)))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Variantes geradas para {sum(results)} de {len(results)} imagens.'
+        ))
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from adventures.services import AdventureSearchService
+
+
+class Command(BaseCommand):
+    help = (
+        'Atualiza o preço materializado das aventuras nas fronteiras das faixas de preço '
+        '(executar periodicamente) e, com --rebuild, reconstrói o índice de busca'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Reconstrói também o índice textual')
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Fica em execução contínua, atualizando a cada intervalo'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=300,
+            help='Segundos entre as atualizações (com --loop)'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            if not AdventureSearchService.is_available():
+                self.stdout.write(self.style.WARNING('Índice de busca indisponível neste banco; a busca usa LIKE.'))
+            total = AdventureSearchService.rebuild()
+            self.stdout.write(f'{total} aventuras indexadas.')
+
+        try:
+            while True:
+                updated = AdventureSearchService.refresh_prices()
+                if updated:
+                    self.stdout.write(f'{updated} preços atualizados.')
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS('✅ Busca de aventuras atualizada.'))
@@ -0,0 +1,100 @@
+# Generated by Django 3.2.18 on 2026-10-17 13:04
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+POSTGRES_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    DO $$ BEGIN
+        CREATE TEXT SEARCH CONFIGURATION pt_unaccent (COPY = portuguese);
+        ALTER TEXT SEARCH CONFIGURATION pt_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+    EXCEPTION WHEN unique_violation THEN NULL;
+    END $$
+    """,
+    """
+    CREATE TABLE adventures_adventure_search (
+        adventure_id bigint PRIMARY KEY REFERENCES adventures_adventure (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX adventures_adventure_search_document ON adventures_adventure_search USING GIN (document)",
+    """
+    INSERT INTO adventures_adventure_search (adventure_id, document)
+    SELECT id,
+        setweight(to_tsvector('pt_unaccent', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('pt_unaccent', coalesce(location, '')), 'B') ||
+        setweight(to_tsvector('pt_unaccent', coalesce(short_description, '')), 'C')
+    FROM adventures_adventure
+    """,
+]
+
+SQLITE_SQL = [
+    # remove_diacritics 2: "gaucha" encontra "gaúcha" (e vice-versa)
+    """
+    CREATE VIRTUAL TABLE adventures_adventure_search USING fts5(
+        title, location, short_description,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO adventures_adventure_search (rowid, title, location, short_description)
+    SELECT id, title, location, short_description FROM adventures_adventure
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_SQL
+    elif vendor == 'sqlite':
+        statements = SQLITE_SQL
+    else:
+        # Sem índice a busca usa LIKE (AdventureSearchService)
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute("DROP TABLE IF EXISTS adventures_adventure_search")
+
+
+def fill_listed_price(apps, schema_editor):
+    # Preço da faixa vigente ou preço base
+    Adventure = apps.get_model('adventures', 'Adventure')
+    PricingTier = apps.get_model('adventures', 'PricingTier')
+    now = timezone.now()
+    current_tier = PricingTier.objects.filter(
+        adventure=OuterRef('pk'),
+        start_date__lte=now,
+        end_date__gte=now,
+        is_active=True
+    ).order_by('start_date').values('price')[:1]
+    Adventure.objects.update(listed_price=Coalesce(Subquery(current_tier), F('base_price')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adventure',
+            name='listed_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Preço Atual'),
+        ),
+        migrations.AddIndex(
+            model_name='adventure',
+            index=models.Index(fields=['is_featured', 'created_at'], name='adventure_listing_order_idx'),
+        ),
+        migrations.RunPython(fill_listed_price, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.2.18 on 2026-10-17 13:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+from adventures import geohash
+
+
+def fill_geohash(apps, schema_editor):
+    # Aventuras já cadastradas com coordenadas
+    Adventure = apps.get_model('adventures', 'Adventure')
+    precision = getattr(settings, 'GEOHASH_PRECISION', 9)
+    adventures = list(Adventure.objects.filter(
+        coordinates_lat__isnull=False,
+        coordinates_lng__isnull=False
+    ).only('pk', 'coordinates_lat', 'coordinates_lng'))
+    for adventure in adventures:
+        adventure.geohash = geohash.encode(adventure.coordinates_lat, adventure.coordinates_lng, precision)
+    Adventure.objects.bulk_update(adventures, ['geohash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0002_adventure_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adventure',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, verbose_name='Geohash'),
+        ),
+        migrations.AddIndex(
+            model_name='adventure',
+            index=models.Index(fields=['coordinates_lat', 'coordinates_lng'], name='adventure_coordinates_idx'),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
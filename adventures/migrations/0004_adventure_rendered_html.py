@@ -0,0 +1,18 @@
+# Generated by Django 3.2.18 on 2026-10-17 13:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0003_adventure_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adventure',
+            name='rendered_html',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='HTML Compilado'),
+        ),
+    ]
@@ -1,11 +1,15 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.text import slugify
 from django.urls import reverse
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from django.apps import apps
+from django.db.models import F, OuterRef, Prefetch, Subquery
 from datetime import timedelta
 from ckeditor.fields import RichTextField
 
+from services import richtext
+
 
 class Category(models.Model):
     """
@@ -80,10 +84,56 @@ class Subcategory(models.Model):
         return f"{self.category.name} - {self.name}"
 
 
+class AdventureQuerySet(models.QuerySet):
+    """
+    Consultas otimizadas para aventuras
+    """
+    
+    def for_listing(self):
+        """
+        Aventuras prontas para cards de listagem: próximo evento, vagas,
+        preço atual e imagem de capa com número fixo de consultas
+        """
+        AdventureEvent = apps.get_model('bookings', 'AdventureEvent')
+        now = timezone.now()
+        
+        upcoming_events = AdventureEvent.objects.filter(
+            adventure=OuterRef('pk'),
+            date__gte=now.date(),
+            is_active=True,
+            status='scheduled'
+        ).order_by('date', 'start_time')
+        current_tier = PricingTier.objects.filter(
+            adventure=OuterRef('pk'),
+            start_date__lte=now,
+            end_date__gte=now,
+            is_active=True
+        ).order_by('start_date')
+        
+        # O HTML compilado dos textos só é lido na página de detalhes
+        return self.select_related('category', 'subcategory').defer('rendered_html').annotate(
+            next_event_date=Subquery(upcoming_events.values('date')[:1]),
+            next_event_spots=Subquery(
+                upcoming_events.annotate(
+                    spots=F('max_participants') - F('current_participants')
+                ).values('spots')[:1]
+            ),
+            # Lido por Adventure.current_price sem nova consulta
+            _tier_price=Subquery(current_tier.values('price')[:1]),
+        ).prefetch_related(
+            Prefetch(
+                'images',
+                queryset=AdventureImage.objects.filter(is_cover=True),
+                to_attr='cover_images'
+            )
+        )
+
+
 class Adventure(models.Model):
     """
     Modelo principal para as aventuras/programações
     """
+    RICH_TEXT_FIELDS = ('description', 'what_includes', 'what_to_bring', 'safety_requirements', 'additional_info')
     DIFFICULTY_CHOICES = [
         ('iniciante', 'Iniciante'),
         ('moderado', 'Moderado'),
@@ -154,6 +204,14 @@ class Adventure(models.Model):
         blank=True,
         verbose_name="Longitude"
     )
+    # Célula geohash das coordenadas (GeoSearchService), usada na busca por proximidade
+    geohash = models.CharField(
+        max_length=12,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name="Geohash"
+    )
     
     # Preços (sistema dinâmico)
     base_price = models.DecimalField(
@@ -161,6 +219,17 @@ class Adventure(models.Model):
         decimal_places=2, 
         verbose_name="Preço Base"
     )
+    # Preço atual (faixa vigente ou preço base) materializado para busca e
+    # ordenação; mantido pelo AdventureSearchService
+    listed_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name="Preço Atual"
+    )
     
     # Conteúdo detalhado
     what_includes = RichTextField(
@@ -179,6 +248,13 @@ class Adventure(models.Model):
         blank=True,
         verbose_name="Informações Adicionais"
     )
+    # HTML sanitizado dos campos acima, compilado no save (services.richtext)
+    rendered_html = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="HTML Compilado"
+    )
     
     # Configurações de exibição
     is_featured = models.BooleanField(
@@ -213,10 +289,18 @@ class Adventure(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = AdventureQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Aventura"
         verbose_name_plural = "Aventuras"
         ordering = ['-is_featured', '-created_at']
+        indexes = [
+            # Ordem padrão da listagem/busca: lida pelo índice, sem ordenar o catálogo
+            models.Index(fields=['is_featured', 'created_at'], name='adventure_listing_order_idx'),
+            # Caixa delimitadora da busca por proximidade
+            models.Index(fields=['coordinates_lat', 'coordinates_lng'], name='adventure_coordinates_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -225,27 +309,47 @@ class Adventure(models.Model):
             self.meta_title = self.title
         if not self.meta_description:
             self.meta_description = self.short_description
+        changed = richtext.render_fields(self)
+        if changed and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'rendered_html'}
+        from .services import GeoSearchService
+        self.geohash = GeoSearchService.encode_point(self.coordinates_lat, self.coordinates_lng)
         super().save(*args, **kwargs)
+        from .services import AdventureSearchService
+        AdventureSearchService.index(self)
+        self.enqueue_image_variants(self.main_image)
+
+    def delete(self, *args, **kwargs):
+        from .services import AdventureSearchService
+        adventure_id = self.pk
+        result = super().delete(*args, **kwargs)
+        AdventureSearchService.remove(adventure_id)
+        return result
+    
+    @staticmethod
+    def enqueue_image_variants(image):
+        """Gera as variantes responsivas da imagem depois do commit"""
+        from .services import ImageVariantService
+        if image:
+            transaction.on_commit(lambda: ImageVariantService.enqueue(image.name))
     
     def __str__(self):
         return self.title
     
     def get_absolute_url(self):
         return reverse('adventure_detail', kwargs={'slug': self.slug})
+
+    @property
+    def html(self):
+        """HTML compilado dos textos ricos: {{ adventure.html.description }}"""
+        return richtext.RenderedHTML(self)
     
     @property
     def current_price(self):
         """Retorna o preço atual considerando os descontos dinâmicos"""
+        from .services import PricingService
         try:
-            current_pricing = self.pricing_tiers.filter(
-                start_date__lte=timezone.now(),
-                end_date__gte=timezone.now(),
-                is_active=True
-            ).first()
-            
-            if current_pricing:
-                return current_pricing.price
-            return self.base_price
+            return PricingService.current_price(self)
         except Exception:
             return self.base_price
     
@@ -261,6 +365,16 @@ class Adventure(models.Model):
         except Exception:
             return None
     
+    @property
+    def cover_image(self):
+        """Retorna a imagem de capa da galeria ou, na falta dela, a imagem principal"""
+        covers = getattr(self, 'cover_images', None)
+        if covers is None:
+            covers = self.images.filter(is_cover=True)[:1]
+        for cover in covers:
+            return cover.image
+        return self.main_image
+    
     @property
     def next_event(self):
         """Retorna o próximo evento disponível para esta aventura"""
@@ -316,6 +430,10 @@ class AdventureImage(models.Model):
     
     def __str__(self):
         return f"{self.adventure.title} - Imagem {self.order}"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Adventure.enqueue_image_variants(self.image)
 
 
 class PricingTier(models.Model):
@@ -363,6 +481,19 @@ class PricingTier(models.Model):
     def __str__(self):
         return f"{self.adventure.title} - {self.name} (R$ {self.price})"
     
+    def save(self, *args, **kwargs):
+        from .services import AdventureSearchService, PricingService
+        super().save(*args, **kwargs)
+        PricingService.invalidate(self.adventure_id)
+        AdventureSearchService.refresh_prices([self.adventure_id])
+    
+    def delete(self, *args, **kwargs):
+        from .services import AdventureSearchService, PricingService
+        result = super().delete(*args, **kwargs)
+        PricingService.invalidate(self.adventure_id)
+        AdventureSearchService.refresh_prices([self.adventure_id])
+        return result
+    
     @property
     def is_current(self):
         """Verifica se esta faixa de preço está ativa no momento"""
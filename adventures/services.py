@@ -0,0 +1,854 @@
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, IntegerField, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from services import fulltext
+from services.files import atomic_write
+from . import geohash
+from .models import AdventureImage, PricingTier
+
+logger = logging.getLogger(__name__)
+
+
+class PricingService:
+    """
+    Resolução do preço atual das aventuras com cache.
+
+    O preço de uma faixa só muda em uma fronteira (início de uma faixa futura ou
+    fim de uma faixa vigente), então o resultado fica em cache até a próxima
+    fronteira e é invalidado quando uma faixa de preço é salva ou apagada.
+    """
+    CACHE_KEY = 'adventures:price:{}'
+
+    @classmethod
+    def current_price(cls, adventure):
+        """
+        Retorna o preço atual de uma aventura
+        """
+        if not hasattr(adventure, '_tier_price'):
+            cls.resolve([adventure])
+        if adventure._tier_price is not None:
+            return adventure._tier_price
+        return adventure.base_price
+
+    @classmethod
+    def resolve(cls, adventures):
+        """
+        Resolve o preço atual de várias aventuras com no máximo uma consulta
+        """
+        pending = {
+            adventure.pk: adventure
+            for adventure in adventures
+            if adventure.pk and not hasattr(adventure, '_tier_price')
+        }
+        if not pending:
+            return adventures
+
+        cached = cache.get_many([cls.CACHE_KEY.format(pk) for pk in pending])
+        for pk in list(pending):
+            entry = cached.get(cls.CACHE_KEY.format(pk))
+            if entry is not None:
+                pending.pop(pk)._tier_price = entry['price']
+
+        if pending:
+            now = timezone.now()
+            tiers = {}
+            for tier in PricingTier.objects.filter(
+                adventure_id__in=pending,
+                is_active=True,
+                end_date__gte=now
+            ).order_by('start_date').values('adventure_id', 'price', 'start_date', 'end_date'):
+                tiers.setdefault(tier['adventure_id'], []).append(tier)
+
+            for pk, adventure in pending.items():
+                price, boundary = cls._price_at(tiers.get(pk, []), now)
+                adventure._tier_price = price
+                cls._store(pk, price, boundary, now)
+
+        return adventures
+
+    @classmethod
+    def invalidate(cls, adventure_id):
+        cache.delete(cls.CACHE_KEY.format(adventure_id))
+
+    @classmethod
+    def _price_at(cls, tiers, now):
+        """
+        Retorna o preço da faixa vigente (ou None) e a próxima fronteira de preço
+        """
+        price = None
+        boundary = None
+        for tier in tiers:
+            if tier['start_date'] <= now:
+                if price is None:
+                    price = tier['price']
+                edge = tier['end_date']
+            else:
+                edge = tier['start_date']
+            if boundary is None or edge < boundary:
+                boundary = edge
+        return price, boundary
+
+    @classmethod
+    def _store(cls, adventure_id, price, boundary, now):
+        timeout = None
+        if boundary is not None:
+            timeout = int((boundary - now).total_seconds())
+            if timeout < 1:
+                return
+        cache.set(cls.CACHE_KEY.format(adventure_id), {'price': price}, timeout)
+
+
+class AdventureSearchService:
+    """
+    Busca do catálogo de aventuras com facetas.
+
+    - Texto: índice em adventures_adventure_search sobre título, descrição curta e
+      local (services.fulltext: FTS5 no SQLite, tsvector no PostgreSQL);
+      nos outros bancos a busca volta ao LIKE.
+    - Preço: coluna materializada Adventure.listed_price, recalculada quando a
+      aventura ou uma faixa de preço muda e pelo comando refresh_adventure_search
+      nas fronteiras das faixas.
+    - Datas: EXISTS no índice de disponibilidade dos eventos (bookings).
+    - Facetas: uma agregação agrupada por categoria, dificuldade e faixa de preço,
+      em cache por assinatura do filtro; cada faceta ignora o próprio filtro.
+    """
+    # Título, local, descrição curta, do mais para o menos relevante
+    INDEX = fulltext.FullTextIndex(
+        'adventures_adventure_search', 'adventures_adventure', 'adventure_id',
+        ('title', 'location', 'short_description'), (10, 5, 2)
+    )
+    MAX_TOKENS = 8
+    VERSION_KEY = 'adventures:catalog:version'
+    FACETS_KEY = 'adventures:facets:{}:{}'
+    DEFAULT_ORDERING = ('-is_featured', '-created_at', '-pk')
+    SORTS = {
+        'price': (F('listed_price').asc(nulls_last=True),) + DEFAULT_ORDERING,
+        '-price': (F('listed_price').desc(nulls_last=True),) + DEFAULT_ORDERING,
+        'date': (F('next_event_date').asc(nulls_last=True),) + DEFAULT_ORDERING,
+    }
+
+    @classmethod
+    def is_available(cls):
+        return cls.INDEX.is_available()
+
+    @classmethod
+    def parse_filters(cls, params):
+        """
+        Filtros da busca a partir dos parâmetros GET (valores inválidos são ignorados)
+        """
+        from .models import Adventure
+
+        def decimal(name):
+            try:
+                value = Decimal(params.get(name, '').replace(',', '.'))
+            except (InvalidOperation, ValueError):
+                return None
+            return value if value.is_finite() and value >= 0 else None
+
+        def date(name):
+            try:
+                return parse_date(params.get(name, ''))
+            except ValueError:
+                return None
+
+        price_range = params.get('price_range', '')
+        difficulty = params.get('difficulty', '')
+        sort = params.get('sort', '')
+        return {
+            'q': params.get('q', '').strip()[:200],
+            'category': params.get('category', '').strip(),
+            'difficulty': difficulty if difficulty in dict(Adventure.DIFFICULTY_CHOICES) else '',
+            'min_price': decimal('min_price'),
+            'max_price': decimal('max_price'),
+            'price_range': int(price_range) if price_range.isdigit() and int(price_range) < len(cls.price_ranges()) else None,
+            'date_from': date('date_from'),
+            'date_to': date('date_to'),
+            'sort': sort if sort in cls.SORTS else '',
+        }
+
+    @classmethod
+    def search(cls, queryset, filters):
+        """
+        Aplica os filtros ao queryset. Retorna (queryset ordenado, facetas).
+        """
+        tokens = fulltext.tokenize(filters['q'])[:cls.MAX_TOKENS]
+        ranked = bool(tokens) and cls.is_available()
+        if ranked:
+            queryset = cls.INDEX.match(queryset, tokens)
+        elif tokens:
+            queryset = cls._like_search(queryset, filters['q'])
+        if filters['date_from'] or filters['date_to']:
+            queryset = queryset.filter(cls._has_open_event(filters['date_from'], filters['date_to']))
+
+        facets = cls.facets(queryset, filters)
+
+        if filters['category']:
+            queryset = queryset.filter(category__slug=filters['category'])
+        if filters['difficulty']:
+            queryset = queryset.filter(difficulty=filters['difficulty'])
+        queryset = queryset.filter(cls._price_q(filters))
+        if filters['price_range'] is not None:
+            queryset = queryset.filter(cls._range_q(filters['price_range']))
+
+        if filters['sort']:
+            queryset = queryset.order_by(*cls.SORTS[filters['sort']])
+        elif ranked:
+            queryset = queryset.order_by('search_rank', *cls.DEFAULT_ORDERING)
+        else:
+            queryset = queryset.order_by(*cls.DEFAULT_ORDERING)
+        return queryset, facets
+
+    @classmethod
+    def facets(cls, queryset, filters):
+        """
+        Contagens por categoria, dificuldade e faixa de preço em uma consulta
+        """
+        signature = {
+            key: str(value) for key, value in filters.items()
+            if key != 'sort' and value not in (None, '')
+        }
+        digest = hashlib.sha1(json.dumps(signature, sort_keys=True).encode()).hexdigest()
+        key = cls.FACETS_KEY.format(cls._version(), digest)
+        rows = cache.get(key)
+        if rows is None:
+            ranges = cls.price_ranges()
+            price_range = Case(
+                *[When(cls._range_q(index), then=Value(index)) for index in range(len(ranges))],
+                default=Value(None),
+                output_field=IntegerField()
+            )
+            price_q = cls._price_q(filters)
+            in_price = Case(
+                When(price_q, then=Value(1)), default=Value(0), output_field=IntegerField()
+            ) if price_q else Value(1, output_field=IntegerField())
+            rows = [
+                (row['category__slug'], row['difficulty'], row['price_range'], bool(row['in_price']), row['total'])
+                for row in queryset.order_by().annotate(
+                    price_range=price_range,
+                    in_price=in_price
+                ).values(
+                    'category__slug', 'difficulty', 'price_range', 'in_price'
+                ).annotate(total=Count('pk'))
+            ]
+            cache.set(key, rows, getattr(settings, 'ADVENTURE_FACETS_CACHE_SECONDS', 60))
+
+        categories = {}
+        difficulties = {}
+        range_counts = {}
+        total = 0
+        for category, difficulty, price_range, in_price, count in rows:
+            category_match = not filters['category'] or category == filters['category']
+            difficulty_match = not filters['difficulty'] or difficulty == filters['difficulty']
+            price_match = in_price and (filters['price_range'] is None or price_range == filters['price_range'])
+            if difficulty_match and price_match:
+                categories[category] = categories.get(category, 0) + count
+            if category_match and price_match:
+                difficulties[difficulty] = difficulties.get(difficulty, 0) + count
+            if category_match and difficulty_match and in_price and price_range is not None:
+                range_counts[price_range] = range_counts.get(price_range, 0) + count
+            if category_match and difficulty_match and price_match:
+                total += count
+
+        return {
+            'total': total,
+            'categories': categories,
+            'difficulties': difficulties,
+            'price_ranges': [
+                {'index': index, 'min': low, 'max': high, 'count': range_counts.get(index, 0)}
+                for index, (low, high) in enumerate(cls.price_ranges())
+            ],
+        }
+
+    @classmethod
+    def price_ranges(cls):
+        """
+        Faixas [mínimo, máximo) das facetas de preço a partir de ADVENTURE_PRICE_RANGES
+        """
+        bounds = [Decimal(str(bound)) for bound in getattr(settings, 'ADVENTURE_PRICE_RANGES', [100, 250, 500])]
+        return list(zip([None] + bounds, bounds + [None]))
+
+    @classmethod
+    def index(cls, adventure):
+        """
+        Atualiza o preço materializado e o índice textual de uma aventura
+        """
+        cls.refresh_prices([adventure.pk])
+        cls.INDEX.index(adventure.pk, [adventure.title, adventure.location, adventure.short_description])
+        cls.invalidate()
+
+    @classmethod
+    def remove(cls, adventure_id):
+        cls.INDEX.remove(adventure_id)
+        cls.invalidate()
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recalcula os preços e reconstrói o índice textual. Retorna o total indexado.
+        """
+        from .models import Adventure
+
+        cls.refresh_prices()
+        cls.invalidate()
+        if not cls.is_available():
+            return Adventure.objects.count()
+        return cls.INDEX.rebuild()
+
+    @classmethod
+    def refresh_prices(cls, adventure_ids=None):
+        """
+        Recalcula listed_price (faixa vigente ou preço base) em um único UPDATE.
+        Retorna o número de aventuras cujo preço mudou.
+        """
+        from .models import Adventure
+
+        now = timezone.now()
+        current_tier = PricingTier.objects.filter(
+            adventure=OuterRef('pk'),
+            start_date__lte=now,
+            end_date__gte=now,
+            is_active=True
+        ).order_by('start_date').values('price')[:1]
+        price = Coalesce(Subquery(current_tier), F('base_price'))
+
+        adventures = Adventure.objects.all()
+        if adventure_ids is not None:
+            adventures = adventures.filter(pk__in=list(adventure_ids))
+        # Só grava as linhas cujo preço mudou
+        updated = adventures.annotate(new_price=price).filter(
+            Q(listed_price__isnull=True) | ~Q(listed_price=F('new_price'))
+        ).values('pk')
+        count = Adventure.objects.filter(pk__in=Subquery(updated)).update(listed_price=price)
+        if count and adventure_ids is None:
+            cls.invalidate()
+        return count
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Descarta as facetas em cache
+        """
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_KEY, 2, None)
+
+    @classmethod
+    def _version(cls):
+        return cache.get_or_set(cls.VERSION_KEY, 1, None)
+
+    @classmethod
+    def _has_open_event(cls, date_from, date_to):
+        EventAvailability = apps.get_model('bookings', 'EventAvailability')
+        today = timezone.localdate()
+        events = EventAvailability.objects.filter(
+            adventure=OuterRef('pk'),
+            is_open=True,
+            date__gte=max(date_from or today, today),
+            remaining_spots__gt=0,
+            closes_at__gte=timezone.now(),
+        )
+        if date_to:
+            events = events.filter(date__lte=date_to)
+        return Exists(events)
+
+    @classmethod
+    def _price_q(cls, filters):
+        price_q = Q()
+        if filters['min_price'] is not None:
+            price_q &= Q(listed_price__gte=filters['min_price'])
+        if filters['max_price'] is not None:
+            price_q &= Q(listed_price__lte=filters['max_price'])
+        return price_q
+
+    @classmethod
+    def _range_q(cls, index):
+        low, high = cls.price_ranges()[index]
+        range_q = Q(listed_price__isnull=False)
+        if low is not None:
+            range_q &= Q(listed_price__gte=low)
+        if high is not None:
+            range_q &= Q(listed_price__lt=high)
+        return range_q
+
+    @classmethod
+    def _like_search(cls, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(short_description__icontains=query) |
+            Q(location__icontains=query)
+        )
+
+
+class GeoSearchService:
+    """
+    Busca de aventuras por proximidade.
+
+    Cada aventura guarda o geohash das coordenadas (indexado). A busca escolhe a
+    maior precisão em que poucas células cobrem o círculo pedido, filtra no banco
+    pelos prefixos dessas células e pela caixa delimitadora de latitude/longitude
+    e calcula a distância exata (haversine) só para os candidatos.
+    """
+    EARTH_RADIUS_KM = 6371.0088
+    # Mesmo raio do haversine: a caixa nunca corta pontos dentro do círculo
+    KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+    # Máximo de células (consultas "começa com") por busca
+    MAX_CELLS = 9
+
+    @classmethod
+    def encode_point(cls, lat, lng):
+        """
+        Geohash das coordenadas ('' sem coordenadas)
+        """
+        if lat is None or lng is None:
+            return ''
+        return geohash.encode(lat, lng, getattr(settings, 'GEOHASH_PRECISION', 9))
+
+    @classmethod
+    def nearby(cls, queryset, lat, lng, radius_km, limit=None):
+        """
+        Aventuras a até radius_km do ponto, da mais próxima para a mais distante,
+        com o atributo distance_km
+        """
+        limit = limit or getattr(settings, 'GEO_SEARCH_LIMIT', 20)
+        candidates = queryset.filter(cls.prefilter(lat, lng, radius_km)).values_list(
+            'pk', 'coordinates_lat', 'coordinates_lng'
+        )
+        distances = []
+        for pk, candidate_lat, candidate_lng in candidates:
+            distance = cls.haversine(lat, lng, float(candidate_lat), float(candidate_lng))
+            if distance <= radius_km:
+                distances.append((distance, pk))
+        distances.sort()
+        distances = distances[:limit]
+
+        adventures = queryset.in_bulk([pk for _, pk in distances])
+        results = []
+        for distance, pk in distances:
+            adventure = adventures[pk]
+            adventure.distance_km = distance
+            results.append(adventure)
+        return results
+
+    @classmethod
+    def prefilter(cls, lat, lng, radius_km):
+        """
+        Filtro SQL: células geohash que cobrem o círculo e caixa delimitadora
+        """
+        lat_delta = radius_km / cls.KM_PER_DEGREE
+        lat_min, lat_max = lat - lat_delta, lat + lat_delta
+        if lat_max >= 90.0 or lat_min <= -90.0:
+            # O círculo contém um polo: todas as longitudes
+            lng_delta = 180.0
+        else:
+            # Maior diferença de longitude sobre o círculo (meridianos tangentes)
+            ratio = math.sin(radius_km / cls.EARTH_RADIUS_KM) / math.cos(math.radians(lat))
+            lng_delta = 180.0 if ratio >= 1.0 else math.degrees(math.asin(ratio))
+        lng_min, lng_max = lng - lng_delta, lng + lng_delta
+
+        box = Q(coordinates_lat__gte=max(lat_min, -90.0), coordinates_lat__lte=min(lat_max, 90.0))
+        if lng_max - lng_min < 360:
+            # Caixas que passam do antimeridiano viram dois intervalos
+            if lng_min < -180:
+                box &= Q(coordinates_lng__gte=lng_min + 360) | Q(coordinates_lng__lte=lng_max)
+            elif lng_max > 180:
+                box &= Q(coordinates_lng__gte=lng_min) | Q(coordinates_lng__lte=lng_max - 360)
+            else:
+                box &= Q(coordinates_lng__gte=lng_min, coordinates_lng__lte=lng_max)
+
+        cells = cls.covering_cells(lat_min, lat_max, lng_min, lng_max)
+        if cells:
+            # Prefixo como intervalo ("~" vem depois de todo o alfabeto base32):
+            # usa o índice mesmo onde LIKE não usa (SQLite, collations não-C)
+            cell_q = Q()
+            for cell in cells:
+                cell_q |= Q(geohash__gte=cell, geohash__lt=cell + '~')
+            box &= cell_q
+        return box
+
+    @classmethod
+    def covering_cells(cls, lat_min, lat_max, lng_min, lng_max):
+        """
+        Células da maior precisão em que até MAX_CELLS cobrem a caixa (None se nenhuma)
+        """
+        for precision in range(getattr(settings, 'GEOHASH_PRECISION', 9), 0, -1):
+            cells = geohash.covering_cells(
+                lat_min, lat_max, lng_min, lng_max, precision,
+                max_samples=cls.MAX_CELLS * 4
+            )
+            if cells is not None and len(cells) <= cls.MAX_CELLS:
+                return sorted(cells)
+        return None
+
+    @classmethod
+    def haversine(cls, lat1, lng1, lat2, lng2):
+        """
+        Distância em km entre dois pontos sobre a esfera
+        """
+        phi1, phi2 = math.radians(lat1), math.radians(lat2)
+        dphi = phi2 - phi1
+        dlambda = math.radians(lng2 - lng1)
+        a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+        return 2 * cls.EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class AdventurePageCache:
+    """
+    Cache da página de detalhes das aventuras.
+
+    O HTML fica em cache por versão de conteúdo, incrementada pelos sinais de
+    Adventure, AdventureImage e PricingTier. O cartão de reserva (preço, próxima
+    data e vagas) é renderizado a cada requisição e encaixado no marcador. Eventos
+    e vagas incrementam uma segunda versão, que entra no ETag junto com a de
+    conteúdo: um GET condicional é respondido com 304 só com leituras de cache.
+    Versões novas partem do relógio, então um cache esvaziado nunca volta a uma
+    versão já usada. As versões só invalidam todos os workers com um cache
+    compartilhado (check --deploy avisa com adventures.W001).
+    """
+    MARKER = '<!--booking-card-->'
+    SLUG_KEY = 'adventures:page:slug:{}'
+    CONTENT_KEY = 'adventures:page:content:{}'
+    SEATS_KEY = 'adventures:page:seats:{}'
+    HTML_KEY = 'adventures:page:html:{}:{}:{}'
+
+    @classmethod
+    def adventure_id(cls, slug):
+        """
+        ID da aventura ativa com o slug (None se não existir)
+        """
+        from .models import Adventure
+
+        key = cls.SLUG_KEY.format(slug)
+        adventure_id = cache.get(key)
+        if adventure_id is None:
+            adventure_id = Adventure.objects.filter(
+                slug=slug, is_active=True
+            ).values_list('pk', flat=True).first()
+            if adventure_id is None:
+                return None
+            cache.set(key, adventure_id, None)
+        return adventure_id
+
+    @classmethod
+    def etag(cls, adventure_id, site_stamp):
+        """
+        ETag da página a partir das versões e do preço em cache (None se o preço
+        não estiver em cache: a página precisa ser renderizada)
+        """
+        price_key = PricingService.CACHE_KEY.format(adventure_id)
+        keys = [cls.CONTENT_KEY.format(adventure_id), cls.SEATS_KEY.format(adventure_id), price_key]
+        values = cache.get_many(keys)
+        if price_key not in values:
+            return None
+        content = values.get(keys[0]) or cls._start(keys[0])
+        seats = values.get(keys[1]) or cls._start(keys[1])
+        # A data entra no ETag: a "próxima data" do cartão muda com o dia
+        signature = f'{adventure_id}:{content}:{seats}:{values[price_key]["price"]}:{timezone.localdate()}:{site_stamp}'
+        return '"{}"'.format(hashlib.sha1(signature.encode()).hexdigest()[:20])
+
+    @classmethod
+    def page(cls, adventure_id, site_stamp):
+        """
+        (chave, HTML em cache ou None) da versão atual de conteúdo
+        """
+        version_key = cls.CONTENT_KEY.format(adventure_id)
+        version = cache.get(version_key) or cls._start(version_key)
+        key = cls.HTML_KEY.format(adventure_id, version, site_stamp)
+        return key, cache.get(key)
+
+    @classmethod
+    def store(cls, key, html):
+        cache.set(key, html, getattr(settings, 'ADVENTURE_PAGE_CACHE_SECONDS', 3600))
+
+    @classmethod
+    def invalidate(cls, adventure_ids, slug=None):
+        """
+        Nova versão de conteúdo (a página é renderizada de novo)
+        """
+        if slug:
+            cache.delete(cls.SLUG_KEY.format(slug))
+        cls._bump(cls.CONTENT_KEY, adventure_ids)
+
+    @classmethod
+    def invalidate_seats(cls, adventure_ids):
+        """
+        Nova versão de vagas/eventos (só o ETag muda)
+        """
+        cls._bump(cls.SEATS_KEY, adventure_ids)
+
+    @classmethod
+    def _bump(cls, template, adventure_ids):
+        for adventure_id in set(adventure_ids):
+            key = template.format(adventure_id)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cls._start(key)
+
+    @classmethod
+    def _start(cls, key):
+        cache.add(key, time.time_ns() // 1000, None)
+        return cache.get(key)
+
+
+class ImageVariantService:
+    """
+    Variantes responsivas das imagens das aventuras.
+
+    Cada imagem enviada gera versões WebP e JPEG nas larguras de
+    IMAGE_VARIANT_WIDTHS (sem ampliar o original), gravadas em disco em
+    IMAGE_VARIANT_ROOT/<hash do nome>/ junto com um manifest.json. A geração roda
+    em um pool de threads do próprio processo depois do commit; o que estava na
+    fila quando o processo reiniciou é gerado pelo comando generate_image_variants
+    (ou na próxima página que pedir a imagem). O manifesto fica em cache para os
+    templates montarem o srcset sem tocar no disco.
+    """
+    CACHE_KEY = 'images:variants:{}'
+    FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+    # Manifesto de uma imagem que não pôde ser processada (evita repetir a cada página)
+    FAILED = {'widths': [], 'failed': True}
+
+    _executor = None
+    _pending = set()
+    _lock = threading.Lock()
+
+    @classmethod
+    def widths(cls):
+        return sorted(getattr(settings, 'IMAGE_VARIANT_WIDTHS', [320, 640, 1024, 1600]))
+
+    @classmethod
+    def key(cls, name):
+        return hashlib.sha256(name.encode()).hexdigest()[:32]
+
+    @classmethod
+    def root(cls):
+        return getattr(settings, 'IMAGE_VARIANT_ROOT', '') or os.path.join(settings.MEDIA_ROOT, 'variants')
+
+    @classmethod
+    def path(cls, name, filename):
+        key = cls.key(name)
+        return os.path.join(cls.root(), key[:2], key, filename)
+
+    @classmethod
+    def url(cls, name, width, image_format):
+        key = cls.key(name)
+        base_url = getattr(settings, 'IMAGE_VARIANT_URL', '') or f"{settings.MEDIA_URL}variants/"
+        return f"{base_url}{key[:2]}/{key}/{width}w.{image_format}"
+
+    @classmethod
+    def manifest(cls, name):
+        """
+        Larguras geradas para a imagem ({'widths': [...]}) ou None se ainda não geradas
+        """
+        cache_key = cls.CACHE_KEY.format(cls.key(name))
+        manifest = cache.get(cache_key)
+        if manifest is None:
+            try:
+                with open(cls.path(name, 'manifest.json')) as file:
+                    manifest = json.load(file)
+            except (OSError, ValueError):
+                return None
+            cache.set(cache_key, manifest, None)
+        return manifest
+
+    @classmethod
+    def srcset(cls, name, image_format):
+        manifest = cls.manifest(name) if name else None
+        if not manifest:
+            return ''
+        return ', '.join(
+            f"{cls.url(name, width, image_format)} {width}w" for width in manifest['widths']
+        )
+
+    @classmethod
+    def best_url(cls, name, width):
+        """
+        URL da menor variante JPEG com pelo menos a largura pedida (ou o original)
+        """
+        manifest = cls.manifest(name) if name else None
+        for variant_width in (manifest['widths'] if manifest else []):
+            if variant_width >= width:
+                return cls.url(name, variant_width, 'jpg')
+        return default_storage.url(name)
+
+    @classmethod
+    def enqueue(cls, name):
+        """
+        Agenda a geração das variantes de uma imagem em segundo plano
+        """
+        if not name or cls.manifest(name) is not None:
+            return
+        with cls._lock:
+            if name in cls._pending:
+                return
+            cls._pending.add(name)
+
+        if not getattr(settings, 'IMAGE_VARIANT_ASYNC', True):
+            cls._run(name)
+            return
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+                    thread_name_prefix='image-variants'
+                )
+        cls._executor.submit(cls._run, name)
+
+    @classmethod
+    def generate(cls, name, force=False):
+        """
+        Gera as variantes de uma imagem do storage. Retorna o manifesto.
+        """
+        from PIL import Image, ImageOps
+
+        if not force:
+            manifest = cls.manifest(name)
+            if manifest is not None and not manifest.get('failed'):
+                return manifest
+
+        with default_storage.open(name, 'rb') as source, Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+            original_width, original_height = image.size
+
+            widths = [width for width in cls.widths() if width < original_width] or [original_width]
+            for width in widths:
+                height = max(1, round(original_height * width / original_width))
+                resized = image.resize((width, height), Image.LANCZOS) if width != original_width else image
+                for extension, image_format in cls.FORMATS.items():
+                    output = io.BytesIO()
+                    if image_format == 'JPEG':
+                        resized.convert('RGB').save(output, format='JPEG', quality=82, optimize=True, progressive=True)
+                    else:
+                        resized.save(output, format='WEBP', quality=80, method=4)
+                    atomic_write(cls.path(name, f"{width}w.{extension}"), output.getvalue())
+
+        manifest = {'widths': widths, 'width': original_width, 'height': original_height}
+        atomic_write(cls.path(name, 'manifest.json'), json.dumps(manifest).encode())
+        cache.set(cls.CACHE_KEY.format(cls.key(name)), manifest, None)
+        return manifest
+
+    @classmethod
+    def _run(cls, name):
+        try:
+            cls.generate(name)
+        except Exception as e:
+            if isinstance(e, FileNotFoundError):
+                logger.info(f"Image {name} not found; skipping variants")
+            else:
+                logger.error(f"Error generating image variants for {name}: {str(e)}")
+            cache.set(
+                cls.CACHE_KEY.format(cls.key(name)),
+                cls.FAILED,
+                getattr(settings, 'IMAGE_VARIANT_RETRY_SECONDS', 3600)
+            )
+        finally:
+            with cls._lock:
+                cls._pending.discard(name)
+
+
+class AdventureImageIngestService:
+    """
+    Upload em lote das imagens da galeria.
+
+    Cada arquivo é validado (decodificado por completo com o Pillow) e gravado no
+    storage em um pool de threads; as linhas de AdventureImage são criadas depois
+    com um único bulk_create, com a ordem atribuída na sequência do envio. Se a
+    transação falhar, os arquivos gravados são apagados.
+    """
+    ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+
+    @classmethod
+    def ingest(cls, adventure, files):
+        """
+        Retorna (imagens criadas, [(nome do arquivo, erro)])
+        """
+        workers = getattr(settings, 'ADVENTURE_IMAGE_INGEST_WORKERS', 4)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(cls._store, files))
+
+        errors = [(upload.name, error) for upload, (name, error) in zip(files, results) if error]
+        names = [name for name, error in results if not error]
+        if not names:
+            return [], errors
+
+        try:
+            with transaction.atomic():
+                # Trava a aventura: envios simultâneos não leem a mesma maior ordem
+                list(type(adventure).objects.select_for_update().filter(pk=adventure.pk).values_list('pk', flat=True))
+                last_order = adventure.images.aggregate(last=Max('order'))['last']
+                start = 0 if last_order is None else last_order + 1
+                images = AdventureImage.objects.bulk_create([
+                    AdventureImage(adventure=adventure, image=name, order=start + position)
+                    for position, name in enumerate(names)
+                ])
+                # bulk_create não chama save(): agenda as variantes aqui
+                for image in images:
+                    adventure.enqueue_image_variants(image.image)
+        except BaseException:
+            # Sem as linhas, os arquivos já gravados ficariam órfãos no storage
+            cls._discard(names)
+            raise
+        return images, errors
+
+    @classmethod
+    def validate(cls, upload):
+        """
+        Decodifica a imagem inteira; arquivos truncados ou que não são imagens falham aqui
+        """
+        from PIL import Image
+
+        max_bytes = getattr(settings, 'ADVENTURE_IMAGE_MAX_BYTES', 20 * 1024 * 1024)
+        if upload.size > max_bytes:
+            return f"Arquivo maior que {max_bytes // (1024 * 1024)} MB"
+        try:
+            upload.seek(0)
+            with Image.open(upload) as image:
+                if image.format not in cls.ALLOWED_FORMATS:
+                    return f"Formato não suportado: {image.format}"
+                image.load()
+        except Exception as e:
+            return f"Imagem inválida: {e}"
+        finally:
+            upload.seek(0)
+        return None
+
+    @classmethod
+    def _store(cls, upload):
+        error = cls.validate(upload)
+        if error:
+            return None, error
+        field = AdventureImage._meta.get_field('image')
+        name = field.generate_filename(None, upload.name)
+        try:
+            return field.storage.save(name, upload, max_length=field.max_length), None
+        except Exception as e:
+            logger.error(f"Error storing gallery image {upload.name}: {str(e)}")
+            return None, f"Erro ao gravar o arquivo: {e}"
+
+    @classmethod
+    def _discard(cls, names):
+        storage = AdventureImage._meta.get_field('image').storage
+        for name in names:
+            try:
+                storage.delete(name)
+            except Exception as e:
+                logger.error(f"Error removing orphaned gallery image {name}: {str(e)}")
@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bookings.models import AdventureEvent
+from bookings.signals import seats_changed
+from .models import Adventure, AdventureImage, PricingTier
+from .services import AdventurePageCache
+
+
+@receiver([post_save, post_delete], sender=Adventure)
+def adventure_changed(sender, instance, **kwargs):
+    """Nova versão da página de detalhes"""
+    AdventurePageCache.invalidate([instance.pk], slug=instance.slug)
+
+
+@receiver([post_save, post_delete], sender=AdventureImage)
+@receiver([post_save, post_delete], sender=PricingTier)
+def adventure_content_changed(sender, instance, **kwargs):
+    AdventurePageCache.invalidate([instance.adventure_id])
+
+
+@receiver([post_save, post_delete], sender=AdventureEvent)
+def adventure_event_changed(sender, instance, **kwargs):
+    AdventurePageCache.invalidate_seats([instance.adventure_id])
+
+
+@receiver(seats_changed)
+def adventure_seats_changed(sender, event_ids, **kwargs):
+    """Vagas alteradas por reservas: só depois do commit, para o ETag não ficar à frente do banco"""
+    def bump():
+        AdventurePageCache.invalidate_seats(
+            AdventureEvent.objects.filter(pk__in=event_ids).values_list('adventure_id', flat=True)
+        )
+    transaction.on_commit(bump)
@@ -0,0 +1,57 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from adventures.services import ImageVariantService
+
+register = template.Library()
+
+
+def _name(image):
+    return getattr(image, 'name', image) or ''
+
+
+@register.simple_tag
+def image_srcset(image, image_format='webp'):
+    """
+    srcset com as variantes geradas da imagem ('' enquanto não existirem)
+    """
+    return ImageVariantService.srcset(_name(image), image_format)
+
+
+@register.simple_tag
+def image_url(image, width):
+    """
+    URL da menor variante com pelo menos a largura pedida (ou do original)
+    """
+    name = _name(image)
+    return ImageVariantService.best_url(name, int(width)) if name else ''
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='100vw', css_class='', width=640):
+    """
+    <picture> com WebP e JPEG nas larguras geradas. Sem variantes ainda, usa o
+    original e agenda a geração.
+    """
+    name = _name(image)
+    if not name:
+        return ''
+    manifest = ImageVariantService.manifest(name)
+    if not manifest or not manifest['widths']:
+        if manifest is None:
+            ImageVariantService.enqueue(name)
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy">',
+            default_storage.url(name), alt, css_class
+        )
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        ImageVariantService.srcset(name, 'webp'), sizes,
+        ImageVariantService.best_url(name, int(width)),
+        ImageVariantService.srcset(name, 'jpg'), sizes,
+        alt, css_class
+    )
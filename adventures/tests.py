@@ -1,3 +1,670 @@
+import io
+import math
+import os
+import shutil
+import tempfile
+from datetime import time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from bookings.models import AdventureEvent
+from bookings.services import SeatReservationService
+from content.models import SiteConfiguration
+from PIL import Image
+
+from . import geohash
+from .checks import check_page_cache_backend
+from .models import Adventure, AdventureImage, Category, PricingTier
+from .services import (
+    AdventureImageIngestService, AdventurePageCache, AdventureSearchService, GeoSearchService, ImageVariantService,
+    PricingService
+)
+
+
+class AdventureListingQueryCountTests(TestCase):
+    """
+    O número de consultas das listagens não pode depender do tamanho da página
+    """
+    # count do paginador + aventuras + prefetch das capas
+    LIST_QUERIES = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Cachoeirismo')
+
+    def setUp(self):
+        # Worker "aquecido": o context processor não consulta o banco
+        SiteConfiguration.clear_cache()
+        SiteConfiguration.get_config()
+
+    def create_adventures(self, count):
+        now = timezone.now()
+        start = Adventure.objects.count()
+        for i in range(start, start + count):
+            adventure = Adventure.objects.create(
+                title=f'Aventura {i}',
+                category=self.category,
+                short_description='Descrição curta',
+                description='Descrição',
+                difficulty='iniciante',
+                duration_hours=4,
+                location='Serra Gaúcha',
+                meeting_point='Praça central',
+                base_price=Decimal('150.00'),
+                what_includes='Equipamentos',
+                what_to_bring='Água',
+                safety_requirements='Capacete',
+                main_image='adventures/main/capa.jpg',
+                is_featured=True,
+            )
+            PricingTier.objects.create(
+                adventure=adventure,
+                name='Promoção',
+                price=Decimal('120.00'),
+                start_date=now - timedelta(days=1),
+                end_date=now + timedelta(days=1),
+            )
+            AdventureImage.objects.create(
+                adventure=adventure,
+                image='adventures/gallery/capa.jpg',
+                is_cover=True,
+            )
+            AdventureEvent.objects.create(
+                adventure=adventure,
+                date=now.date() + timedelta(days=7),
+                start_time=time(8, 0),
+                max_participants=10,
+                current_participants=3,
+            )
+
+    def test_for_listing_annotations(self):
+        self.create_adventures(1)
+        adventure = Adventure.objects.for_listing().get()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(adventure.current_price, Decimal('120.00'))
+            self.assertEqual(adventure.next_event_spots, 7)
+            self.assertEqual(adventure.cover_image.name, 'adventures/gallery/capa.jpg')
+        self.assertEqual(adventure.next_event_date, timezone.now().date() + timedelta(days=7))
+
+    def test_adventure_list_query_count_is_constant(self):
+        # Consultas extras: facetas da busca e categorias com contagem
+        url = reverse('adventures:list')
+
+        self.create_adventures(2)
+        with self.assertNumQueries(self.LIST_QUERIES + 2):
+            response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+
+        self.create_adventures(10)
+        with self.assertNumQueries(self.LIST_QUERIES + 2):
+            response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+
+    def test_category_list_query_count_is_constant(self):
+        # Consulta extra: a própria categoria
+        url = reverse('adventures:category', kwargs={'slug': self.category.slug})
+
+        self.create_adventures(2)
+        with self.assertNumQueries(self.LIST_QUERIES + 1):
+            response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+
+        self.create_adventures(10)
+        with self.assertNumQueries(self.LIST_QUERIES + 1):
+            response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+
+
+class PricingServiceTests(TestCase):
+    """
+    Preço atual em cache até a próxima fronteira das faixas
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.adventure = Adventure.objects.create(
+            title='Canionismo',
+            category=Category.objects.create(name='Cânions'),
+            short_description='Descrição curta',
+            description='Descrição',
+            difficulty='iniciante',
+            duration_hours=4,
+            location='Praia Grande',
+            meeting_point='Centro',
+            base_price=Decimal('150.00'),
+            what_includes='Guia',
+            what_to_bring='Água',
+            safety_requirements='Capacete',
+            main_image='adventures/main/capa.jpg',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def price(self, now=None):
+        # Instância nova a cada leitura: o preço vem do cache ou das faixas
+        adventure = Adventure.objects.get(pk=self.adventure.pk)
+        with mock.patch('django.utils.timezone.now', return_value=now or timezone.now()):
+            return PricingService.current_price(adventure)
+
+    def test_price_is_cached_until_the_next_tier_boundary(self):
+        now = timezone.now()
+        PricingTier.objects.create(
+            adventure=self.adventure, name='Pré-venda', price=Decimal('120.00'),
+            start_date=now - timedelta(days=1), end_date=now + timedelta(hours=1),
+        )
+        PricingTier.objects.create(
+            adventure=self.adventure, name='Promoção', price=Decimal('99.00'),
+            start_date=now + timedelta(hours=2), end_date=now + timedelta(days=1),
+        )
+
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.assertEqual(self.price(now), Decimal('120.00'))
+        self.assertEqual(cache_set.call_args[0][2], 3600)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.price(now), Decimal('120.00'))
+
+        # Depois de cada fronteira (o cache expirou junto com ela)
+        cache.clear()
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.assertEqual(self.price(now + timedelta(hours=1, minutes=30)), Decimal('150.00'))
+        self.assertEqual(cache_set.call_args[0][2], 1800)
+        cache.clear()
+        self.assertEqual(self.price(now + timedelta(hours=3)), Decimal('99.00'))
+
+    def test_saving_or_deleting_a_tier_invalidates_the_price(self):
+        now = timezone.now()
+        self.assertEqual(self.price(), Decimal('150.00'))
+
+        tier = PricingTier.objects.create(
+            adventure=self.adventure, name='Promoção', price=Decimal('120.00'),
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+        )
+        self.assertEqual(self.price(), Decimal('120.00'))
+        tier.price = Decimal('110.00')
+        tier.save()
+        self.assertEqual(self.price(), Decimal('110.00'))
+        tier.delete()
+        self.assertEqual(self.price(), Decimal('150.00'))
+
+
+class AdventureImageTestCase(TestCase):
+    """
+    Base com MEDIA_ROOT temporário e variantes geradas na hora
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Rapel')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = self.settings(
+            MEDIA_ROOT=media_root,
+            IMAGE_VARIANT_ROOT='',
+            IMAGE_VARIANT_ASYNC=False,
+            IMAGE_VARIANT_WIDTHS=[320, 640, 1024],
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        self.media_root = media_root
+
+    def upload(self, width, height, name='capa.jpg'):
+        image = io.BytesIO()
+        Image.linear_gradient('L').resize((width, height)).convert('RGB').save(image, format='JPEG', quality=95)
+        return SimpleUploadedFile(name, image.getvalue(), content_type='image/jpeg')
+
+    def create_adventure(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Adventure.objects.create(
+                title='Rapel na Cachoeira',
+                category=self.category,
+                short_description='Descida',
+                description='Descrição',
+                difficulty='iniciante',
+                duration_hours=4,
+                location='Serra Gaúcha',
+                meeting_point='Praça central',
+                base_price=Decimal('150.00'),
+                what_includes='Equipamentos',
+                what_to_bring='Água',
+                safety_requirements='Capacete',
+                main_image=image,
+            )
+
+
+class ImageVariantTests(AdventureImageTestCase):
+    """
+    Variantes WebP/JPEG geradas no upload e srcset nos templates
+    """
+
+    def test_variants_are_generated_on_upload_without_upscaling(self):
+        adventure = self.create_adventure(self.upload(800, 400))
+        name = adventure.main_image.name
+
+        manifest = ImageVariantService.manifest(name)
+        self.assertEqual(manifest['widths'], [320, 640])
+        with Image.open(ImageVariantService.path(name, '640w.webp')) as variant:
+            self.assertEqual((variant.format, variant.size), ('WEBP', (640, 320)))
+        self.assertLess(
+            os.path.getsize(ImageVariantService.path(name, '320w.jpg')),
+            adventure.main_image.size
+        )
+
+        # Manifesto lido do disco quando o cache foi perdido (outro worker)
+        cache.clear()
+        self.assertEqual(ImageVariantService.manifest(name)['widths'], [320, 640])
+        self.assertEqual(ImageVariantService.best_url(name, 500), ImageVariantService.url(name, 640, 'jpg'))
+        self.assertEqual(ImageVariantService.best_url(name, 1024), adventure.main_image.url)
+
+    def test_template_tags_emit_srcset(self):
+        adventure = self.create_adventure(self.upload(1200, 600))
+        name = adventure.main_image.name
+        html = Template(
+            '{% load adventure_images %}{% responsive_image image alt="Capa" sizes="400px" %}'
+        ).render(Context({'image': adventure.main_image}))
+
+        self.assertIn('<source type="image/webp" srcset="', html)
+        self.assertIn(f'{ImageVariantService.url(name, 1024, "webp")} 1024w', html)
+        self.assertIn(f'src="{ImageVariantService.url(name, 640, "jpg")}"', html)
+        self.assertIn('sizes="400px"', html)
+
+        # Imagem sem variantes (arquivo ausente): original, sem quebrar a página
+        html = Template(
+            '{% load adventure_images %}{% responsive_image image %}'
+        ).render(Context({'image': 'adventures/main/ausente.jpg'}))
+        self.assertIn('src="/media/adventures/main/ausente.jpg"', html)
+
+
+class AdventureImageIngestTests(AdventureImageTestCase):
+    """
+    Upload em lote da galeria pelo admin
+    """
+
+    def test_batch_upload_validates_in_parallel_and_bulk_creates(self):
+        adventure = self.create_adventure(self.upload(400, 200))
+        AdventureImage.objects.create(adventure=adventure, image='adventures/gallery/antiga.jpg', order=4)
+        staff = get_user_model().objects.create_user('equipe', 'equipe@example.com', 'senha', is_staff=True)
+        self.client.force_login(staff)
+
+        files = [self.upload(400, 200, f'foto-{i}.jpg') for i in range(3)]
+        files.append(SimpleUploadedFile('quebrada.jpg', b'nao e imagem', content_type='image/jpeg'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('adventures:upload_adventure_image_with_id', args=[adventure.pk]),
+                {'images': files},
+                HTTP_HOST='localhost'
+            )
+
+        data = response.json()
+        self.assertEqual(len(data['images']), 3)
+        self.assertEqual([error['file'] for error in data['errors']], ['quebrada.jpg'])
+        gallery = list(adventure.images.order_by('order').values_list('order', 'image'))
+        self.assertEqual([order for order, _ in gallery], [4, 5, 6, 7])
+        self.assertTrue(all(os.path.exists(os.path.join(self.media_root, name)) for _, name in gallery[1:]))
+        # Variantes agendadas para as imagens criadas com bulk_create
+        self.assertIsNotNone(ImageVariantService.manifest(gallery[1][1]))
+
+    def test_ingest_uses_constant_queries(self):
+        adventure = self.create_adventure(self.upload(400, 200))
+        with self.assertNumQueries(5):
+            # SAVEPOINT, trava da aventura, maior ordem, INSERT em lote, RELEASE
+            images, errors = AdventureImageIngestService.ingest(
+                adventure,
+                [self.upload(200, 100, f'foto-{i}.jpg') for i in range(8)]
+            )
+        self.assertEqual((len(images), errors), (8, []))
+
+    def test_failed_insert_removes_stored_files(self):
+        adventure = self.create_adventure(self.upload(400, 200))
+        gallery = os.path.join(self.media_root, 'adventures', 'gallery')
+
+        with mock.patch.object(AdventureImage.objects, 'bulk_create', side_effect=RuntimeError('banco caiu')):
+            with self.assertRaises(RuntimeError):
+                AdventureImageIngestService.ingest(
+                    adventure,
+                    [self.upload(200, 100, f'foto-{i}.jpg') for i in range(3)]
+                )
+        self.assertEqual(os.listdir(gallery) if os.path.isdir(gallery) else [], [])
+        self.assertFalse(adventure.images.exists())
+
+
+class AdventureSearchTests(TestCase):
+    """
+    Busca com texto, preço materializado, datas e facetas
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.rapel = Category.objects.create(name='Rapel')
+        cls.trilha = Category.objects.create(name='Trilhas')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_adventure(self, title, category, price, difficulty='iniciante', location='Serra Gaúcha', event_in=None):
+        adventure = Adventure.objects.create(
+            title=title,
+            category=category,
+            short_description='Passeio guiado',
+            description='Descrição',
+            difficulty=difficulty,
+            duration_hours=4,
+            location=location,
+            meeting_point='Praça central',
+            base_price=Decimal(price),
+            what_includes='Equipamentos',
+            what_to_bring='Água',
+            safety_requirements='Capacete',
+            main_image='adventures/main/capa.jpg',
+        )
+        if event_in is not None:
+            AdventureEvent.objects.create(
+                adventure=adventure,
+                date=timezone.localdate() + timedelta(days=event_in),
+                start_time=time(8, 0),
+                max_participants=10,
+            )
+        return adventure
+
+    def search(self, **params):
+        adventures, facets = AdventureSearchService.search(
+            Adventure.objects.for_listing().filter(is_active=True),
+            AdventureSearchService.parse_filters(params)
+        )
+        return [adventure.title for adventure in adventures], facets
+
+    def test_listed_price_follows_pricing_tiers(self):
+        adventure = self.create_adventure('Rapel na cachoeira', self.rapel, '150.00')
+        self.assertEqual(Adventure.objects.get(pk=adventure.pk).listed_price, Decimal('150.00'))
+
+        now = timezone.now()
+        tier = PricingTier.objects.create(
+            adventure=adventure, name='Promoção', price=Decimal('99.00'),
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+        )
+        self.assertEqual(Adventure.objects.get(pk=adventure.pk).listed_price, Decimal('99.00'))
+
+        # Faixa encerrada: o comando periódico volta ao preço base
+        PricingTier.objects.filter(pk=tier.pk).update(end_date=now - timedelta(hours=1))
+        self.assertEqual(AdventureSearchService.refresh_prices(), 1)
+        self.assertEqual(AdventureSearchService.refresh_prices(), 0)
+        self.assertEqual(Adventure.objects.get(pk=adventure.pk).listed_price, Decimal('150.00'))
+
+    def test_text_search_ranks_and_ignores_accents(self):
+        self.create_adventure('Trilha do Itaimbezinho', self.trilha, '90.00', location='Cambará do Sul')
+        self.create_adventure('Rapel em Cambará', self.rapel, '200.00')
+        self.create_adventure('Rapel no cânion', self.rapel, '250.00')
+
+        self.assertEqual(self.search(q='cambara')[0], ['Rapel em Cambará', 'Trilha do Itaimbezinho'])
+        self.assertEqual(self.search(q='canion rapel')[0], ['Rapel no cânion'])
+
+    def test_filters_and_facets_cover_every_text_match(self):
+        # Rapéis só casam pela descrição (menos relevantes) e ficam atrás de 1200 trilhas
+        Adventure.objects.bulk_create([
+            Adventure(
+                title=f'{name} {i}', slug=f'{name.lower()}-{i}', category=category,
+                short_description=description, description='-', difficulty='iniciante',
+                duration_hours=4, location='Serra Gaúcha', meeting_point='-', base_price=Decimal('100.00'),
+                listed_price=Decimal('100.00'), what_includes='-', what_to_bring='-', safety_requirements='-',
+                main_image='adventures/main/capa.jpg',
+            )
+            for name, category, description, total in [
+                ('Trilha', self.trilha, 'Passeio guiado', 1200),
+                ('Rapel', self.rapel, 'Descida após a trilha', 5),
+            ]
+            for i in range(total)
+        ])
+        AdventureSearchService.rebuild()
+
+        titles, facets = self.search(q='trilha', category=self.rapel.slug)
+        self.assertEqual(sorted(titles), [f'Rapel {i}' for i in range(5)])
+        self.assertEqual(facets['categories'], {self.trilha.slug: 1200, self.rapel.slug: 5})
+        self.assertEqual(facets['total'], 5)
+
+    def test_filters_and_disjunctive_facets(self):
+        self.create_adventure('Rapel iniciante', self.rapel, '80.00', event_in=5)
+        self.create_adventure('Rapel avançado', self.rapel, '300.00', difficulty='avancado', event_in=40)
+        self.create_adventure('Trilha curta', self.trilha, '120.00')
+
+        titles, facets = self.search(category=self.rapel.slug, sort='price')
+        self.assertEqual(titles, ['Rapel iniciante', 'Rapel avançado'])
+        # A faceta de categoria ignora o próprio filtro
+        self.assertEqual(facets['categories'], {self.rapel.slug: 2, self.trilha.slug: 1})
+        self.assertEqual(facets['difficulties'], {'iniciante': 1, 'avancado': 1})
+        self.assertEqual([price_range['count'] for price_range in facets['price_ranges']], [1, 0, 1, 0])
+        self.assertEqual(facets['total'], 2)
+
+        titles, facets = self.search(min_price='100', max_price='400', sort='-price')
+        self.assertEqual(titles, ['Rapel avançado', 'Trilha curta'])
+        self.assertEqual(self.search(price_range='1')[0], ['Trilha curta'])
+
+        date_to = timezone.localdate() + timedelta(days=10)
+        titles, facets = self.search(date_to=str(date_to))
+        self.assertEqual((titles, facets['total']), (['Rapel iniciante'], 1))
+
+    def test_list_view_renders_facets(self):
+        self.create_adventure('Rapel iniciante', self.rapel, '80.00')
+        response = self.client.get(
+            reverse('adventures:list'),
+            {'q': 'rapel', 'price_range': '0'},
+            HTTP_HOST='localhost'
+        )
+        self.assertContains(response, 'Rapel iniciante')
+        self.assertContains(response, 'Rapel (1)')
+        self.assertEqual(response.context['facets']['total'], 1)
+
+
+class GeoSearchTests(TestCase):
+    """
+    Busca por proximidade com geohash, caixa delimitadora e haversine
+    """
+    # Cambará do Sul
+    ORIGIN = (-29.0478, -50.1445)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Trilhas')
+        cls.places = {
+            'Itaimbezinho': (-29.1700, -50.0800),
+            'Fortaleza': (-29.0600, -49.9400),
+            'Gramado': (-29.3734, -50.8762),
+            'Urubici': (-28.0150, -49.5915),
+            'Sem coordenadas': (None, None),
+        }
+        for title, (lat, lng) in cls.places.items():
+            Adventure.objects.create(
+                title=title,
+                category=cls.category,
+                short_description='Passeio',
+                description='Descrição',
+                difficulty='iniciante',
+                duration_hours=4,
+                location=title,
+                meeting_point='Praça central',
+                base_price=Decimal('100.00'),
+                what_includes='Equipamentos',
+                what_to_bring='Água',
+                safety_requirements='Capacete',
+                main_image='adventures/main/capa.jpg',
+                coordinates_lat=lat,
+                coordinates_lng=lng,
+            )
+
+    def test_geohash_encoding(self):
+        self.assertEqual(geohash.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        adventure = Adventure.objects.get(title='Itaimbezinho')
+        self.assertEqual(adventure.geohash, geohash.encode(-29.17, -50.08, 9))
+        self.assertEqual(Adventure.objects.get(title='Sem coordenadas').geohash, '')
+
+    def test_nearby_filters_by_exact_distance_and_sorts(self):
+        lat, lng = self.ORIGIN
+        results = GeoSearchService.nearby(Adventure.objects.all(), lat, lng, 50)
+        self.assertEqual([adventure.title for adventure in results], ['Itaimbezinho', 'Fortaleza'])
+        self.assertAlmostEqual(results[0].distance_km, 15.0, delta=0.5)
+
+        # Gramado fica a ~72 km: dentro da caixa de 80 km, mas fora do raio de 70 km
+        self.assertNotIn('Gramado', [a.title for a in GeoSearchService.nearby(Adventure.objects.all(), lat, lng, 70)])
+        self.assertEqual(len(GeoSearchService.nearby(Adventure.objects.all(), lat, lng, 500)), 4)
+
+    def test_prefilter_keeps_only_candidates_in_the_box(self):
+        lat, lng = self.ORIGIN
+        prefilter = GeoSearchService.prefilter(lat, lng, 20)
+        self.assertCountEqual(
+            Adventure.objects.filter(prefilter).values_list('title', flat=True),
+            ['Itaimbezinho', 'Fortaleza']
+        )
+
+    def test_prefilter_matches_brute_force_at_the_radius_edge(self):
+        # Pontos de 97% a 103% do raio em todas as direções, também perto do polo
+        for origin, radius in [(self.ORIGIN, 80), ((89.5, 10.0), 50), ((-60.0, 179.9), 300)]:
+            Adventure.objects.filter(location='Borda').delete()
+            adventures = []
+            for bearing in range(0, 360, 15):
+                for factor in (0.97, 0.9995, 1.0005, 1.03):
+                    lat, lng = self.destination(origin, bearing, radius * factor)
+                    lat, lng = Decimal(f'{lat:.8f}'), Decimal(f'{lng:.8f}')
+                    adventures.append(Adventure(
+                        title=f'Borda {origin} {bearing} {factor}',
+                        slug=f'borda-{len(adventures)}',
+                        category=self.category,
+                        short_description='Passeio',
+                        description='Descrição',
+                        difficulty='iniciante',
+                        duration_hours=4,
+                        location='Borda',
+                        meeting_point='Praça central',
+                        base_price=Decimal('100.00'),
+                        what_includes='Equipamentos',
+                        what_to_bring='Água',
+                        safety_requirements='Capacete',
+                        main_image='adventures/main/capa.jpg',
+                        coordinates_lat=lat,
+                        coordinates_lng=lng,
+                        geohash=GeoSearchService.encode_point(lat, lng),
+                    ))
+            Adventure.objects.bulk_create(adventures)
+
+            expected = {
+                pk for pk, lat, lng in Adventure.objects.exclude(coordinates_lat=None).values_list(
+                    'pk', 'coordinates_lat', 'coordinates_lng'
+                )
+                if GeoSearchService.haversine(*origin, float(lat), float(lng)) <= radius
+            }
+            results = GeoSearchService.nearby(Adventure.objects.all(), *origin, radius, limit=1000)
+            self.assertEqual({adventure.pk for adventure in results}, expected, origin)
+            self.assertEqual(sum(adventure.location == 'Borda' for adventure in results), 48)
+
+    @staticmethod
+    def destination(origin, bearing, distance_km):
+        """Ponto a distance_km de origin na direção bearing (graus)"""
+        phi1, lambda1 = map(math.radians, origin)
+        delta = distance_km / GeoSearchService.EARTH_RADIUS_KM
+        theta = math.radians(bearing)
+        phi2 = math.asin(math.sin(phi1) * math.cos(delta) + math.cos(phi1) * math.sin(delta) * math.cos(theta))
+        lambda2 = lambda1 + math.atan2(
+            math.sin(theta) * math.sin(delta) * math.cos(phi1),
+            math.cos(delta) - math.sin(phi1) * math.sin(phi2)
+        )
+        return math.degrees(phi2), (math.degrees(lambda2) + 540) % 360 - 180
+
+    def test_nearby_endpoint(self):
+        url = reverse('adventures:nearby')
+        lat, lng = self.ORIGIN
+        response = self.client.get(url, {'lat': lat, 'lng': lng, 'raio': 30}, HTTP_HOST='localhost')
+        data = response.json()
+        self.assertEqual([adventure['title'] for adventure in data['adventures']], ['Itaimbezinho', 'Fortaleza'])
+        self.assertEqual(data['adventures'][0]['url'], reverse('adventures:detail', args=['itaimbezinho']))
+
+        response = self.client.get(url, {'lat': 'abc', 'lng': lng}, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 400)
+
+
+class AdventurePageCacheTests(TestCase):
+    """
+    Página de detalhes em cache por versão, com cartão de reserva sempre atual
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.adventure = Adventure.objects.create(
+            title='Rapel na cachoeira',
+            category=Category.objects.create(name='Rapel'),
+            short_description='Descida',
+            description='<p>Descrição completa</p>',
+            difficulty='iniciante',
+            duration_hours=4,
+            location='Serra Gaúcha',
+            meeting_point='Praça central',
+            base_price=Decimal('150.00'),
+            what_includes='Equipamentos',
+            what_to_bring='Água',
+            safety_requirements='Capacete',
+            main_image='adventures/main/capa.jpg',
+        )
+        cls.event = AdventureEvent.objects.create(
+            adventure=cls.adventure,
+            date=timezone.localdate() + timedelta(days=7),
+            start_time=time(8, 0),
+            max_participants=10,
+        )
+
+    def setUp(self):
+        cache.clear()
+        SiteConfiguration.clear_cache()
+        SiteConfiguration.get_config()
+        self.url = reverse('adventures:detail', args=[self.adventure.slug])
+
+    def get(self, **headers):
+        return self.client.get(self.url, HTTP_HOST='localhost', **headers)
+
+    def test_cached_page_keeps_booking_card_current(self):
+        first = self.get()
+        self.assertContains(first, '10 restantes')
+        self.assertContains(first, 'R$ 150')
+        self.assertNotContains(first, AdventurePageCache.MARKER)
+
+        # Página em cache: só a aventura e a próxima data do cartão
+        with self.assertNumQueries(2):
+            second = self.get()
+        self.assertEqual(second.content, first.content)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SeatReservationService.hold(self.event, 3)
+        third = self.get()
+        self.assertContains(third, '7 restantes')
+        self.assertNotEqual(third['ETag'], first['ETag'])
+
+    def test_conditional_get_answers_304_without_queries(self):
+        etag = self.get()['ETag']
+        with self.assertNumQueries(0):
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.adventure.title = 'Rapel na cachoeira do Tigre Preto'
+        self.adventure.save()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Rapel na cachoeira do Tigre Preto')
+
+    def test_inactive_adventure_is_not_served_from_cache(self):
+        self.get()
+        self.adventure.is_active = False
+        self.adventure.save()
+        self.assertEqual(self.get().status_code, 404)
 
-# Create your tests here.
+    def test_deploy_check_requires_shared_cache(self):
+        self.assertEqual([warning.id for warning in check_page_cache_backend(None)], ['adventures.W001'])
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache'}}):
+            self.assertEqual(check_page_cache_backend(None), [])
@@ -5,7 +5,9 @@ app_name = 'adventures'
 
 urlpatterns = [
     path('', views.AdventureListView.as_view(), name='list'),
+    path('perto/', views.AdventureNearbyView.as_view(), name='nearby'),
     path('<slug:slug>/', views.AdventureDetailView.as_view(), name='detail'),
+    path('<slug:slug>/calendario/', views.AdventureCalendarView.as_view(), name='calendar'),
     path('categoria/<slug:slug>/', views.CategoryListView.as_view(), name='category'),
     path('admin/adventures/adventure/upload-image/', views.upload_adventure_image, name='upload_adventure_image'),
     path('admin/adventures/adventure/<int:adventure_id>/upload-image/', views.upload_adventure_image, name='upload_adventure_image_with_id'),
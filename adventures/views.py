@@ -1,9 +1,16 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
-from django.views.generic import ListView, DetailView
-from django.http import JsonResponse
+from django.urls import reverse
+from django.views.generic import ListView, DetailView, View
+from django.http import Http404, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.safestring import mark_safe
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.admin.views.decorators import staff_member_required
-from .models import Adventure, Category, AdventureImage
+from content.models import SiteConfiguration
+from .models import Adventure, Category
+from .services import AdventureImageIngestService, AdventurePageCache, AdventureSearchService, GeoSearchService
 import json
 
 
@@ -17,14 +24,34 @@ class AdventureListView(ListView):
     paginate_by = 12
     
     def get_queryset(self):
-        return Adventure.objects.filter(
-            is_active=True, 
-            show_in_listing=True
-        ).select_related('category', 'subcategory').order_by('-is_featured', '-created_at')
+        # Texto, preço, datas e facetas: AdventureSearchService
+        self.filters = AdventureSearchService.parse_filters(self.request.GET)
+        adventures, self.facets = AdventureSearchService.search(
+            Adventure.objects.for_listing().filter(
+                is_active=True, 
+                show_in_listing=True
+            ),
+            self.filters
+        )
+        return adventures
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.filter(is_active=True).order_by('order', 'name')
+        categories = list(Category.objects.filter(is_active=True).order_by('order', 'name'))
+        for category in categories:
+            category.adventure_count = self.facets['categories'].get(category.slug, 0)
+        params = self.request.GET.copy()
+        params.pop('page', None)
+        context.update({
+            'categories': categories,
+            'difficulties': [
+                (value, label, self.facets['difficulties'].get(value, 0))
+                for value, label in Adventure.DIFFICULTY_CHOICES
+            ],
+            'filters': self.filters,
+            'facets': self.facets,
+            'query_string': params.urlencode(),
+        })
         return context
 
 
@@ -42,55 +69,175 @@ class AdventureDetailView(DetailView):
         return Adventure.objects.filter(is_active=True).select_related(
             'category', 'subcategory'
         ).prefetch_related('images', 'pricing_tiers')
+    
+    def get(self, request, *args, **kwargs):
+        # HTML em cache por versão de conteúdo; o cartão de reserva é sempre atual
+        slug = self.kwargs['slug']
+        adventure_id = AdventurePageCache.adventure_id(slug)
+        if adventure_id is None:
+            raise Http404("Aventura não encontrada")
+        site_stamp = self.site_stamp()
+        
+        etag = AdventurePageCache.etag(adventure_id, site_stamp)
+        if etag:
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                response['ETag'] = etag
+                return response
+        
+        key, page = AdventurePageCache.page(adventure_id, site_stamp)
+        queryset = self.get_queryset() if page is None else Adventure.objects.filter(is_active=True)
+        self.object = queryset.filter(pk=adventure_id, slug=slug).first()
+        if self.object is None:
+            AdventurePageCache.invalidate([adventure_id], slug=slug)
+            raise Http404("Aventura não encontrada")
+        if page is None:
+            context = self.get_context_data(object=self.object, booking_card=mark_safe(AdventurePageCache.MARKER))
+            page = render_to_string(self.template_name, context, request)
+            AdventurePageCache.store(key, page)
+        
+        card = render_to_string('adventures/booking_card.html', {'adventure': self.object}, request)
+        response = HttpResponse(page.replace(AdventurePageCache.MARKER, card, 1))
+        # Preço resolvido pelo cartão: o ETag já pode ser calculado
+        etag = AdventurePageCache.etag(adventure_id, site_stamp)
+        if etag:
+            response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+    
+    @staticmethod
+    def site_stamp():
+        """Versão da configuração do site, que também aparece na página"""
+        try:
+            return int(SiteConfiguration.get_config().updated_at.timestamp())
+        except Exception:
+            return 0
 
 
-class CategoryListView(ListView):
+class AdventureCalendarView(View):
     """
-    Lista de aventuras por categoria
+    Datas com vagas abertas de uma aventura (JSON), lidas do índice de disponibilidade
     """
-    model = Adventure
-    template_name = 'adventures/category.html'
-    
-@staff_member_required
-def upload_adventure_image(request, adventure_id=None):
+
+    def get(self, request, *args, **kwargs):
+        from bookings.services import EventAvailabilityService
+
+        adventure = get_object_or_404(Adventure, slug=self.kwargs['slug'], is_active=True)
+        max_days = getattr(settings, 'AVAILABILITY_CALENDAR_DAYS', 90)
+        try:
+            days = min(int(request.GET.get('days', max_days)), max_days)
+        except ValueError:
+            days = max_days
+
+        calendar = EventAvailabilityService.open_dates(adventure, days=days)
+        return JsonResponse({
+            'adventure': adventure.slug,
+            'days': days,
+            'dates': [
+                {
+                    'date': day['date'].isoformat(),
+                    'remaining_spots': day['remaining_spots'],
+                    'events': [
+                        {
+                            'event_id': event['event_id'],
+                            'start_time': event['start_time'].strftime('%H:%M'),
+                            'remaining_spots': event['remaining_spots'],
+                            'price': str(event['price']),
+                        }
+                        for event in day['events']
+                    ],
+                }
+                for day in calendar
+            ],
+        })
+
+
+class AdventureNearbyView(View):
     """
-    View para upload de imagens via AJAX no admin
+    Aventuras mais próximas de um ponto (JSON): ?lat=&lng=&raio=km
     """
-    if request.method != 'POST' or not request.FILES.get('image'):
-        return JsonResponse({'success': False, 'error': 'Método inválido ou nenhuma imagem enviada'})
-    
-    try:
-        # Se não tiver adventure_id, estamos criando uma nova aventura
-        # Neste caso, criamos uma imagem temporária que será associada depois
-        adventure = None
-        if adventure_id:
-            adventure = Adventure.objects.get(id=adventure_id)
-        
-        # Cria a imagem
-        image = AdventureImage(adventure=adventure)
-        image.image = request.FILES['image']
-        image.save()
-        
+
+    def get(self, request, *args, **kwargs):
+        try:
+            lat = float(request.GET['lat'])
+            lng = float(request.GET['lng'])
+            radius_km = float(request.GET.get('raio', settings.GEO_SEARCH_DEFAULT_RADIUS_KM))
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'Informe lat, lng e raio numéricos'}, status=400)
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180 and 0 < radius_km):
+            return JsonResponse({'error': 'Coordenadas ou raio fora dos limites'}, status=400)
+        radius_km = min(radius_km, settings.GEO_SEARCH_MAX_RADIUS_KM)
+
+        adventures = GeoSearchService.nearby(
+            Adventure.objects.filter(is_active=True, show_in_listing=True).select_related('category'),
+            lat,
+            lng,
+            radius_km
+        )
         return JsonResponse({
-            'success': True,
-            'image_id': image.id,
-            'image_url': image.image.url
+            'radius_km': radius_km,
+            'adventures': [
+                {
+                    'slug': adventure.slug,
+                    'title': adventure.title,
+                    'category': adventure.category.name,
+                    'location': adventure.location,
+                    'lat': float(adventure.coordinates_lat),
+                    'lng': float(adventure.coordinates_lng),
+                    'distance_km': round(adventure.distance_km, 1),
+                    'price': str(adventure.listed_price) if adventure.listed_price is not None else None,
+                    'url': reverse('adventures:detail', args=[adventure.slug]),
+                }
+                for adventure in adventures
+            ],
         })
-    except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)})
+
+
+class CategoryListView(ListView):
+    """
+    Lista de aventuras por categoria
+    """
+    model = Adventure
+    template_name = 'adventures/category.html'
     context_object_name = 'adventures'
     paginate_by = 12
     
     def get_queryset(self):
         self.category = get_object_or_404(Category, slug=self.kwargs['slug'], is_active=True)
-        return Adventure.objects.filter(
+        return Adventure.objects.for_listing().filter(
             category=self.category,
             is_active=True,
             show_in_listing=True
-        ).select_related('category', 'subcategory').order_by('-is_featured', '-created_at')
+        ).order_by('-is_featured', '-created_at')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['category'] = self.category
         context['categories'] = Category.objects.filter(is_active=True).order_by('order', 'name')
         return context
+
+
+@staff_member_required
+def upload_adventure_image(request, adventure_id=None):
+    """
+    View para upload de imagens via AJAX no admin (uma ou várias, campo image/images)
+    """
+    files = request.FILES.getlist('images') + request.FILES.getlist('image')
+    if request.method != 'POST' or not files:
+        return JsonResponse({'success': False, 'error': 'Método inválido ou nenhuma imagem enviada'})
+    if not adventure_id:
+        return JsonResponse({'success': False, 'error': 'Salve a aventura antes de enviar as imagens'})
+    
+    adventure = get_object_or_404(Adventure, id=adventure_id)
+    images, errors = AdventureImageIngestService.ingest(adventure, files)
+    response = {
+        'success': bool(images),
+        'images': [{'image_id': image.id, 'image_url': image.image.url} for image in images],
+        'errors': [{'file': name, 'error': error} for name, error in errors],
+    }
+    if images:
+        # Compatibilidade com o envio de uma imagem por vez
+        response.update(response['images'][0])
+    elif errors:
+        response['error'] = errors[0][1]
+    return JsonResponse(response)
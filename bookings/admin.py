@@ -4,12 +4,14 @@ from django.urls import reverse
 from django.utils.safestring import mark_safe
 from .models import (
     AdventureEvent, Booking, AdventureChecklist, UserChecklist,
-    InsuranceInfo, EventDocument, Payment, PreRegistration, WhatsAppMessage
+    InsuranceInfo, EventDocument, Payment, PreRegistration, WhatsAppMessage,
+    SeatHold, EventSchedule
 )
 from users.models import CustomUser
 import random
 import string
 from services.whatsapp import WhatsAppService
+from .services import EventScheduleService, PaymentService
 
 
 @admin.register(AdventureEvent)
@@ -35,7 +37,7 @@ class AdventureEventAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Metadados', {
-            'fields': ('created_by', 'created_at', 'updated_at'),
+            'fields': ('created_by', 'schedule', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         })
     )
@@ -59,6 +61,52 @@ class AdventureEventAdmin(admin.ModelAdmin):
     available_spots_display.short_description = 'Vagas Disponíveis'
 
 
+@admin.register(EventSchedule)
+class EventScheduleAdmin(admin.ModelAdmin):
+    list_display = ['adventure', 'rrule', 'start_time', 'starts_on', 'ends_on', 'is_active', 'generated_until']
+    list_filter = ['is_active', 'adventure']
+    search_fields = ['adventure__title', 'rrule']
+    readonly_fields = ['generated_until', 'created_at', 'updated_at']
+    actions = ['generate_events', 'preview_events']
+
+    fieldsets = (
+        ('Recorrência', {
+            'fields': ('adventure', 'rrule', 'exception_dates', 'starts_on', 'ends_on', 'is_active')
+        }),
+        ('Eventos Gerados', {
+            'fields': ('start_time', 'end_time', 'max_participants', 'custom_price', 'meeting_instructions')
+        }),
+        ('Metadados', {
+            'fields': ('generated_until', 'created_by', 'created_at', 'updated_at'),
+            'classes': ('collapse',)
+        })
+    )
+
+    def save_model(self, request, obj, form, change):
+        if not obj.created_by_id:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+    def generate_events(self, request, queryset):
+        result = EventScheduleService.generate(queryset)
+        self.message_user(
+            request,
+            f"{result['created']} eventos criados, {result['updated']} atualizados e "
+            f"{result['cancelled']} cancelados ({result['existing']} já existiam)."
+        )
+    generate_events.short_description = 'Gerar eventos das agendas selecionadas'
+
+    def preview_events(self, request, queryset):
+        result = EventScheduleService.generate(queryset, dry_run=True)
+        self.message_user(
+            request,
+            f"Simulação: {result['created']} eventos seriam criados, {result['updated']} atualizados e "
+            f"{result['cancelled']} cancelados ({result['existing']} já existem).",
+            level=messages.INFO
+        )
+    preview_events.short_description = 'Simular geração (sem gravar)'
+
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ['user', 'event', 'status', 'created_at']
@@ -66,6 +114,14 @@ class BookingAdmin(admin.ModelAdmin):
     search_fields = ['user__email', 'user__first_name', 'user__last_name']
 
 
+@admin.register(SeatHold)
+class SeatHoldAdmin(admin.ModelAdmin):
+    list_display = ['event', 'booking', 'user', 'seats', 'expires_at', 'created_at']
+    list_filter = ['expires_at', 'event__adventure']
+    search_fields = ['event__adventure__title', 'user__email']
+    readonly_fields = ['created_at']
+
+
 @admin.register(PreRegistration)
 class PreRegistrationAdmin(admin.ModelAdmin):
     list_display = ['first_name', 'last_name', 'email', 'phone', 'cpf', 'status', 'created_at']
@@ -155,27 +211,22 @@ class PaymentAdmin(admin.ModelAdmin):
     actions = ['approve_payments', 'reject_payments']
     
     def approve_payments(self, request, queryset):
-        from django.utils import timezone
-        count = 0
-        for payment in queryset.filter(status__in=['pending', 'processing']):
-            payment.status = 'approved'
-            payment.processed_at = timezone.now()
-            payment.save()
-            
-            # Atualizar booking
-            booking = payment.booking
-            booking.payment_status = 'paid'
-            booking.status = 'approved'
-            booking.save()
-            
-            count += 1
-        
-        self.message_user(request, f'{count} pagamentos foram aprovados.')
+        # Transição em lote: as consultas crescem com o número de eventos, não de pagamentos
+        approved = PaymentService.approve_payments(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'{len(approved)} pagamentos foram aprovados.')
+        # Pendentes que sobraram: a reserva não cabe mais no evento
+        full = queryset.exclude(pk__in=approved).filter(status__in=['pending', 'processing']).count()
+        if full:
+            self.message_user(
+                request,
+                f'{full} pagamentos continuam pendentes: o evento não tem mais vagas.',
+                messages.WARNING
+            )
     approve_payments.short_description = 'Aprovar pagamentos selecionados'
     
     def reject_payments(self, request, queryset):
-        count = queryset.filter(status__in=['pending', 'processing']).update(status='rejected')
-        self.message_user(request, f'{count} pagamentos foram rejeitados.')
+        rejected = PaymentService.reject_payments(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'{len(rejected)} pagamentos foram rejeitados.')
     reject_payments.short_description = 'Rejeitar pagamentos selecionados'
 
 
@@ -188,7 +239,11 @@ class WhatsAppMessageAdmin(admin.ModelAdmin):
     list_filter = ['message_type', 'status', 'created_at']
     search_fields = ['recipient_name', 'phone_number']
     ordering = ['-created_at']
-    readonly_fields = ['created_at', 'sent_at', 'delivered_at']
+    readonly_fields = [
+        'created_at', 'sent_at', 'delivered_at',
+        'attempts', 'next_attempt_at', 'last_error'
+    ]
+    actions = ['retry_messages']
     
     fieldsets = (
         ('Destinatário', {
@@ -204,8 +259,19 @@ class WhatsAppMessageAdmin(admin.ModelAdmin):
         ('Status', {
             'fields': ('status', 'created_at', 'sent_at', 'delivered_at'),
             'classes': ('collapse',)
+        }),
+        ('Fila de Envio', {
+            'fields': ('attempts', 'next_attempt_at', 'last_error'),
+            'classes': ('collapse',)
         })
     )
+    
+    def retry_messages(self, request, queryset):
+        count = queryset.filter(status='failed').update(
+            status='pending', attempts=0, next_attempt_at=None
+        )
+        self.message_user(request, f'{count} mensagens voltaram para a fila de envio.')
+    retry_messages.short_description = 'Reenviar mensagens com falha'
 
 
 @admin.register(AdventureChecklist)
@@ -0,0 +1,64 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.models import Payment
+from bookings.services import PaymentService
+
+
+class Command(BaseCommand):
+    help = (
+        'Aprova (ou rejeita) pagamentos em lote, por ID ou pelos IDs externos de uma '
+        'conciliação bancária, com as reservas, vagas e confirmações atualizadas de uma vez'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('payment_ids', nargs='*', type=int, help='IDs dos pagamentos')
+        parser.add_argument(
+            '--external-ids',
+            metavar='ARQUIVO',
+            help='Arquivo com um external_payment_id por linha ("-" para a entrada padrão)'
+        )
+        parser.add_argument('--reject', action='store_true', help='Rejeita em vez de aprovar')
+        parser.add_argument('--batch-size', type=int, default=500, help='Pagamentos por transação')
+
+    def handle(self, *args, **options):
+        payment_ids = list(options['payment_ids'])
+        if options['external_ids']:
+            payment_ids += self.read_external_ids(options['external_ids'])
+        if not payment_ids:
+            raise CommandError('Informe IDs de pagamentos ou --external-ids')
+
+        transition = PaymentService.reject_payments if options['reject'] else PaymentService.approve_payments
+        changed = set()
+        for offset in range(0, len(payment_ids), options['batch_size']):
+            changed.update(transition(payment_ids[offset:offset + options['batch_size']]))
+
+        # Pendentes que sobraram na aprovação: a reserva não cabe mais no evento
+        full = Payment.objects.filter(
+            pk__in=set(payment_ids) - changed,
+            status__in=['pending', 'processing']
+        ).count()
+        skipped = len(set(payment_ids)) - len(changed) - full
+        action = 'rejeitados' if options['reject'] else 'aprovados'
+        self.stdout.write(f'{skipped} pagamentos ignorados (não estavam pendentes).')
+        if full:
+            self.stdout.write(self.style.WARNING(
+                f'{full} pagamentos continuam pendentes: o evento não tem mais vagas.'
+            ))
+        self.stdout.write(self.style.SUCCESS(f'✅ {len(changed)} pagamentos {action}.'))
+
+    def read_external_ids(self, path):
+        try:
+            file = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        except OSError as e:
+            raise CommandError(str(e))
+        with file:
+            external_ids = {line.strip() for line in file if line.strip()}
+        found = dict(Payment.objects.filter(
+            external_payment_id__in=external_ids
+        ).values_list('external_payment_id', 'pk'))
+        missing = external_ids - set(found)
+        if missing:
+            self.stdout.write(self.style.WARNING(f'{len(missing)} IDs externos sem pagamento: {", ".join(sorted(missing)[:10])}'))
+        return list(found.values())
@@ -0,0 +1,102 @@
+import time
+import uuid
+from datetime import timedelta, time as dt_time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from adventures.models import Adventure, Category
+from bookings.models import AdventureEvent, EventSchedule
+from bookings.services import EventScheduleService
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera uma temporada de eventos pelas agendas recorrentes (bulk) e compara com '
+        'a criação evento a evento'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=100000, help='Eventos gerados pelas agendas')
+        parser.add_argument('--adventures', type=int, default=200, help='Aventuras com agenda diária')
+        parser.add_argument('--sample', type=int, default=1000, help='Eventos criados um a um para comparação')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        today = timezone.localdate()
+        days = -(-options['events'] // options['adventures'])
+        until = today + timedelta(days=days - 1)
+        category = Category.objects.create(name=f'Benchmark {tag}')
+        try:
+            adventures = [self.create_adventure(category, f'{tag} {i}') for i in range(options['adventures'] + 1)]
+            baseline = adventures.pop()
+            EventSchedule.objects.bulk_create([
+                EventSchedule(
+                    adventure=adventure,
+                    rrule='FREQ=DAILY',
+                    starts_on=today,
+                    ends_on=until,
+                    start_time=dt_time(8, 0),
+                    max_participants=12,
+                )
+                for adventure in adventures
+            ])
+            schedules = EventSchedule.objects.filter(adventure__category=category)
+
+            started = time.perf_counter()
+            result = EventScheduleService.generate(schedules, until=until, dry_run=True)
+            self.stdout.write(f'Simulação: {result["created"]} eventos em {time.perf_counter() - started:.2f}s')
+
+            started = time.perf_counter()
+            result = EventScheduleService.generate(schedules, until=until)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'Geração: {result["created"]} eventos em {elapsed:.2f}s '
+                f'({result["created"] / elapsed:,.0f} eventos/s, índice de disponibilidade incluído)'
+            )
+
+            started = time.perf_counter()
+            result = EventScheduleService.generate(schedules, until=until)
+            self.stdout.write(
+                f'Nova geração (idempotente): {result["created"]} novos, {result["existing"]} existentes '
+                f'em {time.perf_counter() - started:.2f}s'
+            )
+
+            started = time.perf_counter()
+            with transaction.atomic():
+                for i in range(options['sample']):
+                    AdventureEvent.objects.create(
+                        adventure=baseline,
+                        date=today + timedelta(days=i),
+                        start_time=dt_time(8, 0),
+                        max_participants=12,
+                    )
+            per_event = (time.perf_counter() - started) / options['sample']
+            self.stdout.write(
+                f'Um a um: {1 / per_event:,.0f} eventos/s '
+                f'(estimativa para {options["events"]}: {per_event * options["events"]:.1f}s)'
+            )
+        finally:
+            Adventure.objects.filter(category=category).delete()
+            category.delete()
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark concluído'))
+
+    def create_adventure(self, category, name):
+        return Adventure.objects.create(
+            title=f'Benchmark {name}',
+            category=category,
+            short_description='-',
+            description='-',
+            difficulty='iniciante',
+            duration_hours=4,
+            location='-',
+            meeting_point='-',
+            base_price=Decimal('100.00'),
+            what_includes='-',
+            what_to_bring='-',
+            safety_requirements='-',
+            main_image='adventures/main/benchmark.jpg',
+        )
@@ -0,0 +1,75 @@
+import base64
+import io
+import json
+import tempfile
+import time
+
+import qrcode
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from bookings.services import PIXQRCodeStore, PIXService
+
+
+class Command(BaseCommand):
+    help = 'Compara a geração de QR Codes PIX em data-URI (antiga) com o cache em disco'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=500, help='Pagamentos simulados')
+
+    def handle(self, *args, **options):
+        payloads = [
+            json.dumps({
+                'key': PIXService.PIX_KEY,
+                'amount': 150.0 + i,
+                'description': f"Pagamento Aventura - Booking #{i}",
+                'identifier': f"PAY{i:06d}"
+            })
+            for i in range(options['payments'])
+        ]
+
+        self.report('data-URI PNG (antigo)', payloads, self.legacy_data_uri)
+
+        with tempfile.TemporaryDirectory() as root, override_settings(PIX_QR_ROOT=root):
+            for image_format in ('png', 'svg'):
+                def store(payload):
+                    name = PIXQRCodeStore.store(payload, image_format)
+                    return name, PIXQRCodeStore.path(name)
+
+                self.report(f'{image_format} em disco (frio)', payloads, store)
+                self.report(f'{image_format} em disco (cache)', payloads, store)
+
+    def report(self, label, payloads, generate):
+        row_bytes = file_bytes = 0
+        started = time.perf_counter()
+        for payload in payloads:
+            result = generate(payload)
+            if isinstance(result, tuple):
+                name, path = result
+                row_bytes += len(name)
+                with open(path, 'rb') as image:
+                    file_bytes += len(image.read())
+            else:
+                row_bytes += len(result)
+        elapsed = time.perf_counter() - started
+
+        count = len(payloads)
+        self.stdout.write(
+            f'{label:<28} {count / elapsed:>9.1f} pagamentos/s   '
+            f'{row_bytes // count:>6} bytes/linha   {file_bytes // count:>6} bytes/arquivo'
+        )
+
+    @staticmethod
+    def legacy_data_uri(payload):
+        # Implementação anterior: PNG box_size 10 em base64 gravado na linha
+        qr = qrcode.QRCode(
+            version=1,
+            error_correction=qrcode.constants.ERROR_CORRECT_L,
+            box_size=10,
+            border=4,
+        )
+        qr.add_data(payload)
+        qr.make(fit=True)
+        buffer = io.BytesIO()
+        qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+        return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
@@ -0,0 +1,101 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta, time as dt_time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from adventures.models import Adventure, Category
+from bookings.models import AdventureEvent, Booking, SeatHold
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Dispara inscrições paralelas (BookingCreateView) em um único evento e verifica overbooking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Total de inscrições disparadas')
+        parser.add_argument('--seats', type=int, default=50, help='Vagas do evento')
+        parser.add_argument('--workers', type=int, default=32, help='Threads simultâneas')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name=f'Benchmark {tag}')
+        adventure = Adventure.objects.create(
+            title=f'Benchmark {tag}',
+            category=category,
+            short_description='Evento de benchmark',
+            description='-',
+            difficulty='iniciante',
+            duration_hours=1,
+            location='-',
+            meeting_point='-',
+            base_price=Decimal('100.00'),
+            what_includes='-',
+            what_to_bring='-',
+            safety_requirements='-',
+            main_image='adventures/main/benchmark.jpg',
+        )
+        event = AdventureEvent.objects.create(
+            adventure=adventure,
+            date=timezone.now().date() + timedelta(days=30),
+            start_time=dt_time(8, 0),
+            max_participants=options['seats'],
+        )
+        users = User.objects.bulk_create([
+            User(
+                username=f'bench-{tag}-{i}',
+                email=f'bench-{tag}-{i}@example.com',
+                first_name='Bench',
+                last_name=str(i),
+            )
+            for i in range(options['requests'])
+        ])
+        users = list(User.objects.filter(username__startswith=f'bench-{tag}-'))
+        url = reverse('bookings:create', kwargs={'event_id': event.id})
+
+        # Login feito antes, para medir apenas as inscrições concorrentes
+        clients = []
+        for user in users:
+            client = Client(raise_request_exception=False, HTTP_HOST='localhost')
+            client.force_login(user)
+            clients.append(client)
+
+        def post(client):
+            try:
+                return client.post(url).status_code
+            except Exception:
+                return 500
+            finally:
+                connections.close_all()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                status_codes = list(executor.map(post, clients))
+            elapsed = time.perf_counter() - started
+
+            event.refresh_from_db()
+            bookings = Booking.objects.filter(event=event).count()
+            held = SeatHold.objects.filter(event=event).count()
+            errors = sum(1 for code in status_codes if code >= 400)
+
+            self.stdout.write(f'Requisições: {len(status_codes)} em {elapsed:.2f}s ({len(status_codes) / elapsed:.1f} req/s)')
+            self.stdout.write(f'Reservas criadas: {bookings} | Vagas bloqueadas: {held} | Erros: {errors}')
+            self.stdout.write(f'Participantes atuais: {event.current_participants}/{event.max_participants}')
+
+            if event.current_participants > event.max_participants or bookings > event.max_participants:
+                self.stdout.write(self.style.ERROR('❌ Overbooking detectado!'))
+            else:
+                self.stdout.write(self.style.SUCCESS('✅ Nenhum overbooking.'))
+        finally:
+            adventure.delete()
+            category.delete()
+            User.objects.filter(username__startswith=f'bench-{tag}-').delete()
@@ -0,0 +1,62 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from bookings.models import EventSchedule
+from bookings.services import EventScheduleService
+
+
+class Command(BaseCommand):
+    help = 'Gera os eventos das agendas recorrentes até o horizonte configurado (executar periodicamente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schedule', type=int, action='append', help='ID da agenda (pode repetir)')
+        parser.add_argument('--until', help='Última data gerada (AAAA-MM-DD)')
+        parser.add_argument('--days', type=int, help='Dias à frente a gerar (em vez de EVENT_SCHEDULE_HORIZON_DAYS)')
+        parser.add_argument('--dry-run', action='store_true', help='Só mostra o que seria criado, atualizado ou cancelado')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Eventos por INSERT')
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Fica em execução contínua, gerando a cada intervalo'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=3600,
+            help='Segundos entre as gerações (com --loop)'
+        )
+
+    def handle(self, *args, **options):
+        until = parse_date(options['until']) if options['until'] else None
+        if options['until'] and until is None:
+            raise CommandError('Data inválida em --until (use AAAA-MM-DD)')
+
+        try:
+            while True:
+                if options['days'] is not None:
+                    until = timezone.localdate() + timedelta(days=options['days'])
+                schedules = EventSchedule.objects.all()
+                if options['schedule']:
+                    schedules = schedules.filter(pk__in=options['schedule'])
+                result = EventScheduleService.generate(
+                    schedules,
+                    until=until,
+                    dry_run=options['dry_run'],
+                    batch_size=options['batch_size']
+                )
+                prefix = '[dry-run] ' if options['dry_run'] else ''
+                self.stdout.write(
+                    f"{prefix}{result['created']} eventos novos, {result['updated']} atualizados, "
+                    f"{result['cancelled']} cancelados, {result['existing']} já existentes."
+                )
+                if not options['loop'] or options['dry_run']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS('✅ Agendas recorrentes processadas.'))
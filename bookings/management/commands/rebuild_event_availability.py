@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from bookings.services import EventAvailabilityService
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de disponibilidade dos eventos usado pelo calendário'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Eventos por lote')
+
+    def handle(self, *args, **options):
+        total = EventAvailabilityService.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} eventos indexados'))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from bookings.services import PaymentService
+
+
+class Command(BaseCommand):
+    help = 'Concilia os pagamentos PIX pendentes com o provedor configurado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Pagamentos por consulta ao provedor')
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Fica em execução contínua, conciliando a cada intervalo'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10,
+            help='Segundos entre as conciliações (com --loop)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                approved, rejected = PaymentService.reconcile_pix_payments(options['batch_size'])
+                if approved or rejected:
+                    self.stdout.write(f'{approved} pagamentos aprovados, {rejected} rejeitados.')
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS('✅ Conciliação PIX concluída.'))
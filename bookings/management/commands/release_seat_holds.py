@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from bookings.models import AdventureEvent
+from bookings.services import SeatReservationService
+
+
+class Command(BaseCommand):
+    help = 'Libera as vagas de bloqueios expirados (executar periodicamente via cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Recalcula o contador de participantes de todos os eventos ativos'
+        )
+
+    def handle(self, *args, **options):
+        released = SeatReservationService.release_expired_holds()
+        self.stdout.write(f'{released} vagas liberadas de bloqueios expirados.')
+
+        if options['recount']:
+            events = AdventureEvent.objects.filter(is_active=True)
+            for event in events:
+                SeatReservationService.recount(event)
+            self.stdout.write(f'{events.count()} eventos recontados.')
+
+        self.stdout.write(self.style.SUCCESS('✅ Concluído!'))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from bookings.services import WhatsAppOutbox
+
+
+class Command(BaseCommand):
+    help = 'Envia as mensagens WhatsApp pendentes em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Mensagens por lote')
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Fica em execução contínua, aguardando novas mensagens'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Segundos de espera quando a fila está vazia (com --loop)'
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                processed = WhatsAppOutbox.process_batch(options['batch_size'])
+                total += processed
+                if processed:
+                    self.stdout.write(f'{processed} mensagens processadas.')
+                elif not options['loop']:
+                    break
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} mensagens processadas no total.'))
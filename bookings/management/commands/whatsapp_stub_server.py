@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from bookings.whatsapp_stub import WhatsAppStubServer
+
+
+class Command(BaseCommand):
+    help = 'Inicia um servidor local que imita a API do WhatsApp (desenvolvimento/testes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8025, help='Porta do servidor')
+        parser.add_argument('--status', default='sent', help='Status devolvido para cada mensagem')
+        parser.add_argument(
+            '--fail-rate',
+            type=float,
+            default=0.0,
+            help='Fração de requisições respondidas com erro 503 (0 a 1)'
+        )
+
+    def handle(self, *args, **options):
+        server = WhatsAppStubServer(
+            port=options['port'],
+            status=options['status'],
+            fail_rate=options['fail_rate']
+        )
+        self.stdout.write(f'Servidor WhatsApp de teste em {server.url}')
+        self.stdout.write(f'Use WHATSAPP_API_URL={server.url}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
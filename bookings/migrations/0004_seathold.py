@@ -0,0 +1,38 @@
+# Generated by Django 3.2.18 on 2026-10-17 12:26
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0003_payment_preregistration_whatsappmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seats', models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Vagas')),
+                ('expires_at', models.DateTimeField(verbose_name='Expira em')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='seat_hold', to='bookings.booking', verbose_name='Reserva')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_holds', to='bookings.adventureevent', verbose_name='Evento')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='seat_holds', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Bloqueio de Vaga',
+                'verbose_name_plural': 'Bloqueios de Vagas',
+                'ordering': ['expires_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='seathold',
+            index=models.Index(fields=['event', 'expires_at'], name='bookings_se_event_i_9fcfc8_idx'),
+        ),
+    ]
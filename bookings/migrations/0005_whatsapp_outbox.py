@@ -0,0 +1,37 @@
+# Generated by Django 3.2.18 on 2026-10-17 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_seathold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='whatsappmessage',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Tentativas'),
+        ),
+        migrations.AddField(
+            model_name='whatsappmessage',
+            name='last_error',
+            field=models.TextField(blank=True, verbose_name='Último Erro'),
+        ),
+        migrations.AddField(
+            model_name='whatsappmessage',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Próxima Tentativa'),
+        ),
+        migrations.AlterField(
+            model_name='whatsappmessage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pendente'), ('sending', 'Enviando'), ('sent', 'Enviado'), ('delivered', 'Entregue'), ('read', 'Lido'), ('failed', 'Falhou')], default='pending', max_length=20, verbose_name='Status'),
+        ),
+        migrations.AddIndex(
+            model_name='whatsappmessage',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='bookings_wh_status_e4c858_idx'),
+        ),
+    ]
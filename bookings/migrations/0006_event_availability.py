@@ -0,0 +1,63 @@
+# Generated by Django 3.2.18 on 2026-10-17 13:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+
+
+def build_availability(apps, schema_editor):
+    # Índice inicial com os eventos já cadastrados
+    AdventureEvent = apps.get_model('bookings', 'AdventureEvent')
+    EventAvailability = apps.get_model('bookings', 'EventAvailability')
+    rows = []
+    for event in AdventureEvent.objects.iterator():
+        closes_at = event.registration_deadline or timezone.make_aware(
+            datetime.combine(event.date + timedelta(days=1), time.min)
+        )
+        rows.append(EventAvailability(
+            event_id=event.pk,
+            adventure_id=event.adventure_id,
+            date=event.date,
+            start_time=event.start_time,
+            remaining_spots=event.max_participants - event.current_participants,
+            custom_price=event.custom_price,
+            is_open=event.is_active and event.status == 'scheduled',
+            closes_at=closes_at,
+        ))
+    EventAvailability.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0001_initial'),
+        ('bookings', '0005_whatsapp_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventAvailability',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='availability', serialize=False, to='bookings.adventureevent', verbose_name='Evento')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('start_time', models.TimeField(verbose_name='Horário de Início')),
+                ('remaining_spots', models.IntegerField(default=0, verbose_name='Vagas Restantes')),
+                ('custom_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Preço Personalizado')),
+                ('is_open', models.BooleanField(default=False, verbose_name='Aberto')),
+                ('closes_at', models.DateTimeField(verbose_name='Inscrições até')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('adventure', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='adventures.adventure', verbose_name='Aventura')),
+            ],
+            options={
+                'verbose_name': 'Disponibilidade de Evento',
+                'verbose_name_plural': 'Disponibilidade dos Eventos',
+                'ordering': ['date', 'start_time'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='eventavailability',
+            index=models.Index(fields=['adventure', 'is_open', 'date'], name='availability_calendar_idx'),
+        ),
+        migrations.RunPython(build_availability, migrations.RunPython.noop),
+    ]
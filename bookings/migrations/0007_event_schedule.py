@@ -0,0 +1,48 @@
+# Generated by Django 3.2.18 on 2026-10-17 13:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0003_adventure_geohash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0006_event_availability'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rrule', models.CharField(help_text='RRULE do RFC 5545, ex.: FREQ=WEEKLY;BYDAY=SA,SU ou FREQ=MONTHLY;BYDAY=1SA', max_length=255, verbose_name='Regra de Recorrência')),
+                ('exception_dates', models.TextField(blank=True, help_text='Datas sem evento, uma por linha (AAAA-MM-DD)', verbose_name='Datas de Exceção')),
+                ('starts_on', models.DateField(verbose_name='Início da Agenda')),
+                ('ends_on', models.DateField(blank=True, help_text='Deixe em branco para gerar sempre até o horizonte configurado', null=True, verbose_name='Fim da Agenda')),
+                ('start_time', models.TimeField(verbose_name='Horário de Início')),
+                ('end_time', models.TimeField(blank=True, null=True, verbose_name='Horário de Término')),
+                ('max_participants', models.PositiveIntegerField(verbose_name='Máximo de Participantes')),
+                ('custom_price', models.DecimalField(blank=True, decimal_places=2, help_text='Deixe em branco para usar o preço da aventura', max_digits=10, null=True, verbose_name='Preço Personalizado')),
+                ('meeting_instructions', models.TextField(blank=True, verbose_name='Instruções de Encontro')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Ativa')),
+                ('generated_until', models.DateField(blank=True, editable=False, null=True, verbose_name='Eventos Gerados Até')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('adventure', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='adventures.adventure', verbose_name='Aventura')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_schedules', to=settings.AUTH_USER_MODEL, verbose_name='Criado por')),
+            ],
+            options={
+                'verbose_name': 'Agenda Recorrente',
+                'verbose_name_plural': 'Agendas Recorrentes',
+                'ordering': ['adventure', 'start_time'],
+            },
+        ),
+        migrations.AddField(
+            model_name='adventureevent',
+            name='schedule',
+            field=models.ForeignKey(blank=True, help_text='Agenda recorrente que gerou o evento', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='bookings.eventschedule', verbose_name='Agenda'),
+        ),
+    ]
@@ -1,9 +1,12 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from django.urls import reverse
 
+from . import recurrence
+
 
 User = get_user_model()
 
@@ -90,6 +93,15 @@ class AdventureEvent(models.Model):
         related_name='created_events',
         verbose_name="Criado por"
     )
+    schedule = models.ForeignKey(
+        'EventSchedule',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='events',
+        verbose_name="Agenda",
+        help_text="Agenda recorrente que gerou o evento"
+    )
     
     class Meta:
         verbose_name = "Evento de Aventura"
@@ -129,6 +141,166 @@ class AdventureEvent(models.Model):
             return self.custom_price
         return self.adventure.current_price
 
+    def save(self, *args, **kwargs):
+        from django.db import transaction
+        from .services import EventAvailabilityService
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            EventAvailabilityService.sync_events([self.pk])
+
+
+class EventAvailability(models.Model):
+    """
+    Índice de disponibilidade do calendário: uma linha por evento com vagas
+    restantes, preço e janela de inscrição já calculados.
+    Mantido pelo EventAvailabilityService; não editar manualmente.
+    """
+    event = models.OneToOneField(
+        AdventureEvent,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='availability',
+        verbose_name="Evento"
+    )
+    adventure = models.ForeignKey(
+        'adventures.Adventure',
+        on_delete=models.CASCADE,
+        related_name='availability',
+        verbose_name="Aventura"
+    )
+    date = models.DateField(verbose_name="Data")
+    start_time = models.TimeField(verbose_name="Horário de Início")
+    remaining_spots = models.IntegerField(default=0, verbose_name="Vagas Restantes")
+    custom_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Preço Personalizado"
+    )
+    # Evento ativo e agendado; o prazo fica em closes_at
+    is_open = models.BooleanField(default=False, verbose_name="Aberto")
+    closes_at = models.DateTimeField(verbose_name="Inscrições até")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Disponibilidade de Evento"
+        verbose_name_plural = "Disponibilidade dos Eventos"
+        ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['adventure', 'is_open', 'date'], name='availability_calendar_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} - {self.date} ({self.remaining_spots} vagas)"
+
+
+class EventSchedule(models.Model):
+    """
+    Agenda recorrente de uma aventura: uma regra RRULE (RFC 5545) e datas de
+    exceção, expandidas em AdventureEvent pelo EventScheduleService
+    """
+    adventure = models.ForeignKey(
+        'adventures.Adventure',
+        on_delete=models.CASCADE,
+        related_name='schedules',
+        verbose_name="Aventura"
+    )
+    rrule = models.CharField(
+        max_length=255,
+        verbose_name="Regra de Recorrência",
+        help_text="RRULE do RFC 5545, ex.: FREQ=WEEKLY;BYDAY=SA,SU ou FREQ=MONTHLY;BYDAY=1SA"
+    )
+    exception_dates = models.TextField(
+        blank=True,
+        verbose_name="Datas de Exceção",
+        help_text="Datas sem evento, uma por linha (AAAA-MM-DD)"
+    )
+    starts_on = models.DateField(verbose_name="Início da Agenda")
+    ends_on = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name="Fim da Agenda",
+        help_text="Deixe em branco para gerar sempre até o horizonte configurado"
+    )
+
+    # Valores copiados para cada evento gerado
+    start_time = models.TimeField(verbose_name="Horário de Início")
+    end_time = models.TimeField(
+        null=True,
+        blank=True,
+        verbose_name="Horário de Término"
+    )
+    max_participants = models.PositiveIntegerField(verbose_name="Máximo de Participantes")
+    custom_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Preço Personalizado",
+        help_text="Deixe em branco para usar o preço da aventura"
+    )
+    meeting_instructions = models.TextField(
+        blank=True,
+        verbose_name="Instruções de Encontro"
+    )
+
+    is_active = models.BooleanField(default=True, verbose_name="Ativa")
+    generated_until = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Eventos Gerados Até"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='created_schedules',
+        verbose_name="Criado por"
+    )
+
+    class Meta:
+        verbose_name = "Agenda Recorrente"
+        verbose_name_plural = "Agendas Recorrentes"
+        ordering = ['adventure', 'start_time']
+
+    def __str__(self):
+        return f"{self.adventure.title} - {self.rrule} às {self.start_time.strftime('%H:%M')}"
+
+    def clean(self):
+        errors = {}
+        try:
+            recurrence.parse(self.rrule)
+        except ValueError as error:
+            errors['rrule'] = str(error)
+        try:
+            recurrence.parse_dates(self.exception_dates)
+        except ValueError as error:
+            errors['exception_dates'] = str(error)
+        if self.ends_on and self.starts_on and self.ends_on < self.starts_on:
+            errors['ends_on'] = "O fim da agenda deve ser depois do início"
+        if errors:
+            raise ValidationError(errors)
+
+    def occurrences(self, start, end):
+        """
+        Datas da agenda entre start e end (inclusive), sem as exceções
+        """
+        if self.ends_on:
+            end = min(end, self.ends_on)
+        return recurrence.between(
+            recurrence.parse(self.rrule),
+            self.starts_on,
+            max(start, self.starts_on),
+            end,
+            recurrence.parse_dates(self.exception_dates)
+        )
+
 
 class Booking(models.Model):
     """
@@ -149,6 +321,9 @@ class Booking(models.Model):
         ('refunded', 'Reembolsado'),
     ]
     
+    # Status que ocupam vagas no evento
+    SEAT_STATUSES = ['approved']
+    
     # Relacionamentos principais
     user = models.ForeignKey(
         User, 
@@ -241,23 +416,57 @@ class Booking(models.Model):
         ordering = ['-created_at']
         unique_together = ['user', 'event']
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Vagas ocupadas no momento do carregamento, para calcular a diferença no save
+        self._seats_taken = self.seats_taken if self.pk else 0
+        # Status no carregamento, para as estatísticas do usuário
+        self._loaded_status = self.status if self.pk else None
+
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.event}"
-    
+
+    def clean(self):
+        from .services import SeatReservationService
+
+        # Aprovação pelo admin: erro no formulário em vez de SeatUnavailableError no save
+        if self.event_id and self.participants_count:
+            missing = SeatReservationService.missing_seats(self)
+            if missing:
+                raise ValidationError({
+                    'status': f"O evento não tem vagas para esta reserva (faltam {missing})."
+                })
+
+    @property
+    def seats_taken(self):
+        """Vagas que esta reserva ocupa no evento"""
+        if self.status in self.SEAT_STATUSES:
+            return self.participants_count
+        return 0
+
     def save(self, *args, **kwargs):
+        from django.db import transaction
+        from .services import SeatReservationService
+
         # Calcular preço total se não foi definido
         if not self.total_price:
             self.total_price = self.event.final_price * self.participants_count
-        super().save(*args, **kwargs)
-        
-        # Atualizar contagem de participantes do evento
-        self.event.current_participants = self.event.bookings.filter(
-            status='approved'
-        ).aggregate(
-            total=models.Sum('participants_count')
-        )['total'] or 0
-        self.event.save(update_fields=['current_participants'])
-    
+
+        # Atualizar vagas do evento de forma atômica (sem recontagem)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            SeatReservationService.sync_booking(self, self._seats_taken)
+        self._seats_taken = self.seats_taken
+        self._loaded_status = self.status
+
+    def delete(self, *args, **kwargs):
+        from django.db import transaction
+        from .services import SeatReservationService
+
+        with transaction.atomic():
+            SeatReservationService.release_booking(self)
+            return super().delete(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse('booking_detail', kwargs={'pk': self.pk})
     
@@ -285,6 +494,56 @@ class Booking(models.Model):
         return timezone.now() < (event_datetime - timezone.timedelta(hours=24))
 
 
+class SeatHold(models.Model):
+    """
+    Bloqueio temporário de vagas enquanto a inscrição não é aprovada
+    """
+    event = models.ForeignKey(
+        AdventureEvent,
+        on_delete=models.CASCADE,
+        related_name='seat_holds',
+        verbose_name="Evento"
+    )
+    booking = models.OneToOneField(
+        Booking,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='seat_hold',
+        verbose_name="Reserva"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='seat_holds',
+        verbose_name="Usuário"
+    )
+    seats = models.PositiveIntegerField(
+        default=1,
+        validators=[MinValueValidator(1)],
+        verbose_name="Vagas"
+    )
+    expires_at = models.DateTimeField(verbose_name="Expira em")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Bloqueio de Vaga"
+        verbose_name_plural = "Bloqueios de Vagas"
+        ordering = ['expires_at']
+        indexes = [
+            models.Index(fields=['event', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.seats} vaga(s) - {self.event}"
+
+    @property
+    def is_expired(self):
+        """Verifica se o bloqueio já expirou"""
+        return timezone.now() >= self.expires_at
+
 class AdventureChecklist(models.Model):
     """
     Checklist específico para cada aventura
@@ -593,8 +852,29 @@ class Payment(models.Model):
         verbose_name_plural = "Pagamentos"
         ordering = ['-created_at']
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Status no carregamento, para as estatísticas do usuário
+        self._loaded_status = self.status if self.pk else None
+    
+    def save(self, *args, **kwargs):
+        from django.db import transaction
+        from .services import PaymentService
+
+        super().save(*args, **kwargs)
+        self._loaded_status = self.status
+        # O status em cache (consulta do PIX) é relido depois do commit
+        transaction.on_commit(lambda: PaymentService.forget_status([self.pk]))
+
     def __str__(self):
         return f"Pagamento {self.id} - {self.booking.user.get_full_name()} - R$ {self.amount}"
+    
+    @property
+    def pix_qr_code_url(self):
+        """URL da imagem do QR Code PIX (data-URI em pagamentos antigos)"""
+        if not self.pix_qr_code or self.pix_qr_code.startswith('data:'):
+            return self.pix_qr_code
+        return reverse('bookings:pix_qr_code', kwargs={'payment_id': self.pk})
 
 
 class PreRegistration(models.Model):
@@ -716,6 +996,7 @@ class WhatsAppMessage(models.Model):
     
     STATUS_CHOICES = [
         ('pending', 'Pendente'),
+        ('sending', 'Enviando'),
         ('sent', 'Enviado'),
         ('delivered', 'Entregue'),
         ('read', 'Lido'),
@@ -766,6 +1047,28 @@ class WhatsAppMessage(models.Model):
         verbose_name="Status"
     )
     
+    # Fila de envio
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Tentativas"
+    )
+    next_attempt_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Próxima Tentativa"
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name="Último Erro"
+    )
+    # Identifica o lote que reservou a mensagem (WhatsAppOutbox._claim_batch)
+    claim_token = models.UUIDField(
+        null=True,
+        blank=True,
+        db_index=True,
+        editable=False
+    )
+    
     # Metadados
     created_at = models.DateTimeField(auto_now_add=True)
     sent_at = models.DateTimeField(
@@ -783,6 +1086,9 @@ class WhatsAppMessage(models.Model):
         verbose_name = "Mensagem WhatsApp"
         verbose_name_plural = "Mensagens WhatsApp"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
     
     def __str__(self):
         return f"{self.message_type} para {self.recipient_name} - {self.status}"
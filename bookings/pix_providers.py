@@ -0,0 +1,39 @@
+import random
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BasePIXProvider:
+    """
+    Interface dos provedores PIX usados na conciliação de pagamentos
+    """
+
+    def check_payments(self, payments):
+        """
+        Consulta uma lista de pagamentos pendentes no provedor e retorna
+        {payment_id: status} apenas para os que mudaram ('approved' ou 'rejected')
+        """
+        raise NotImplementedError
+
+
+class FakePIXProvider(BasePIXProvider):
+    """
+    Provedor local para desenvolvimento: aprova uma fração aleatória dos pagamentos
+    """
+    approval_rate = 0.3
+
+    def check_payments(self, payments):
+        return {
+            payment.pk: 'approved'
+            for payment in payments
+            if random.random() < self.approval_rate
+        }
+
+
+def get_pix_provider():
+    """
+    Instancia o provedor configurado em PIX_PROVIDER
+    """
+    provider_path = getattr(settings, 'PIX_PROVIDER', 'bookings.pix_providers.FakePIXProvider')
+    return import_string(provider_path)()
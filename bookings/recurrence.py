@@ -0,0 +1,216 @@
+"""
+Regras de recorrência do RFC 5545 (RRULE) expandidas em datas.
+
+Suporta o subconjunto usado nas agendas de eventos, em que o horário vem da
+própria agenda: FREQ (DAILY, WEEKLY, MONTHLY, YEARLY), INTERVAL, COUNT, UNTIL,
+BYDAY (com posição, ex.: 1SA ou -1SU, em MONTHLY/YEARLY), BYMONTHDAY, BYMONTH
+e WKST. Partes de horário (BYHOUR etc.) e BYSETPOS são recusadas.
+"""
+import calendar
+import re
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+BYDAY_RE = re.compile(r'^([+-]?\d{1,2})?(MO|TU|WE|TH|FR|SA|SU)$')
+
+Rule = namedtuple('Rule', 'freq interval count until byday bymonthday bymonth wkst')
+
+
+def parse(text):
+    """
+    Rule a partir do texto da RRULE (com ou sem o prefixo "RRULE:").
+    ValueError com a parte inválida.
+    """
+    text = (text or '').strip()
+    if text.upper().startswith('RRULE:'):
+        text = text[6:]
+    parts = {}
+    for part in filter(None, text.upper().split(';')):
+        name, _, value = part.partition('=')
+        if not value:
+            raise ValueError(f'Parte inválida: {part}')
+        parts[name] = value
+
+    freq = parts.pop('FREQ', None)
+    if freq not in FREQUENCIES:
+        raise ValueError('FREQ deve ser DAILY, WEEKLY, MONTHLY ou YEARLY')
+    try:
+        interval = int(parts.pop('INTERVAL', 1))
+        count = int(parts['COUNT']) if 'COUNT' in parts else None
+        until = _parse_until(parts['UNTIL']) if 'UNTIL' in parts else None
+        bymonthday = [int(day) for day in parts.pop('BYMONTHDAY').split(',')] if 'BYMONTHDAY' in parts else []
+        bymonth = [int(month) for month in parts.pop('BYMONTH').split(',')] if 'BYMONTH' in parts else []
+    except ValueError:
+        raise ValueError('INTERVAL, COUNT, UNTIL, BYMONTHDAY e BYMONTH precisam ser números ou datas válidas')
+    parts.pop('COUNT', None)
+    parts.pop('UNTIL', None)
+
+    byday = []
+    for item in parts.pop('BYDAY', '').split(',') if 'BYDAY' in parts else []:
+        match = BYDAY_RE.match(item)
+        if not match:
+            raise ValueError(f'BYDAY inválido: {item}')
+        ordinal = int(match.group(1)) if match.group(1) else None
+        if ordinal is not None and (freq not in ('MONTHLY', 'YEARLY') or not 1 <= abs(ordinal) <= 53):
+            raise ValueError(f'Posição em BYDAY só vale em MONTHLY/YEARLY: {item}')
+        byday.append((ordinal, WEEKDAYS.index(match.group(2))))
+
+    wkst = parts.pop('WKST', 'MO')
+    if wkst not in WEEKDAYS:
+        raise ValueError(f'WKST inválido: {wkst}')
+    if parts:
+        raise ValueError(f'Partes não suportadas: {", ".join(sorted(parts))}')
+    if interval < 1 or (count is not None and count < 1):
+        raise ValueError('INTERVAL e COUNT precisam ser positivos')
+    if count is not None and until is not None:
+        raise ValueError('COUNT e UNTIL não podem ser usados juntos')
+    if any(not 1 <= abs(day) <= 31 for day in bymonthday) or any(not 1 <= month <= 12 for month in bymonth):
+        raise ValueError('BYMONTHDAY ou BYMONTH fora do intervalo')
+
+    return Rule(freq, interval, count, until, byday, bymonthday, bymonth, WEEKDAYS.index(wkst))
+
+
+def parse_dates(text):
+    """
+    Datas separadas por vírgula, espaço ou linha (AAAA-MM-DD ou AAAAMMDD)
+    """
+    dates = set()
+    for item in re.split(r'[\s,;]+', (text or '').strip()):
+        if not item:
+            continue
+        try:
+            dates.add(datetime.strptime(item.replace('-', '')[:8], '%Y%m%d').date())
+        except ValueError:
+            raise ValueError(f'Data inválida: {item}')
+    return dates
+
+
+def between(rule, dtstart, start, end, exdates=()):
+    """
+    Datas da regra a partir de `dtstart`, dentro de [start, end] e fora de
+    `exdates`. COUNT conta desde dtstart, incluindo as datas de exceção.
+    """
+    if rule.until:
+        end = min(end, rule.until)
+    emitted = 0
+    # Sem COUNT não é preciso contar desde dtstart: começa no período de `start`
+    first_period = 0 if rule.count is not None else _period_index(rule, dtstart, start)
+    for day in _occurrences(rule, dtstart, end, first_period):
+        emitted += 1
+        if day >= start and day not in exdates:
+            yield day
+        if rule.count is not None and emitted >= rule.count:
+            return
+
+
+def _occurrences(rule, dtstart, end, period=0):
+    # Período a período (dia, semana, mês ou ano), em ordem, até passar de `end`
+    while True:
+        first, _, candidates = _period(rule, dtstart, period)
+        if first > end:
+            return
+        for day in sorted(candidates):
+            if dtstart <= day <= end and (not rule.bymonth or day.month in rule.bymonth):
+                yield day
+        period += 1
+
+
+def _period_index(rule, dtstart, start):
+    if start <= dtstart:
+        return 0
+    if rule.freq == 'DAILY':
+        elapsed = (start - dtstart).days
+    elif rule.freq == 'WEEKLY':
+        elapsed = (start - dtstart).days // 7
+    elif rule.freq == 'MONTHLY':
+        elapsed = (start.year - dtstart.year) * 12 + start.month - dtstart.month
+    else:
+        elapsed = start.year - dtstart.year
+    # Um período antes, para não perder o período corrente na semana de WKST
+    return max(elapsed // rule.interval - 1, 0)
+
+
+def _period(rule, dtstart, period):
+    step = period * rule.interval
+    if rule.freq == 'DAILY':
+        day = dtstart + timedelta(days=step)
+        keep = (
+            (not rule.byday or day.weekday() in {weekday for _, weekday in rule.byday})
+            and (not rule.bymonthday or _matches_monthday(day, rule.bymonthday))
+        )
+        return day, day, [day] if keep else []
+
+    if rule.freq == 'WEEKLY':
+        week = dtstart - timedelta(days=(dtstart.weekday() - rule.wkst) % 7) + timedelta(weeks=step)
+        weekdays = {weekday for _, weekday in rule.byday} or {dtstart.weekday()}
+        days = [week + timedelta(days=offset) for offset in range(7)]
+        return week, days[-1], [day for day in days if day.weekday() in weekdays]
+
+    if rule.freq == 'MONTHLY':
+        year, month = divmod(dtstart.month - 1 + step, 12)
+        first = date(dtstart.year + year, month + 1, 1)
+        return first, _month_end(first), _days_in_span(rule, dtstart, [(first, _month_end(first))])
+
+    first = date(dtstart.year + step, 1, 1)
+    if rule.bymonth:
+        spans = [(date(first.year, month, 1), _month_end(date(first.year, month, 1))) for month in rule.bymonth]
+    elif rule.byday and not rule.bymonthday:
+        spans = [(first, date(first.year, 12, 31))]
+    elif rule.bymonthday:
+        spans = [(date(first.year, month, 1), _month_end(date(first.year, month, 1))) for month in range(1, 13)]
+    else:
+        spans = [(date(first.year, dtstart.month, 1), _month_end(date(first.year, dtstart.month, 1)))]
+    return first, date(first.year, 12, 31), _days_in_span(rule, dtstart, spans)
+
+
+def _days_in_span(rule, dtstart, spans):
+    # Dias de cada intervalo (mês ou ano) que atendem BYDAY/BYMONTHDAY; sem eles, o dia de dtstart
+    days = set()
+    for first, last in spans:
+        if rule.byday:
+            matches = _weekdays_in(first, last, rule.byday)
+            if rule.bymonthday:
+                matches = {day for day in matches if _matches_monthday(day, rule.bymonthday)}
+        elif rule.bymonthday:
+            matches = {first.replace(day=day) for day in _monthdays(first, rule.bymonthday)}
+        elif dtstart.day <= last.day:
+            matches = {first.replace(day=dtstart.day)}
+        else:
+            # Meses sem o dia (ex.: 31) não têm ocorrência, como no RFC 5545
+            matches = set()
+        days |= matches
+    return days
+
+
+def _weekdays_in(first, last, byday):
+    days = set()
+    for ordinal, weekday in byday:
+        offset = (weekday - first.weekday()) % 7
+        matches = [first + timedelta(days=offset + 7 * week) for week in range(((last - first).days - offset) // 7 + 1)]
+        if ordinal is None:
+            days.update(matches)
+        elif ordinal <= len(matches) and -ordinal <= len(matches):
+            days.add(matches[ordinal - 1 if ordinal > 0 else ordinal])
+    return days
+
+
+def _monthdays(first, bymonthday):
+    length = calendar.monthrange(first.year, first.month)[1]
+    for day in bymonthday:
+        day = day if day > 0 else length + day + 1
+        if 1 <= day <= length:
+            yield day
+
+
+def _matches_monthday(day, bymonthday):
+    return day.day in set(_monthdays(day.replace(day=1), bymonthday))
+
+
+def _month_end(first):
+    return first.replace(day=calendar.monthrange(first.year, first.month)[1])
+
+
+def _parse_until(value):
+    return datetime.strptime(value[:8], '%Y%m%d').date()
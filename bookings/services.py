@@ -1,11 +1,30 @@
 import requests
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 import qrcode
+from PIL import Image
 import io
-import base64
+import os
+import re
+import hashlib
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, time as dt_time
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db import connection
+from django.db.models import F, Q, Sum, Value
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest, Least
 from django.utils import timezone
-from .models import WhatsAppMessage, Payment
+from services.files import atomic_write
+from .models import (
+    WhatsAppMessage, Payment, AdventureEvent, Booking, SeatHold, EventAvailability, EventSchedule
+)
+from .signals import payment_status_changed, seats_changed
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,13 +40,14 @@ class WhatsAppService:
     def send_message(cls, phone_number, message_text, message_type='custom', 
                      booking=None, pre_registration=None):
         """
-        Envia mensagem via WhatsApp (usando WhatsApp Business API ou método alternativo)
+        Enfileira a mensagem para envio (a entrega é feita pelo WhatsAppOutbox,
+        fora da requisição: manage.py send_whatsapp_messages)
         """
         try:
             # Limpar número de telefone
             clean_phone = cls._clean_phone_number(phone_number)
             
-            # Criar log da mensagem
+            # A mensagem entra na fila junto com a transação atual
             whatsapp_message = WhatsAppMessage.objects.create(
                 phone_number=clean_phone,
                 recipient_name=cls._get_recipient_name(booking, pre_registration),
@@ -37,25 +57,12 @@ class WhatsAppService:
                 pre_registration=pre_registration,
                 status='pending'
             )
-            
-            # Para demonstração, vou usar o método de redirecionamento do WhatsApp Web
-            # Em produção, você integraria com WhatsApp Business API
-            success = cls._send_via_whatsapp_web(clean_phone, message_text)
-            
-            if success:
-                whatsapp_message.status = 'sent'
-                whatsapp_message.sent_at = timezone.now()
-                whatsapp_message.save()
-                logger.info(f"WhatsApp message sent to {clean_phone}")
-            else:
-                whatsapp_message.status = 'failed'
-                whatsapp_message.save()
-                logger.error(f"Failed to send WhatsApp message to {clean_phone}")
+            logger.info(f"WhatsApp message queued for {clean_phone}")
             
             return whatsapp_message
             
         except Exception as e:
-            logger.error(f"Error sending WhatsApp message: {str(e)}")
+            logger.error(f"Error queueing WhatsApp message: {str(e)}")
             return None
     
     @classmethod
@@ -94,7 +101,40 @@ Obrigado pela preferência! 🚀"""
         """
         Envia mensagem de confirmação de pagamento
         """
-        message = f"""🎉 *Pagamento Confirmado!* 🎉
+        return cls.send_message(
+            booking.user.phone,
+            cls._payment_confirmation_text(booking),
+            'payment_confirmed',
+            booking=booking
+        )
+    
+    @classmethod
+    def queue_payment_confirmations(cls, bookings):
+        """
+        Enfileira as confirmações de pagamento de várias reservas com um único
+        INSERT (reservas com select_related('user', 'event__adventure'))
+        """
+        messages = []
+        for booking in bookings:
+            phone = booking.contact_phone or getattr(booking.user, 'phone', '')
+            if not phone:
+                logger.warning(f"Booking {booking.pk} has no phone; payment confirmation skipped")
+                continue
+            messages.append(WhatsAppMessage(
+                phone_number=cls._clean_phone_number(phone),
+                recipient_name=cls._get_recipient_name(booking, None),
+                message_type='payment_confirmed',
+                message_text=cls._payment_confirmation_text(booking),
+                booking=booking,
+                status='pending'
+            ))
+        WhatsAppMessage.objects.bulk_create(messages, batch_size=500)
+        logger.info(f"{len(messages)} payment confirmations queued")
+        return messages
+    
+    @classmethod
+    def _payment_confirmation_text(cls, booking):
+        return f"""🎉 *Pagamento Confirmado!* 🎉
 
 Olá {booking.user.get_full_name()}!
 
@@ -116,13 +156,6 @@ Nos vemos em breve! 🚀
 
 *Conexão Adventure*
 WhatsApp: {cls.COMPANY_PHONE}"""
-        
-        return cls.send_message(
-            booking.user.phone,
-            message,
-            'payment_confirmed',
-            booking=booking
-        )
     
     @classmethod
     def _clean_phone_number(cls, phone):
@@ -177,6 +210,142 @@ WhatsApp: {cls.COMPANY_PHONE}"""
             return False
 
 
+class WhatsAppOutbox:
+    """
+    Entrega em lote das mensagens WhatsApp enfileiradas.
+
+    Cada lote é reservado por um tempo (status 'sending' + next_attempt_at),
+    enviado em paralelo por uma sessão HTTP com pool de conexões e gravado de
+    volta com um único bulk_update. Falhas são reenviadas com espera exponencial.
+    """
+    # Tempo que um lote fica reservado antes de voltar para a fila (worker caiu)
+    LEASE_SECONDS = 300
+    
+    _session = None
+    
+    @classmethod
+    def session(cls):
+        """
+        Sessão HTTP compartilhada entre os envios
+        """
+        if cls._session is None:
+            concurrency = getattr(settings, 'WHATSAPP_OUTBOX_CONCURRENCY', 8)
+            adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            token = getattr(settings, 'WHATSAPP_API_TOKEN', '')
+            if token:
+                session.headers['Authorization'] = f"Bearer {token}"
+            cls._session = session
+        return cls._session
+    
+    @classmethod
+    def process_batch(cls, batch_size=100):
+        """
+        Envia um lote de mensagens pendentes. Retorna quantas foram processadas.
+        """
+        messages = cls._claim_batch(batch_size)
+        if not messages:
+            return 0
+        
+        per_destination = getattr(settings, 'WHATSAPP_PER_DESTINATION_CONCURRENCY', 1)
+        limits = {
+            phone: threading.BoundedSemaphore(per_destination)
+            for phone in {message.phone_number for message in messages}
+        }
+        
+        def deliver(message):
+            with limits[message.phone_number]:
+                try:
+                    return cls._transmit(message.phone_number, message.message_text), ''
+                except Exception as e:
+                    return None, str(e)
+        
+        concurrency = getattr(settings, 'WHATSAPP_OUTBOX_CONCURRENCY', 8)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(deliver, messages))
+        
+        now = timezone.now()
+        max_attempts = getattr(settings, 'WHATSAPP_MAX_ATTEMPTS', 5)
+        retry_base = getattr(settings, 'WHATSAPP_RETRY_BASE_SECONDS', 30)
+        for message, (status, error) in zip(messages, results):
+            message.attempts += 1
+            if status:
+                message.status = status
+                message.sent_at = now
+                if status in ('delivered', 'read'):
+                    message.delivered_at = now
+                message.next_attempt_at = None
+                message.last_error = ''
+            elif message.attempts >= max_attempts:
+                message.status = 'failed'
+                message.next_attempt_at = None
+                message.last_error = error
+                logger.error(f"Failed to send WhatsApp message {message.pk}: {error}")
+            else:
+                message.status = 'pending'
+                message.next_attempt_at = now + timedelta(
+                    seconds=retry_base * 2 ** (message.attempts - 1)
+                )
+                message.last_error = error
+        
+        WhatsAppMessage.objects.bulk_update(messages, [
+            'status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at', 'delivered_at'
+        ])
+        return len(messages)
+    
+    @classmethod
+    def _claim_batch(cls, batch_size):
+        """
+        Reserva um lote de mensagens prontas para envio.
+        O UPDATE repete a condição de "pronta" e grava um token do lote: só voltam as
+        mensagens que este UPDATE reservou, mesmo que outro worker tenha lido as mesmas.
+        """
+        now = timezone.now()
+        ready = (
+            Q(status='pending', next_attempt_at__isnull=True) |
+            Q(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+        )
+        token = uuid.uuid4()
+        with transaction.atomic():
+            queryset = WhatsAppMessage.objects.filter(ready).order_by('created_at')
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            candidates = list(queryset.values_list('pk', flat=True)[:batch_size])
+            
+            lease = now + timedelta(seconds=cls.LEASE_SECONDS)
+            WhatsAppMessage.objects.filter(ready, pk__in=candidates).update(
+                status='sending',
+                next_attempt_at=lease,
+                claim_token=token
+            )
+        return list(WhatsAppMessage.objects.filter(claim_token=token).order_by('created_at'))
+    
+    @classmethod
+    def _transmit(cls, phone, message_text):
+        """
+        Envia uma mensagem e retorna o status informado pelo provedor
+        """
+        api_url = getattr(settings, 'WHATSAPP_API_URL', '')
+        if not api_url:
+            # Sem API configurada: mantém a simulação via link do WhatsApp Web
+            if not WhatsAppService._send_via_whatsapp_web(phone, message_text):
+                raise RuntimeError('WhatsApp Web indisponível')
+            return 'sent'
+        
+        response = cls.session().post(
+            api_url,
+            json={'phone': phone, 'message': message_text},
+            timeout=getattr(settings, 'WHATSAPP_API_TIMEOUT', 10)
+        )
+        response.raise_for_status()
+        try:
+            status = response.json().get('status', 'sent')
+        except ValueError:
+            status = 'sent'
+        return status if status in ('sent', 'delivered', 'read') else 'sent'
+
 class PIXService:
     """
     Serviço para geração de PIX
@@ -203,18 +372,15 @@ class PIXService:
             # Gerar dados do PIX
             pix_data = cls._generate_pix_data(payment)
             
-            # Gerar QR Code
-            qr_code = cls._generate_qr_code(pix_data)
-            
-            # Salvar dados no pagamento
-            payment.pix_qr_code = qr_code
+            # QR Code renderizado em disco; o pagamento guarda só a referência
+            payment.pix_qr_code = PIXQRCodeStore.store(pix_data)
             payment.payment_data = {
                 'pix_data': pix_data,
                 'amount': float(payment_amount),
                 'recipient': 'Conexão Adventure',
                 'key': cls.PIX_KEY
             }
-            payment.save()
+            payment.save(update_fields=['pix_qr_code', 'payment_data', 'updated_at'])
             
             return payment
             
@@ -238,42 +404,109 @@ class PIXService:
         }
         
         return json.dumps(pix_data)
+
+
+class PIXQRCodeStore:
+    """
+    Cache em disco dos QR Codes PIX, endereçado pelo conteúdo.
+
+    O nome do arquivo é o SHA-256 do payload e das opções de renderização: o mesmo
+    payload nunca é renderizado duas vezes e um arquivo nunca muda depois de escrito,
+    então o próprio nome serve de ETag.
+    """
+    CONTENT_TYPES = {
+        'svg': 'image/svg+xml',
+        'png': 'image/png',
+    }
+    NAME_RE = re.compile(r'^[0-9a-f]{64}\.(svg|png)$')
+    
+    @classmethod
+    def root(cls):
+        return getattr(settings, 'PIX_QR_ROOT', '') or os.path.join(settings.MEDIA_ROOT, 'pix_qr')
     
     @classmethod
-    def _generate_qr_code(cls, pix_data):
+    def is_reference(cls, value):
         """
-        Gera QR Code para o PIX
+        Diferencia referências do cache dos data-URIs gravados antigamente
         """
-        try:
-            # Criar QR Code
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(pix_data)
-            qr.make(fit=True)
-            
-            # Criar imagem
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Converter para base64
-            buffer = io.BytesIO()
-            img.save(buffer, format='PNG')
-            img_str = base64.b64encode(buffer.getvalue()).decode()
-            
-            return f"data:image/png;base64,{img_str}"
-            
-        except Exception as e:
-            logger.error(f"Error generating QR code: {str(e)}")
-            return ""
+        return bool(value and cls.NAME_RE.match(value))
+    
+    @classmethod
+    def path(cls, name):
+        if not cls.is_reference(name):
+            raise ValueError(f"Invalid QR code reference: {name!r}")
+        return os.path.join(cls.root(), name[:2], name)
+    
+    @classmethod
+    def content_type(cls, name):
+        return cls.CONTENT_TYPES[name.rsplit('.', 1)[1]]
+    
+    @classmethod
+    def store(cls, payload, image_format=None):
+        """
+        Garante que o QR Code do payload está em disco e retorna a referência
+        """
+        image_format = image_format or getattr(settings, 'PIX_QR_FORMAT', 'png')
+        if image_format not in cls.CONTENT_TYPES:
+            raise ValueError(f"Unsupported QR code format: {image_format!r}")
+        box_size = getattr(settings, 'PIX_QR_BOX_SIZE', 4)
+        
+        digest = hashlib.sha256(f"{image_format}:{box_size}:{payload}".encode()).hexdigest()
+        name = f"{digest}.{image_format}"
+        path = cls.path(name)
+        if not os.path.exists(path):
+            atomic_write(path, cls.render(payload, image_format, box_size))
+        return name
+    
+    @classmethod
+    def render(cls, payload, image_format='png', box_size=4):
+        """
+        Renderiza o QR Code como PNG de 1 bit por pixel ou SVG de um único path
+        """
+        # Máscara fixa: todos os leitores aceitam qualquer máscara, e avaliar as oito
+        # opções para escolher a "melhor" é a maior parte do custo de renderização
+        qr = qrcode.QRCode(
+            error_correction=qrcode.constants.ERROR_CORRECT_L,
+            border=4,
+            mask_pattern=0,
+        )
+        qr.add_data(payload)
+        qr.make(fit=True)
+        matrix = qr.get_matrix()
+        size = len(matrix)
+        
+        if image_format == 'svg':
+            # Um retângulo por sequência horizontal de módulos escuros
+            path = []
+            for y, row in enumerate(matrix):
+                x = 0
+                while x < size:
+                    if row[x]:
+                        start = x
+                        while x < size and row[x]:
+                            x += 1
+                        path.append(f"M{start} {y}h{x - start}v1H{start}z")
+                    else:
+                        x += 1
+            return (
+                f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+                f'shape-rendering="crispEdges"><rect width="{size}" height="{size}" fill="#fff"/>'
+                f'<path d="{"".join(path)}"/></svg>'
+            ).encode()
+        
+        img = Image.new('1', (size, size))
+        img.putdata([0 if module else 1 for row in matrix for module in row])
+        img = img.resize((size * box_size, size * box_size), Image.NEAREST)
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue()
 
 
 class PaymentService:
     """
     Serviço para processamento de pagamentos
     """
+    STATUS_CACHE_KEY = 'payments:status:{}'
     
     @classmethod
     def process_credit_card_payment(cls, booking, card_data, installments=1):
@@ -295,14 +528,23 @@ class PaymentService:
             success = cls._process_card_payment(payment, card_data)
             
             if success:
-                payment.status = 'approved'
-                payment.processed_at = timezone.now()
-                payment.save()
-                
-                # Atualizar status da reserva
-                booking.payment_status = 'paid'
-                booking.status = 'approved'
-                booking.save()
+                try:
+                    with transaction.atomic():
+                        # Vagas primeiro: o save da reserva consome o bloqueio ou ocupa as vagas
+                        booking.payment_status = 'paid'
+                        booking.status = 'approved'
+                        booking.save()
+                        
+                        payment.status = 'approved'
+                        payment.processed_at = timezone.now()
+                        payment.save()
+                except SeatUnavailableError:
+                    # Bloqueio expirou e o evento lotou: nem reserva nem pagamento são aprovados
+                    booking.refresh_from_db()
+                    payment.status = 'pending'
+                    payment.save()
+                    logger.warning(f"Credit card payment {payment.pk} left pending: event of booking {booking.id} is full")
+                    return payment
                 
                 # Enviar mensagem de confirmação
                 WhatsAppService.send_payment_confirmation_message(booking)
@@ -336,38 +578,651 @@ class PaymentService:
         return random.random() > 0.1
     
     @classmethod
-    def verify_pix_payment(cls, payment_id):
+    def get_payment_status(cls, payment_id):
         """
-        Verifica status do pagamento PIX
+        Leitura barata do status do pagamento (cache publicado pela conciliação)
         """
-        try:
-            payment = Payment.objects.get(id=payment_id)
+        key = cls.STATUS_CACHE_KEY.format(payment_id)
+        status = cache.get(key)
+        if status is None:
+            status = Payment.objects.filter(pk=payment_id).values_list('status', flat=True).first()
+            if status is None:
+                return None
+            cache.set(key, status, getattr(settings, 'PIX_STATUS_CACHE_SECONDS', 5))
+        return status
+    
+    @classmethod
+    def forget_status(cls, payment_ids):
+        """
+        Descarta o status em cache (pagamento alterado fora da conciliação)
+        """
+        cache.delete_many([cls.STATUS_CACHE_KEY.format(pk) for pk in payment_ids])
+    
+    @classmethod
+    def approve_payments(cls, payment_ids):
+        """
+        Aprova pagamentos em lote e as reservas correspondentes. As vagas
+        bloqueadas (SeatHold) passam a contar como reserva aprovada; reservas
+        sem bloqueio vivo ocupam as vagas em um UPDATE condicional por evento;
+        se o lote não cabe, cada reserva tenta a sua parte e as que não couberem
+        continuam com o pagamento pendente. As confirmações entram em um único INSERT.
+        Retorna os IDs dos pagamentos efetivamente aprovados.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            payments = dict(Payment.objects.select_for_update().filter(
+                pk__in=payment_ids,
+                status__in=['pending', 'processing']
+            ).values_list('pk', 'booking_id'))
+            if not payments:
+                return []
             
-            # Em produção, você consultaria a API do banco
-            # Para demonstração, vamos simular
+            bookings = list(Booking.objects.filter(
+                pk__in=set(payments.values())
+            ).select_related('user', 'event__adventure'))
+            # Bloqueios travados: a limpeza de expirados não os libera no meio da aprovação
+            held = dict(SeatHold.objects.select_for_update().filter(
+                booking__in=bookings
+            ).values_list('booking_id', 'seats'))
             
-            # Simular confirmação após algum tempo
-            if payment.status == 'pending':
-                # Simular que alguns pagamentos são confirmados
-                import random
-                if random.random() > 0.7:  # 30% de chance de confirmação
-                    payment.status = 'approved'
-                    payment.processed_at = timezone.now()
-                    payment.save()
-                    
-                    # Atualizar reserva
-                    booking = payment.booking
-                    booking.payment_status = 'paid'
-                    booking.status = 'approved'
-                    booking.save()
-                    
-                    # Enviar confirmação
-                    WhatsAppService.send_payment_confirmation_message(booking)
+            deltas = defaultdict(list)
+            for booking in bookings:
+                seats = 0 if booking.status in Booking.SEAT_STATUSES else booking.participants_count
+                delta = seats - held.get(booking.pk, 0)
+                if delta:
+                    deltas[booking.event_id].append((booking.pk, delta))
             
-            return payment
+            # Um UPDATE condicional por evento com a soma das vagas do lote
+            full = set()
+            for event_id, event_deltas in deltas.items():
+                total = sum(delta for _, delta in event_deltas)
+                if total <= 0:
+                    SeatReservationService.release(event_id, -total, refresh=False)
+                elif not SeatReservationService.reserve(event_id, total, refresh=False):
+                    # O lote inteiro não cabe: reserva a reserva, até o evento lotar
+                    released = -sum(delta for _, delta in event_deltas if delta < 0)
+                    SeatReservationService.release(event_id, released, refresh=False)
+                    for booking_id, delta in event_deltas:
+                        if delta > 0 and not SeatReservationService.reserve(event_id, delta, refresh=False):
+                            full.add(booking_id)
+            if deltas:
+                EventAvailabilityService.refresh_spots(deltas)
+            if full:
+                logger.warning(
+                    f"Payments {[pk for pk, booking_id in payments.items() if booking_id in full]} "
+                    f"not approved: event is full"
+                )
+                bookings = [booking for booking in bookings if booking.pk not in full]
+                if not bookings:
+                    return []
             
-        except Payment.DoesNotExist:
-            return None
-        except Exception as e:
-            logger.error(f"Error verifying PIX payment: {str(e)}")
-            return None 
\ No newline at end of file
+            booking_ids = [booking.pk for booking in bookings]
+            payment_ids = [pk for pk, booking_id in payments.items() if booking_id not in full]
+            Payment.objects.filter(pk__in=payment_ids).update(
+                status='approved',
+                processed_at=now,
+                updated_at=now
+            )
+            # Vagas bloqueadas passam a contar como reserva aprovada
+            SeatHold.objects.filter(booking_id__in=booking_ids).delete()
+            Booking.objects.filter(pk__in=booking_ids).update(
+                status='approved',
+                payment_status='paid',
+                updated_at=now
+            )
+            
+            # A fila de mensagens é gravada junto com a aprovação
+            WhatsAppService.queue_payment_confirmations(bookings)
+            transaction.on_commit(lambda: cls._publish_status(payment_ids, 'approved'))
+        
+        logger.info(f"{len(payment_ids)} payments approved in bulk")
+        return payment_ids
+    
+    @classmethod
+    def reject_payments(cls, payment_ids):
+        """
+        Rejeita pagamentos em lote. Retorna os IDs efetivamente rejeitados.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            payment_ids = list(Payment.objects.filter(
+                pk__in=payment_ids,
+                status__in=['pending', 'processing']
+            ).values_list('pk', flat=True))
+            Payment.objects.filter(pk__in=payment_ids).update(
+                status='rejected',
+                processed_at=now,
+                updated_at=now
+            )
+            transaction.on_commit(lambda: cls._publish_status(payment_ids, 'rejected'))
+        return payment_ids
+    
+    @classmethod
+    def reconcile_pix_payments(cls, batch_size=200, provider=None):
+        """
+        Confere no provedor todos os PIX pendentes, em lotes.
+        Retorna (aprovados, rejeitados).
+        """
+        from .pix_providers import get_pix_provider
+        provider = provider or get_pix_provider()
+        
+        approved = rejected = 0
+        last_id = 0
+        while True:
+            payments = list(Payment.objects.filter(
+                payment_method='pix',
+                status='pending',
+                pk__gt=last_id
+            ).order_by('pk')[:batch_size])
+            if not payments:
+                break
+            last_id = payments[-1].pk
+            
+            changes = provider.check_payments(payments)
+            approved += len(cls.approve_payments(
+                [pk for pk, status in changes.items() if status == 'approved']
+            ))
+            rejected += len(cls.reject_payments(
+                [pk for pk, status in changes.items() if status == 'rejected']
+            ))
+        
+        return approved, rejected
+    
+    @classmethod
+    def _publish_status(cls, payment_ids, status):
+        """
+        Publica o novo status para o endpoint de consulta e para outros módulos
+        """
+        if not payment_ids:
+            return
+        cache.set_many(
+            {cls.STATUS_CACHE_KEY.format(pk): status for pk in payment_ids},
+            getattr(settings, 'PIX_STATUS_CACHE_SECONDS', 5)
+        )
+        payment_status_changed.send(sender=Payment, payment_ids=payment_ids, status=status)
+
+class SeatUnavailableError(Exception):
+    """
+    Não há vagas suficientes no evento
+    """
+
+
+class SeatReservationService:
+    """
+    Controle atômico das vagas dos eventos.
+
+    `AdventureEvent.current_participants` conta as vagas das reservas aprovadas
+    mais as vagas bloqueadas temporariamente (SeatHold). Toda alteração é feita
+    com UPDATE condicional na linha do evento, sem ler-e-regravar o contador.
+    """
+
+    @classmethod
+    def hold_duration(cls):
+        return timedelta(minutes=getattr(settings, 'SEAT_HOLD_MINUTES', 15))
+
+    @classmethod
+    def reserve(cls, event_id, seats, refresh=True):
+        """
+        Ocupa vagas se ainda houver espaço. Retorna False se o evento lotou.
+        Com refresh=False o índice de vagas fica a cargo de quem chamou.
+        """
+        if seats <= 0:
+            return True
+        updated = AdventureEvent.objects.filter(
+            pk=event_id,
+            current_participants__lte=F('max_participants') - seats
+        ).update(current_participants=F('current_participants') + seats)
+        if updated and refresh:
+            EventAvailabilityService.refresh_spots([event_id])
+        return updated == 1
+
+    @classmethod
+    def release(cls, event_id, seats, refresh=True):
+        """
+        Devolve vagas ao evento
+        """
+        if seats <= 0:
+            return
+        AdventureEvent.objects.filter(pk=event_id).update(
+            current_participants=Greatest(F('current_participants') - seats, 0)
+        )
+        if refresh:
+            EventAvailabilityService.refresh_spots([event_id])
+
+    @classmethod
+    def hold(cls, event, seats=1, user=None):
+        """
+        Bloqueia vagas por alguns minutos enquanto a inscrição é concluída
+        """
+        with transaction.atomic():
+            cls.release_expired_holds(event_id=event.pk)
+            if not cls.reserve(event.pk, seats):
+                raise SeatUnavailableError(f"Sem vagas suficientes para {event}")
+            return SeatHold.objects.create(
+                event=event,
+                user=user,
+                seats=seats,
+                expires_at=timezone.now() + cls.hold_duration()
+            )
+
+    @classmethod
+    def book(cls, user, event, participants_count=1, **fields):
+        """
+        Cria uma reserva com as vagas bloqueadas até a aprovação
+        """
+        with transaction.atomic():
+            if fields.get('status') in Booking.SEAT_STATUSES:
+                # Reserva já aprovada: as vagas são ocupadas no save
+                return Booking.objects.create(
+                    user=user,
+                    event=event,
+                    participants_count=participants_count,
+                    **fields
+                )
+
+            seat_hold = cls.hold(event, participants_count, user=user)
+            booking = Booking.objects.create(
+                user=user,
+                event=event,
+                participants_count=participants_count,
+                **fields
+            )
+            seat_hold.booking = booking
+            seat_hold.save(update_fields=['booking'])
+            return booking
+
+    @classmethod
+    def sync_booking(cls, booking, previous_seats):
+        """
+        Ajusta as vagas do evento após uma mudança de status da reserva
+        """
+        delta = booking.seats_taken - previous_seats
+        if delta == 0 and (booking.status == 'pending' or previous_seats):
+            return
+
+        seat_hold = SeatHold.objects.filter(booking=booking).first()
+        if seat_hold and cls._consume_hold(seat_hold):
+            delta -= seat_hold.seats
+
+        if delta > 0:
+            if not cls.reserve(booking.event_id, delta):
+                raise SeatUnavailableError(f"Sem vagas suficientes para {booking.event}")
+        elif delta < 0:
+            cls.release(booking.event_id, -delta)
+
+    @classmethod
+    def missing_seats(cls, booking):
+        """
+        Vagas que faltam no evento para salvar a mudança de status da reserva (0 se cabe)
+        """
+        delta = booking.seats_taken - booking._seats_taken
+        if delta <= 0:
+            return 0
+        if booking.pk:
+            # O bloqueio da própria reserva é consumido no save
+            delta -= SeatHold.objects.filter(booking=booking).aggregate(total=Sum('seats'))['total'] or 0
+        return max(delta - cls._remaining(booking.event_id), 0)
+
+    @classmethod
+    def _remaining(cls, event_id):
+        remaining = AdventureEvent.objects.filter(pk=event_id).values_list(
+            F('max_participants') - F('current_participants'), flat=True
+        ).first()
+        return max(remaining or 0, 0)
+
+    @classmethod
+    def release_booking(cls, booking):
+        """
+        Devolve as vagas de uma reserva que será apagada
+        """
+        seats = booking._seats_taken
+        seat_hold = SeatHold.objects.filter(booking=booking).first()
+        if seat_hold and cls._consume_hold(seat_hold):
+            seats += seat_hold.seats
+        cls.release(booking.event_id, seats)
+
+    @classmethod
+    def release_expired_holds(cls, event_id=None):
+        """
+        Remove bloqueios expirados e devolve as vagas. Retorna o total liberado.
+        """
+        holds = SeatHold.objects.filter(expires_at__lte=timezone.now())
+        if event_id is not None:
+            holds = holds.filter(event_id=event_id)
+
+        released = {}
+        with transaction.atomic():
+            for seat_hold in holds.only('pk', 'event_id', 'seats'):
+                if cls._consume_hold(seat_hold):
+                    released[seat_hold.event_id] = released.get(seat_hold.event_id, 0) + seat_hold.seats
+            for held_event_id, seats in released.items():
+                cls.release(held_event_id, seats)
+
+        return sum(released.values())
+
+    @classmethod
+    def recount(cls, event):
+        """
+        Recalcula o contador a partir das reservas aprovadas e bloqueios ativos
+        """
+        cls.recount_events([event.pk])
+        event.refresh_from_db(fields=['current_participants'])
+        return event.current_participants
+
+    @classmethod
+    def recount_events(cls, event_ids):
+        """
+        Recalcula o contador de vários eventos em um único UPDATE
+        """
+        event_ids = list(event_ids)
+        if not event_ids:
+            return
+        approved = Booking.objects.filter(
+            event=OuterRef('pk'),
+            status__in=Booking.SEAT_STATUSES
+        ).values('event').annotate(total=Sum('participants_count')).values('total')
+        held = SeatHold.objects.filter(
+            event=OuterRef('pk')
+        ).values('event').annotate(total=Sum('seats')).values('total')
+
+        with transaction.atomic():
+            # Trava as linhas dos eventos contra reservas concorrentes
+            list(AdventureEvent.objects.select_for_update().filter(
+                pk__in=event_ids
+            ).values_list('pk', flat=True))
+            AdventureEvent.objects.filter(pk__in=event_ids).update(
+                current_participants=(
+                    Coalesce(Subquery(approved), 0) + Coalesce(Subquery(held), 0)
+                )
+            )
+            EventAvailabilityService.refresh_spots(event_ids)
+
+    @classmethod
+    def _consume_hold(cls, seat_hold):
+        """
+        Apaga o bloqueio; só quem efetivamente apagou fica com as vagas
+        """
+        return SeatHold.objects.filter(pk=seat_hold.pk).delete()[0] > 0
+
+
+class EventAvailabilityService:
+    """
+    Índice de disponibilidade (EventAvailability) usado pelo calendário.
+
+    As linhas são atualizadas de forma incremental: o evento inteiro ao salvar
+    um AdventureEvent e só as vagas a cada reserva, liberação ou recontagem.
+    O calendário responde com uma única varredura do índice por aventura e data.
+    """
+
+    @classmethod
+    def closes_at(cls, event):
+        """
+        Fim das inscrições: o prazo do evento ou o fim do dia do evento
+        """
+        if event.registration_deadline:
+            return event.registration_deadline
+        next_day = datetime.combine(event.date + timedelta(days=1), dt_time.min)
+        return timezone.make_aware(next_day)
+
+    @classmethod
+    def sync_events(cls, event_ids):
+        """
+        Recria as linhas do índice dos eventos informados
+        """
+        event_ids = list(event_ids)
+        events = list(AdventureEvent.objects.filter(pk__in=event_ids))
+        with transaction.atomic():
+            EventAvailability.objects.filter(event_id__in=event_ids).delete()
+            EventAvailability.objects.bulk_create([cls._row(event) for event in events])
+        seats_changed.send(sender=cls, event_ids=event_ids)
+        return len(events)
+
+    @classmethod
+    def index_events(cls, events):
+        """
+        Cria as linhas de eventos recém-inseridos (ainda sem linha no índice)
+        """
+        EventAvailability.objects.bulk_create([cls._row(event) for event in events])
+        seats_changed.send(sender=cls, event_ids=[event.pk for event in events])
+        return len(events)
+
+    @classmethod
+    def refresh_spots(cls, event_ids):
+        """
+        Copia as vagas restantes dos eventos para o índice em um único UPDATE
+        """
+        spots = AdventureEvent.objects.filter(pk=OuterRef('event_id')).annotate(
+            spots=F('max_participants') - F('current_participants')
+        ).values('spots')[:1]
+        event_ids = list(event_ids)
+        EventAvailability.objects.filter(event_id__in=event_ids).update(
+            remaining_spots=Subquery(spots)
+        )
+        seats_changed.send(sender=cls, event_ids=event_ids)
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """
+        Reconstrói o índice inteiro em lotes. Retorna o total de eventos.
+        """
+        total = 0
+        last_pk = 0
+        while True:
+            event_ids = list(AdventureEvent.objects.filter(
+                pk__gt=last_pk
+            ).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not event_ids:
+                break
+            total += cls.sync_events(event_ids)
+            last_pk = event_ids[-1]
+        # Linhas de eventos que não existem mais somem pelo CASCADE
+        return total
+
+    @classmethod
+    def _row(cls, event):
+        return EventAvailability(
+            event_id=event.pk,
+            adventure_id=event.adventure_id,
+            date=event.date,
+            start_time=event.start_time,
+            remaining_spots=event.max_participants - event.current_participants,
+            custom_price=event.custom_price,
+            is_open=event.is_active and event.status == 'scheduled',
+            closes_at=cls.closes_at(event),
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def open_dates(cls, adventure, days=None):
+        """
+        Datas com vagas e inscrições abertas nos próximos dias, agrupadas por dia
+        """
+        if days is None:
+            days = getattr(settings, 'AVAILABILITY_CALENDAR_DAYS', 90)
+        now = timezone.now()
+        today = timezone.localdate()
+        rows = EventAvailability.objects.filter(
+            adventure=adventure,
+            is_open=True,
+            date__gte=today,
+            date__lte=today + timedelta(days=days),
+            remaining_spots__gt=0,
+            closes_at__gte=now,
+        ).order_by('date', 'start_time').values_list(
+            'event_id', 'date', 'start_time', 'remaining_spots', 'custom_price'
+        )
+
+        base_price = adventure.current_price
+        calendar = []
+        for event_id, date, start_time, remaining_spots, custom_price in rows:
+            if not calendar or calendar[-1]['date'] != date:
+                calendar.append({'date': date, 'remaining_spots': 0, 'events': []})
+            day = calendar[-1]
+            day['remaining_spots'] += remaining_spots
+            day['events'].append({
+                'event_id': event_id,
+                'start_time': start_time,
+                'remaining_spots': remaining_spots,
+                'price': custom_price or base_price,
+            })
+        return calendar
+
+
+class EventScheduleService:
+    """
+    Gera AdventureEvent a partir das agendas recorrentes (EventSchedule).
+
+    As datas de todas as agendas são expandidas em memória e comparadas com os
+    eventos já existentes no período, lidos em uma consulta por lote de
+    aventuras; assim cada (aventura, data, horário) do unique_together é
+    decidido sem consulta por data. Os novos eventos entram com bulk_create.
+    Eventos que a própria agenda gerou e ainda estão agendados são atualizados
+    com bulk_update; eventos cadastrados à mão no mesmo horário são mantidos.
+    Eventos futuros gerados que saíram da expansão (data de exceção, regra ou
+    horário alterados, agenda desativada) são cancelados se não têm inscritos.
+    """
+    UPDATE_FIELDS = ['end_time', 'max_participants', 'custom_price', 'meeting_instructions']
+    ADVENTURE_BATCH = 500
+
+    @classmethod
+    def horizon(cls):
+        """
+        Última data gerada quando a agenda não tem fim
+        """
+        return timezone.localdate() + timedelta(days=getattr(settings, 'EVENT_SCHEDULE_HORIZON_DAYS', 180))
+
+    @classmethod
+    def generate(cls, schedules=None, until=None, dry_run=False, batch_size=1000):
+        """
+        Gera os eventos das agendas ativas de hoje até `until` (ou o horizonte).
+        Com dry_run nada é gravado. Retorna {'created', 'updated', 'existing'}.
+        """
+        if schedules is None:
+            schedules = EventSchedule.objects.all()
+        all_schedules = list(schedules)
+        schedules = [schedule for schedule in all_schedules if schedule.is_active]
+        today = timezone.localdate()
+        until = until or cls.horizon()
+        result = {'created': 0, 'updated': 0, 'existing': 0, 'cancelled': 0}
+        if not all_schedules:
+            return result
+
+        # (aventura, data, horário) -> agenda; em conflito entre agendas vale a primeira
+        candidates = {}
+        expanded = set()
+        for schedule in schedules:
+            for day in schedule.occurrences(today, until):
+                candidates.setdefault((schedule.adventure_id, day, schedule.start_time), schedule)
+                expanded.add((schedule.pk, schedule.adventure_id, day, schedule.start_time))
+
+        adventure_ids = sorted({adventure_id for adventure_id, _, _ in candidates})
+        now = timezone.now()
+        with transaction.atomic():
+            updates = []
+            for offset in range(0, len(adventure_ids), cls.ADVENTURE_BATCH):
+                existing = AdventureEvent.objects.filter(
+                    adventure_id__in=adventure_ids[offset:offset + cls.ADVENTURE_BATCH],
+                    date__gte=today,
+                    date__lte=until,
+                ).values_list(
+                    'pk', 'adventure_id', 'date', 'start_time', 'schedule_id', 'status',
+                    'current_participants', *cls.UPDATE_FIELDS
+                )
+                for pk, adventure_id, day, start_time, schedule_id, status, participants, *values in existing:
+                    schedule = candidates.pop((adventure_id, day, start_time), None)
+                    if schedule is None:
+                        continue
+                    result['existing'] += 1
+                    if schedule_id != schedule.pk or status != 'scheduled':
+                        continue
+                    wanted = cls._event_values(schedule, participants)
+                    if list(wanted.values()) != values:
+                        updates.append(AdventureEvent(pk=pk, updated_at=now, **wanted))
+
+            cancelled = cls._stale_events(all_schedules, expanded, today, until)
+            result['created'] = len(candidates)
+            result['updated'] = len(updates)
+            result['existing'] -= len(updates)
+            result['cancelled'] = len(cancelled)
+            if dry_run:
+                return result
+
+            events = [
+                AdventureEvent(
+                    adventure_id=adventure_id,
+                    date=day,
+                    start_time=start_time,
+                    schedule=schedule,
+                    created_by_id=schedule.created_by_id,
+                    **cls._event_values(schedule)
+                )
+                for (adventure_id, day, start_time), schedule in candidates.items()
+            ]
+            # Outra geração simultânea pode ter criado o mesmo horário
+            AdventureEvent.objects.bulk_create(events, batch_size=batch_size, ignore_conflicts=True)
+            AdventureEvent.objects.bulk_update(
+                updates, cls.UPDATE_FIELDS + ['updated_at'], batch_size=batch_size
+            )
+
+            # bulk_create não devolve as chaves no SQLite: os eventos novos são
+            # os das agendas ainda sem linha no índice de disponibilidade
+            keys = {
+                (adventure_id, day, start_time): pk
+                for pk, adventure_id, day, start_time in AdventureEvent.objects.filter(
+                    schedule__in=schedules,
+                    date__gte=today,
+                    date__lte=until,
+                    availability__isnull=True,
+                ).values_list('pk', 'adventure_id', 'date', 'start_time')
+            }
+            for event in events:
+                event.pk = keys.get((event.adventure_id, event.date, event.start_time))
+            events = [event for event in events if event.pk]
+            for offset in range(0, len(events), batch_size):
+                EventAvailabilityService.index_events(events[offset:offset + batch_size])
+            AdventureEvent.objects.filter(pk__in=cancelled).update(status='cancelled', updated_at=now)
+            update_ids = [event.pk for event in updates] + cancelled
+            for offset in range(0, len(update_ids), batch_size):
+                EventAvailabilityService.sync_events(update_ids[offset:offset + batch_size])
+
+            EventSchedule.objects.filter(pk__in=[schedule.pk for schedule in schedules]).update(
+                generated_until=Least(Coalesce('ends_on', Value(until)), Value(until))
+            )
+
+        logger.info(
+            f"Event schedules generated {result['created']} events, updated {result['updated']}, "
+            f"cancelled {result['cancelled']}"
+        )
+        return result
+
+    @classmethod
+    def _stale_events(cls, schedules, expanded, today, until):
+        """
+        IDs dos eventos futuros gerados pelas agendas que não estão mais na expansão
+        e não têm inscritos nem vagas bloqueadas. Das agendas ativas só se olha até
+        `until`; das inativas, todos os eventos futuros.
+        """
+        active_ids = {schedule.pk for schedule in schedules if schedule.is_active}
+        return [
+            pk
+            for pk, schedule_id, adventure_id, day, start_time in AdventureEvent.objects.filter(
+                schedule__in=[schedule.pk for schedule in schedules],
+                status='scheduled',
+                date__gte=today,
+                current_participants=0,
+                bookings__isnull=True,
+            ).values_list('pk', 'schedule_id', 'adventure_id', 'date', 'start_time')
+            if (schedule_id, adventure_id, day, start_time) not in expanded
+            and (schedule_id not in active_ids or day <= until)
+        ]
+
+    @classmethod
+    def _event_values(cls, schedule, participants=0):
+        # Na mesma ordem de UPDATE_FIELDS; o limite nunca fica abaixo dos inscritos
+        return {
+            'end_time': schedule.end_time,
+            'max_participants': max(schedule.max_participants, participants),
+            'custom_price': schedule.custom_price,
+            'meeting_instructions': schedule.meeting_instructions,
+        }
+
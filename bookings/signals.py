@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+# Enviado após mudanças de status de pagamentos em lote.
+# Argumentos: payment_ids (lista), status (novo status)
+payment_status_changed = Signal()
+
+# Enviado quando as vagas ou os dados de eventos mudam (reservas, bloqueios,
+# recontagem, alteração do evento). Argumentos: event_ids (lista)
+seats_changed = Signal()
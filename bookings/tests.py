@@ -1,3 +1,688 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import F
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from adventures.models import Adventure, Category
+from . import recurrence
+from .models import (
+    AdventureEvent, Booking, EventAvailability, EventDocument, EventSchedule, Payment, SeatHold, WhatsAppMessage
+)
+from .pix_providers import BasePIXProvider
+from .services import (
+    EventAvailabilityService, EventScheduleService, PaymentService, PIXQRCodeStore, PIXService, SeatReservationService,
+    SeatUnavailableError, WhatsAppOutbox, WhatsAppService
+)
+from .signals import payment_status_changed
+from .whatsapp_stub import WhatsAppStubServer
+
+
+class WhatsAppOutboxTests(TestCase):
+    """
+    Envio das mensagens enfileiradas contra o servidor local de teste
+    """
+
+    def test_send_message_only_enqueues(self):
+        with WhatsAppStubServer() as stub, override_settings(WHATSAPP_API_URL=stub.url):
+            message = WhatsAppService.send_message('54 99321-6261', 'Olá!', 'pre_registration')
+
+            self.assertEqual(message.status, 'pending')
+            self.assertEqual(stub.received, [])
+
+    def test_process_batch_delivers_pending_messages(self):
+        for i in range(5):
+            WhatsAppService.send_message(f'5499321626{i}', f'Mensagem {i}', 'event_reminder')
+
+        with WhatsAppStubServer(status='delivered') as stub, override_settings(WHATSAPP_API_URL=stub.url):
+            self.assertEqual(WhatsAppOutbox.process_batch(batch_size=10), 5)
+
+        self.assertEqual(len(stub.received), 5)
+        for message in WhatsAppMessage.objects.all():
+            self.assertEqual(message.status, 'delivered')
+            self.assertIsNotNone(message.sent_at)
+            self.assertIsNotNone(message.delivered_at)
+            self.assertEqual(message.attempts, 1)
+
+    @override_settings(WHATSAPP_MAX_ATTEMPTS=2)
+    def test_failures_are_retried_then_marked_failed(self):
+        message = WhatsAppService.send_message('54993216261', 'Olá!', 'event_reminder')
+
+        with WhatsAppStubServer(fail_rate=1.0) as stub, override_settings(WHATSAPP_API_URL=stub.url):
+            WhatsAppOutbox.process_batch()
+            message.refresh_from_db()
+            self.assertEqual(message.status, 'pending')
+            self.assertIsNotNone(message.next_attempt_at)
+
+            # Ainda na espera exponencial: nada a enviar
+            self.assertEqual(WhatsAppOutbox.process_batch(), 0)
+
+            WhatsAppMessage.objects.filter(pk=message.pk).update(next_attempt_at=None)
+            WhatsAppOutbox.process_batch()
+            message.refresh_from_db()
+            self.assertEqual(message.status, 'failed')
+            self.assertEqual(message.attempts, 2)
+
+    def test_claim_skips_messages_taken_by_another_worker(self):
+        for i in range(3):
+            WhatsAppService.send_message(f'5499321626{i}', f'Mensagem {i}', 'event_reminder')
+        values_list = QuerySet.values_list
+
+        def stale_read(queryset, *args, **kwargs):
+            # Outro worker reserva duas das mensagens entre a leitura e o UPDATE
+            pks = list(values_list(queryset, *args, **kwargs))
+            WhatsAppMessage.objects.filter(pk__in=pks[:2]).update(
+                status='sending', next_attempt_at=timezone.now() + timedelta(minutes=5), claim_token=uuid.uuid4()
+            )
+            return pks
+
+        with mock.patch.object(QuerySet, 'values_list', autospec=True, side_effect=stale_read):
+            claimed = WhatsAppOutbox._claim_batch(10)
+        self.assertEqual([message.message_text for message in claimed], ['Mensagem 2'])
+
+
+class StaticPIXProvider(BasePIXProvider):
+    """
+    Provedor de teste com respostas fixas por pagamento
+    """
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.batches = []
+
+    def check_payments(self, payments):
+        self.batches.append([payment.pk for payment in payments])
+        return {
+            payment.pk: self.statuses[payment.pk]
+            for payment in payments
+            if payment.pk in self.statuses
+        }
+
+
+class PIXPaymentTestCase(TestCase):
+    """
+    Evento com inscrições pendentes pagas via PIX
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Rapel')
+        adventure = Adventure.objects.create(
+            title='Rapel na cachoeira',
+            category=category,
+            short_description='Descrição curta',
+            description='Descrição',
+            difficulty='iniciante',
+            duration_hours=4,
+            location='Serra Gaúcha',
+            meeting_point='Praça central',
+            base_price=Decimal('150.00'),
+            what_includes='Equipamentos',
+            what_to_bring='Água',
+            safety_requirements='Capacete',
+            main_image='adventures/main/capa.jpg',
+        )
+        cls.event = AdventureEvent.objects.create(
+            adventure=adventure,
+            date=timezone.now().date() + timedelta(days=7),
+            start_time=time(8, 0),
+            max_participants=10,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def create_pix_payment(self, participants_count=1):
+        user = User.objects.create_user(f'cliente{User.objects.count()}', password='senha')
+        booking = SeatReservationService.book(
+            user,
+            self.event,
+            participants_count=participants_count,
+            contact_phone='54993216261',
+        )
+        return Payment.objects.create(
+            booking=booking,
+            payment_method='pix',
+            amount=booking.total_price,
+        )
+
+
+class PIXReconciliationTests(PIXPaymentTestCase):
+    """
+    Conciliação em lote dos pagamentos PIX pendentes
+    """
+
+    def test_reconcile_approves_and_rejects_in_batches(self):
+        approved = self.create_pix_payment(participants_count=2)
+        rejected = self.create_pix_payment()
+        untouched = self.create_pix_payment()
+        provider = StaticPIXProvider({approved.pk: 'approved', rejected.pk: 'rejected'})
+        received = []
+
+        def receiver(sender, payment_ids, status, **kwargs):
+            received.append((status, payment_ids))
+
+        payment_status_changed.connect(receiver)
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                result = PaymentService.reconcile_pix_payments(batch_size=2, provider=provider)
+        finally:
+            payment_status_changed.disconnect(receiver)
+
+        self.assertEqual(result, (1, 1))
+        self.assertEqual(len(provider.batches), 2)
+        self.assertIn(('approved', [approved.pk]), received)
+        self.assertIn(('rejected', [rejected.pk]), received)
+
+        booking = approved.booking
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'approved')
+        self.assertEqual(booking.payment_status, 'paid')
+        self.assertFalse(SeatHold.objects.filter(booking=booking).exists())
+
+        # Aprovadas (2) + bloqueios das reservas ainda pendentes (1 + 1)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_participants, 4)
+
+        self.assertEqual(PaymentService.get_payment_status(approved.pk), 'approved')
+        self.assertEqual(PaymentService.get_payment_status(rejected.pk), 'rejected')
+        self.assertEqual(PaymentService.get_payment_status(untouched.pk), 'pending')
+        self.assertTrue(WhatsAppMessage.objects.filter(
+            booking=booking, message_type='payment_confirmed'
+        ).exists())
+
+    def test_status_endpoint_reads_published_status(self):
+        payment = self.create_pix_payment()
+        PaymentService.get_payment_status(payment.pk)
+
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                reverse('bookings:check_payment_status'),
+                json.dumps({'payment_id': payment.pk}),
+                content_type='application/json',
+                HTTP_HOST='localhost',
+            )
+        self.assertEqual(response.json(), {'success': True, 'status': 'pending', 'is_approved': False})
+
+        # Alteração pelo admin (save) descarta o status em cache
+        payment.status = 'approved'
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.save()
+        self.assertEqual(PaymentService.get_payment_status(payment.pk), 'approved')
+
+
+class PIXQRCodeTests(PIXPaymentTestCase):
+    """
+    QR Codes PIX renderizados uma vez e servidos do cache em disco
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.qr_root = tempfile.TemporaryDirectory()
+        cls.settings_override = override_settings(PIX_QR_ROOT=cls.qr_root.name)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.qr_root.cleanup()
+        super().tearDownClass()
+
+    def test_store_is_content_addressed(self):
+        name = PIXQRCodeStore.store('payload', 'png')
+        path = PIXQRCodeStore.path(name)
+        mtime = os.stat(path).st_mtime_ns
+
+        self.assertEqual(PIXQRCodeStore.store('payload', 'png'), name)
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+        self.assertNotEqual(PIXQRCodeStore.store('payload', 'svg'), name)
+        self.assertNotEqual(PIXQRCodeStore.store('outro payload', 'png'), name)
+
+    def test_endpoint_serves_image_with_etag(self):
+        booking = self.create_pix_payment().booking
+        payment = PIXService.generate_pix_payment(booking)
+        self.assertTrue(PIXQRCodeStore.is_reference(payment.pix_qr_code))
+
+        response = self.client.get(payment.pix_qr_code_url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'\x89PNG'))
+
+        response = self.client.get(
+            payment.pix_qr_code_url,
+            HTTP_HOST='localhost',
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class EventAvailabilityTests(PIXPaymentTestCase):
+    """
+    Índice de disponibilidade mantido a cada mudança de evento ou de vagas
+    """
+
+    def test_index_follows_event_and_seat_changes(self):
+        availability = EventAvailability.objects.get(event=self.event)
+        self.assertEqual((availability.remaining_spots, availability.is_open), (10, True))
+
+        payment = self.create_pix_payment(participants_count=3)
+        availability.refresh_from_db()
+        self.assertEqual(availability.remaining_spots, 7)
+
+        payment.booking.delete()
+        availability.refresh_from_db()
+        self.assertEqual(availability.remaining_spots, 10)
+
+        self.event.status = 'cancelled'
+        self.event.custom_price = Decimal('99.00')
+        self.event.save()
+        availability.refresh_from_db()
+        self.assertEqual((availability.is_open, availability.custom_price), (False, Decimal('99.00')))
+
+    def test_calendar_lists_open_dates_with_one_scan(self):
+        adventure = self.event.adventure
+        today = timezone.localdate()
+        AdventureEvent.objects.create(
+            adventure=adventure, date=self.event.date, start_time=time(14, 0),
+            max_participants=5, custom_price=Decimal('120.00'),
+        )
+        full = AdventureEvent.objects.create(
+            adventure=adventure, date=today + timedelta(days=10), start_time=time(8, 0), max_participants=1,
+        )
+        SeatReservationService.hold(full, 1)
+        AdventureEvent.objects.create(
+            adventure=adventure, date=today + timedelta(days=12), start_time=time(8, 0), max_participants=5,
+            registration_deadline=timezone.now() - timedelta(hours=1),
+        )
+        AdventureEvent.objects.create(
+            adventure=adventure, date=today + timedelta(days=120), start_time=time(8, 0), max_participants=5,
+        )
+
+        adventure = Adventure.objects.get(pk=adventure.pk)
+        adventure.current_price
+        with self.assertNumQueries(1):
+            calendar = EventAvailabilityService.open_dates(adventure)
+        self.assertEqual([day['date'] for day in calendar], [self.event.date])
+        self.assertEqual(calendar[0]['remaining_spots'], 15)
+        self.assertEqual(
+            [event['price'] for event in calendar[0]['events']],
+            [Decimal('150.00'), Decimal('120.00')]
+        )
+
+        response = self.client.get(
+            reverse('adventures:calendar', args=[adventure.slug]),
+            {'days': 365},
+            HTTP_HOST='localhost'
+        )
+        data = response.json()
+        self.assertEqual(data['days'], 90)
+        self.assertEqual(data['dates'][0]['events'][1]['start_time'], '14:00')
+
+    def test_rebuild_recreates_missing_rows(self):
+        EventAvailability.objects.all().delete()
+        self.assertEqual(EventAvailabilityService.rebuild(), 1)
+        self.assertTrue(EventAvailability.objects.filter(event=self.event, remaining_spots=10).exists())
+
+
+class EventScheduleTests(PIXPaymentTestCase):
+    """
+    Agendas recorrentes expandidas em eventos com bulk_create
+    """
+
+    def test_rrule_expansion(self):
+        rule = recurrence.parse('RRULE:FREQ=MONTHLY;BYDAY=-1SU')
+        self.assertEqual(
+            list(recurrence.between(rule, date(2026, 1, 1), date(2026, 2, 1), date(2026, 4, 30))),
+            [date(2026, 2, 22), date(2026, 3, 29), date(2026, 4, 26)]
+        )
+        # COUNT conta desde o início, mesmo as datas de exceção
+        rule = recurrence.parse('FREQ=WEEKLY;BYDAY=SA,SU;COUNT=4')
+        self.assertEqual(
+            list(recurrence.between(
+                rule, date(2026, 10, 17), date(2026, 10, 17), date(2026, 12, 31), {date(2026, 10, 18)}
+            )),
+            [date(2026, 10, 17), date(2026, 10, 24), date(2026, 10, 25)]
+        )
+        with self.assertRaises(ValueError):
+            recurrence.parse('FREQ=DAILY;BYHOUR=8')
+
+        schedule = EventSchedule(
+            adventure=self.event.adventure, rrule='FREQ=HOURLY', exception_dates='31/12/2026',
+            starts_on=date(2026, 1, 1), start_time=time(8, 0), max_participants=10,
+        )
+        with self.assertRaises(ValidationError) as context:
+            schedule.full_clean()
+        self.assertEqual(set(context.exception.message_dict), {'rrule', 'exception_dates'})
+
+    def test_generate_upserts_without_query_per_date(self):
+        adventure = self.event.adventure
+        today = timezone.localdate()
+        schedule = EventSchedule.objects.create(
+            adventure=adventure,
+            rrule='FREQ=DAILY',
+            exception_dates=(today + timedelta(days=3)).isoformat(),
+            starts_on=today - timedelta(days=30),
+            ends_on=today + timedelta(days=59),
+            start_time=time(8, 0),
+            max_participants=12,
+        )
+
+        self.assertEqual(
+            EventScheduleService.generate([schedule], dry_run=True),
+            {'created': 58, 'updated': 0, 'existing': 1, 'cancelled': 0}
+        )
+        self.assertEqual(AdventureEvent.objects.count(), 1)
+
+        # Eventos existentes, eventos fora da expansão, INSERT, chaves novas, índice e agenda (+ savepoint)
+        with self.assertNumQueries(8):
+            result = EventScheduleService.generate([schedule])
+        self.assertEqual(result, {'created': 58, 'updated': 0, 'existing': 1, 'cancelled': 0})
+        self.assertEqual(schedule.events.count(), 58)
+        self.assertFalse(schedule.events.filter(date=today + timedelta(days=3)).exists())
+        self.assertEqual(EventAvailability.objects.filter(event__schedule=schedule, remaining_spots=12).count(), 58)
+        # O evento cadastrado à mão no mesmo horário é mantido
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.schedule, self.event.max_participants), (None, 10))
+
+        schedule.max_participants = 20
+        schedule.save()
+        generated = schedule.events.first()
+        SeatReservationService.hold(generated, 2)
+        result = EventScheduleService.generate([schedule])
+        self.assertEqual(result, {'created': 0, 'updated': 58, 'existing': 1, 'cancelled': 0})
+        self.assertEqual(
+            EventAvailability.objects.get(event=generated).remaining_spots, 18
+        )
+        self.assertEqual(EventScheduleService.generate([schedule])['updated'], 0)
+        schedule.refresh_from_db()
+        self.assertEqual(schedule.generated_until, today + timedelta(days=59))
+
+    def test_events_left_out_of_the_schedule_are_cancelled(self):
+        today = timezone.localdate()
+        schedule = EventSchedule.objects.create(
+            adventure=self.event.adventure,
+            rrule='FREQ=DAILY',
+            starts_on=today + timedelta(days=1),
+            ends_on=today + timedelta(days=10),
+            start_time=time(9, 0),
+            max_participants=12,
+        )
+        EventScheduleService.generate([schedule])
+        booked = schedule.events.get(date=today + timedelta(days=5))
+        Booking.objects.create(
+            user=User.objects.create_user('cliente', password='senha'), event=booked, total_price=Decimal('150.00')
+        )
+
+        # Exceções: a data sem inscritos é cancelada, a com reserva é mantida
+        schedule.exception_dates = f'{today + timedelta(days=4)},{today + timedelta(days=5)}'
+        schedule.save()
+        self.assertEqual(EventScheduleService.generate([schedule], dry_run=True)['cancelled'], 1)
+        self.assertEqual(EventScheduleService.generate([schedule])['cancelled'], 1)
+        self.assertEqual(
+            list(schedule.events.filter(status='cancelled').values_list('date', flat=True)),
+            [today + timedelta(days=4)]
+        )
+        self.assertFalse(EventAvailability.objects.filter(
+            event__schedule=schedule, event__status='cancelled', is_open=True
+        ).exists())
+
+        # Agenda encurtada e depois desativada
+        schedule.ends_on = today + timedelta(days=8)
+        schedule.save()
+        self.assertEqual(EventScheduleService.generate([schedule])['cancelled'], 2)
+        schedule.is_active = False
+        schedule.save()
+        self.assertEqual(EventScheduleService.generate([schedule])['cancelled'], 6)
+        self.assertEqual(
+            list(schedule.events.exclude(status='cancelled').values_list('pk', flat=True)), [booked.pk]
+        )
+
+
+class SeatReservationTests(PIXPaymentTestCase):
+    """
+    Vagas ocupadas por bloqueios e reservas aprovadas, sem recontagem
+    """
+
+    def assertSeats(self, expected):
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_participants, expected)
+
+    def test_reserve_refuses_seats_past_capacity(self):
+        SeatReservationService.hold(self.event, seats=8)
+        with self.assertRaises(SeatUnavailableError):
+            SeatReservationService.hold(self.event, seats=3)
+        self.assertTrue(SeatReservationService.reserve(self.event.pk, 2))
+        self.assertFalse(SeatReservationService.reserve(self.event.pk, 1))
+        self.assertSeats(10)
+        self.assertEqual(SeatHold.objects.count(), 1)
+
+    def test_expired_holds_release_their_seats(self):
+        payment = self.create_pix_payment(participants_count=4)
+        self.create_pix_payment(participants_count=2)
+        SeatHold.objects.filter(booking=payment.booking).update(expires_at=timezone.now())
+
+        self.assertEqual(SeatReservationService.release_expired_holds(), 4)
+        self.assertEqual(SeatReservationService.release_expired_holds(), 0)
+        self.assertSeats(2)
+        self.assertFalse(SeatHold.objects.filter(booking=payment.booking).exists())
+
+    def test_approval_consumes_the_hold_once(self):
+        booking = self.create_pix_payment(participants_count=3).booking
+        self.assertSeats(3)
+
+        booking.status = 'approved'
+        booking.save()
+        self.assertSeats(3)
+        self.assertFalse(SeatHold.objects.exists())
+
+        booking.save()
+        self.assertEqual(SeatReservationService.release_expired_holds(), 0)
+        self.assertSeats(3)
+        self.assertEqual(SeatReservationService.recount(self.event), 3)
+
+    def test_deleting_bookings_returns_their_seats(self):
+        pending = self.create_pix_payment(participants_count=2).booking
+        approved = self.create_pix_payment(participants_count=3).booking
+        approved.status = 'approved'
+        approved.save()
+        self.assertSeats(5)
+
+        pending.delete()
+        self.assertSeats(3)
+        self.assertFalse(SeatHold.objects.exists())
+        approved.delete()
+        self.assertSeats(0)
+
+    def test_card_payment_is_not_approved_without_seats(self):
+        booking = self.create_pix_payment(participants_count=4).booking
+        SeatHold.objects.filter(booking=booking).update(expires_at=timezone.now())
+        SeatReservationService.release_expired_holds()
+        SeatReservationService.hold(self.event, seats=8)
+
+        with mock.patch.object(PaymentService, '_process_card_payment', return_value=True):
+            payment = PaymentService.process_credit_card_payment(booking, {})
+
+        self.assertEqual(payment.status, 'pending')
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'pending')
+        self.assertEqual(booking.payment_status, 'pending')
+        self.assertSeats(8)
+
+    def test_admin_approval_without_seats_is_a_validation_error(self):
+        booking = self.create_pix_payment(participants_count=4).booking
+        booking.status = 'approved'
+        booking.full_clean()
+
+        SeatHold.objects.filter(booking=booking).update(expires_at=timezone.now())
+        SeatReservationService.release_expired_holds()
+        SeatReservationService.hold(self.event, seats=8)
+        with self.assertRaises(ValidationError) as context:
+            booking.full_clean()
+        self.assertIn('status', context.exception.message_dict)
+
+
+class EventDocumentAccessTests(PIXPaymentTestCase):
+    """
+    Documentos do evento só para participantes com reserva válida
+    """
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = self.settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.document = EventDocument.objects.create(
+            event=self.event, title='Termo', document_type='waiver',
+            file=SimpleUploadedFile('termo.pdf', b'%PDF-1.4'),
+        )
+
+    def test_rejected_and_cancelled_bookings_lose_access(self):
+        booking = self.create_pix_payment().booking
+        self.client.force_login(booking.user)
+        url = reverse('bookings:event_document', args=[self.document.pk])
+
+        for status, expected in [('pending', 200), ('approved', 200), ('rejected', 404), ('cancelled', 404)]:
+            booking.status = status
+            booking.save()
+            self.assertEqual(self.client.get(url, HTTP_HOST='localhost').status_code, expected, status)
+
+
+class BulkPaymentApprovalTests(PIXPaymentTestCase):
+    """
+    Aprovação em lote com número fixo de consultas
+    """
+
+    def create_payments(self, count):
+        payments = [self.create_pix_payment(participants_count=2) for _ in range(count)]
+        Payment.objects.filter(pk__in=[payment.pk for payment in payments]).update(
+            external_payment_id=F('pk')
+        )
+        return payments
+
+    def test_query_count_does_not_grow_with_batch(self):
+        second_event = AdventureEvent.objects.create(
+            adventure=self.event.adventure,
+            date=self.event.date + timedelta(days=7),
+            start_time=time(8, 0),
+            max_participants=10,
+        )
+        payments = self.create_payments(2)
+        self.event = second_event
+        payments += self.create_payments(2)
+        WhatsAppMessage.objects.all().delete()
+
+        # Pagamentos, reservas, bloqueios (lidos e consumidos) e fila (+ savepoint)
+        with self.assertNumQueries(9):
+            approved = PaymentService.approve_payments([payment.pk for payment in payments])
+        self.assertCountEqual(approved, [payment.pk for payment in payments])
+        self.assertEqual(
+            list(AdventureEvent.objects.order_by('date').values_list('current_participants', flat=True)),
+            [4, 4]
+        )
+        self.assertEqual(WhatsAppMessage.objects.filter(message_type='payment_confirmed').count(), 4)
+        self.assertFalse(Booking.objects.exclude(status='approved').exists())
+
+        # Já aprovados: nada muda
+        self.assertEqual(PaymentService.approve_payments([payment.pk for payment in payments]), [])
+
+    def test_seats_are_reserved_once_per_event(self):
+        second_event = AdventureEvent.objects.create(
+            adventure=self.event.adventure,
+            date=self.event.date + timedelta(days=7),
+            start_time=time(8, 0),
+            max_participants=10,
+        )
+        payments = self.create_payments(3)
+        self.event = second_event
+        payments += self.create_payments(3)
+        SeatHold.objects.update(expires_at=timezone.now())
+        self.assertEqual(SeatReservationService.release_expired_holds(), 12)
+
+        # Como acima, mais um UPDATE de vagas por evento e o índice de vagas
+        with self.assertNumQueries(12):
+            approved = PaymentService.approve_payments([payment.pk for payment in payments])
+        self.assertCountEqual(approved, [payment.pk for payment in payments])
+        self.assertEqual(
+            list(AdventureEvent.objects.order_by('date').values_list('current_participants', flat=True)),
+            [6, 6]
+        )
+        self.assertEqual(
+            list(EventAvailability.objects.order_by('date').values_list('remaining_spots', flat=True)),
+            [4, 4]
+        )
+
+    def test_payment_without_hold_is_not_approved_past_capacity(self):
+        expired = self.create_pix_payment(participants_count=6)
+        SeatHold.objects.filter(booking=expired.booking).update(expires_at=timezone.now())
+        self.assertEqual(SeatReservationService.release_expired_holds(), 6)
+        held = self.create_pix_payment(participants_count=6)
+
+        approved = PaymentService.approve_payments([expired.pk, held.pk])
+
+        self.assertEqual(approved, [held.pk])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_participants, 6)
+        expired.refresh_from_db()
+        self.assertEqual(expired.status, 'pending')
+        self.assertEqual(Booking.objects.get(pk=expired.booking_id).status, 'pending')
+
+        # Com vaga de novo, a reserva sem bloqueio ocupa as vagas ao ser aprovada
+        self.event.max_participants = 12
+        self.event.save()
+        self.assertEqual(PaymentService.approve_payments([expired.pk]), [expired.pk])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_participants, 12)
+
+    def test_command_reports_payments_that_no_longer_fit(self):
+        expired = self.create_pix_payment(participants_count=6)
+        SeatHold.objects.filter(booking=expired.booking).update(expires_at=timezone.now())
+        SeatReservationService.release_expired_holds()
+        held = self.create_pix_payment(participants_count=6)
+
+        output = io.StringIO()
+        call_command('approve_payments', str(expired.pk), str(held.pk), str(held.pk + 100), stdout=output)
+        self.assertIn('1 pagamentos ignorados', output.getvalue())
+        self.assertIn('1 pagamentos continuam pendentes', output.getvalue())
+        self.assertIn('1 pagamentos aprovados', output.getvalue())
+
+    def test_admin_action_and_command(self):
+        payments = self.create_payments(3)
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse('admin:bookings_payment_changelist'),
+            {'action': 'approve_payments', '_selected_action': [payments[0].pk]},
+            HTTP_HOST='localhost',
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Payment.objects.get(pk=payments[0].pk).status, 'approved')
+
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as export:
+            export.write(f'{payments[1].pk}\n{payments[2].pk}\ndesconhecido\n')
+        self.addCleanup(os.remove, export.name)
+        output = io.StringIO()
+        call_command('approve_payments', '--external-ids', export.name, stdout=output)
+        self.assertIn('2 pagamentos aprovados', output.getvalue())
+        self.assertEqual(Payment.objects.filter(status='approved').count(), 3)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_participants, 6)
 
-# Create your tests here.
@@ -24,5 +24,7 @@ urlpatterns = [
     path('booking/<int:booking_id>/credit-card-payment/', views.CreditCardPaymentView.as_view(), name='credit_card_payment'),
     path('booking/<int:booking_id>/payment-success/', views.PaymentSuccessView.as_view(), name='payment_success'),
     
+    path('payment/<int:payment_id>/qr-code/', views.PIXQRCodeView.as_view(), name='pix_qr_code'),
+    path('event-document/<int:pk>/', views.EventDocumentDownloadView.as_view(), name='event_document'),
     path('payment/check-status/', views.CheckPaymentStatusView.as_view(), name='check_payment_status'),
 ] 
\ No newline at end of file
@@ -1,19 +1,24 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.generic import ListView, DetailView, TemplateView
+from django.views.generic import ListView, DetailView, TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, Http404, HttpResponseNotModified
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 import json
+import os
 import re
 
-from .models import Booking, AdventureEvent, PreRegistration, Payment
-from .services import WhatsAppService, PIXService, PaymentService
+from .models import Booking, AdventureEvent, EventDocument, PreRegistration, Payment
+from .services import (
+    WhatsAppService, PIXService, PIXQRCodeStore, PaymentService,
+    SeatReservationService, SeatUnavailableError
+)
+from services.delivery import serve_file
 from users.models import CustomUser
 from adventures.models import Adventure
 
@@ -73,14 +78,18 @@ class BookingCreateView(LoginRequiredMixin, TemplateView):
             messages.error(request, 'Você já tem uma reserva para este evento.')
             return redirect('adventures:detail', slug=event.adventure.slug)
         
-        # Criar reserva
-        booking = Booking.objects.create(
-            user=request.user,
-            event=event,
-            participants_count=1,
-            total_price=event.final_price,
-            status='pending'
-        )
+        # Criar reserva com a vaga bloqueada até a aprovação
+        try:
+            booking = SeatReservationService.book(
+                request.user,
+                event,
+                participants_count=1,
+                total_price=event.final_price,
+                status='pending'
+            )
+        except SeatUnavailableError:
+            messages.error(request, 'Não há mais vagas disponíveis para este evento.')
+            return redirect('adventures:detail', slug=event.adventure.slug)
         
         messages.success(request, 'Reserva criada com sucesso! Aguarde aprovação.')
         return redirect('bookings:detail', pk=booking.pk)
@@ -130,10 +139,10 @@ class AdventureSelectionView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Buscar aventuras ativas e disponíveis
-        context['adventures'] = Adventure.objects.filter(
+        context['adventures'] = Adventure.objects.for_listing().filter(
             is_active=True,
             show_in_listing=True
-        ).select_related('category').order_by('-is_featured', 'title')
+        ).order_by('-is_featured', 'title')
         return context
 
 
@@ -334,10 +343,10 @@ class DirectRegistrationView(TemplateView):
                 messages.error(request, 'Você já tem uma reserva para este evento.')
                 return self.get(request, *args, **kwargs)
             
-            # Criar reserva
-            booking = Booking.objects.create(
-                user=user,
-                event=event,
+            # Criar reserva com a vaga bloqueada até o pagamento
+            booking = SeatReservationService.book(
+                user,
+                event,
                 participants_count=1,
                 total_price=event.final_price,
                 status='pending',
@@ -346,6 +355,9 @@ class DirectRegistrationView(TemplateView):
             
             return redirect('bookings:payment_options', booking_id=booking.id)
             
+        except SeatUnavailableError:
+            messages.error(request, 'Não há mais vagas disponíveis para este evento.')
+            return self.get(request, *args, **kwargs)
         except CustomUser.DoesNotExist:
             messages.error(request, 'CPF não encontrado.')
             return self.get(request, *args, **kwargs)
@@ -443,6 +455,71 @@ class PaymentSuccessView(TemplateView):
         return context
 
 
+class PIXQRCodeView(View):
+    """
+    Imagem do QR Code PIX servida do cache em disco
+    """
+    CACHE_CONTROL = 'private, max-age=31536000, immutable'
+    
+    def get(self, request, *args, **kwargs):
+        payment = Payment.objects.filter(
+            pk=self.kwargs.get('payment_id'),
+            payment_method='pix'
+        ).values('pk', 'pix_qr_code', 'payment_data').first()
+        if not payment:
+            raise Http404("Pagamento não encontrado")
+        
+        name = payment['pix_qr_code']
+        if not PIXQRCodeStore.is_reference(name) or not os.path.exists(PIXQRCodeStore.path(name)):
+            # Pagamento antigo (data-URI) ou cache em disco apagado: renderiza de novo
+            rendered = self._render(payment, name)
+            if rendered != name:
+                Payment.objects.filter(pk=payment['pk']).update(pix_qr_code=rendered)
+                name = rendered
+        
+        # O nome é o hash do conteúdo, então serve diretamente de ETag
+        etag = f'"{name}"'
+        if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(
+                open(PIXQRCodeStore.path(name), 'rb'),
+                content_type=PIXQRCodeStore.content_type(name)
+            )
+        response['ETag'] = etag
+        response['Cache-Control'] = self.CACHE_CONTROL
+        return response
+    
+    def _render(self, payment, name):
+        pix_data = (payment['payment_data'] or {}).get('pix_data')
+        if not pix_data:
+            raise Http404("QR Code não disponível")
+        image_format = name.rsplit('.', 1)[1] if PIXQRCodeStore.is_reference(name) else None
+        return PIXQRCodeStore.store(pix_data, image_format)
+
+
+class EventDocumentDownloadView(LoginRequiredMixin, View):
+    """
+    Download de um documento do evento (participantes e equipe)
+    """
+    login_url = reverse_lazy('users:login')
+    # Reservas que dão acesso: em análise, aprovadas ou concluídas (rejeitadas e canceladas não)
+    BOOKING_STATUSES = ['pending', *Booking.SEAT_STATUSES, 'completed']
+    
+    def get(self, request, *args, **kwargs):
+        document = get_object_or_404(EventDocument, pk=self.kwargs.get('pk'))
+        has_booking = Booking.objects.filter(
+            user=request.user,
+            event_id=document.event_id,
+            status__in=self.BOOKING_STATUSES
+        ).exists()
+        if not (request.user.is_staff or has_booking):
+            raise Http404("Documento não encontrado")
+        if not document.file:
+            raise Http404("Arquivo não encontrado")
+        return serve_file(request, document.file, as_attachment=False)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class CheckPaymentStatusView(TemplateView):
     """
@@ -454,13 +531,14 @@ class CheckPaymentStatusView(TemplateView):
             data = json.loads(request.body)
             payment_id = data.get('payment_id')
             
-            payment = PaymentService.verify_pix_payment(payment_id)
+            # Leitura do status publicado pela conciliação (sem consultar o provedor)
+            status = PaymentService.get_payment_status(payment_id)
             
-            if payment:
+            if status:
                 return JsonResponse({
                     'success': True,
-                    'status': payment.status,
-                    'is_approved': payment.status == 'approved'
+                    'status': status,
+                    'is_approved': status == 'approved'
                 })
             else:
                 return JsonResponse({
@@ -0,0 +1,72 @@
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class WhatsAppStubServer:
+    """
+    Servidor HTTP local que imita a API de envio do WhatsApp.
+
+    Usado em testes e desenvolvimento: aponte WHATSAPP_API_URL para `url`.
+    Cada POST é registrado em `received` e respondido com {"status": status},
+    ou com erro 503 conforme `fail_rate`.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, status='sent', fail_rate=0.0):
+        self.status = status
+        self.fail_rate = fail_rate
+        self.received = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/messages'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                with stub._lock:
+                    stub.received.append(payload)
+
+                if random.random() < stub.fail_rate:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+
+                body = json.dumps({'status': stub.status}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
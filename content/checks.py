@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from services.checks import cache_is_process_local
+
+
+@register(Tags.caches, deploy=True)
+def check_site_configuration_cache(app_configs, **kwargs):
+    """
+    SITE_CONFIG_SHARED_CACHE só vale com um cache compartilhado: num cache local a
+    cada processo a limpeza do sinal não chega aos outros workers
+    """
+    if not getattr(settings, 'SITE_CONFIG_SHARED_CACHE', False) or not cache_is_process_local():
+        return []
+    return [Warning(
+        'SITE_CONFIG_SHARED_CACHE está ativo, mas o cache padrão é local a cada processo: '
+        'a configuração do site não é compartilhada e cada worker a relê a cada SITE_CONFIG_LOCAL_TIMEOUT segundos.',
+        hint='Configure um cache compartilhado (CACHE_BACKEND e CACHE_LOCATION, ex: memcached) ou desative SITE_CONFIG_SHARED_CACHE.',
+        id='content.W001',
+    )]
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from content.models import SiteConfiguration
+
+
+class Command(BaseCommand):
+    help = 'Compara consultas e tempo por requisição da home com a configuração do site fria e em cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requisições por cenário')
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST='localhost')
+        url = reverse('content:home')
+        total = options['requests']
+
+        # Garante que a configuração exista antes da medição
+        SiteConfiguration.get_config()
+
+        results = {}
+        for label, warm in (('Sem cache', False), ('Com cache', True)):
+            SiteConfiguration.clear_cache()
+            queries = 0
+            started = time.perf_counter()
+            for _ in range(total):
+                if not warm:
+                    SiteConfiguration.clear_cache()
+                with CaptureQueriesContext(connection) as captured:
+                    client.get(url)
+                queries += len(captured)
+            elapsed = time.perf_counter() - started
+            results[label] = (queries / total, elapsed / total * 1000)
+            self.stdout.write(
+                f'{label}: {queries / total:.2f} consultas/req | {elapsed / total * 1000:.2f} ms/req'
+            )
+
+        cold_queries, cold_ms = results['Sem cache']
+        warm_queries, warm_ms = results['Com cache']
+        self.stdout.write(self.style.SUCCESS(
+            f'Economia por requisição: {cold_queries - warm_queries:.2f} consultas, {cold_ms - warm_ms:.2f} ms'
+        ))
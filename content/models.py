@@ -1,7 +1,14 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from ckeditor.fields import RichTextField
 
+from services import richtext
+from services.checks import cache_is_process_local
+
 
 class Banner(models.Model):
     """
@@ -218,6 +225,7 @@ class EditablePage(models.Model):
     """
     Páginas editáveis como "Como Funciona" e "Regras Gerais"
     """
+    RICH_TEXT_FIELDS = ('content',)
     PAGE_CHOICES = [
         ('como_funciona', 'Como Funciona'),
         ('regras_gerais', 'Regras Gerais'),
@@ -239,6 +247,13 @@ class EditablePage(models.Model):
         verbose_name="Subtítulo"
     )
     content = RichTextField(verbose_name="Conteúdo")
+    # HTML sanitizado do conteúdo, compilado no save (services.richtext)
+    rendered_html = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="HTML Compilado"
+    )
     
     # SEO
     meta_title = models.CharField(
@@ -270,11 +285,19 @@ class EditablePage(models.Model):
     def __str__(self):
         return self.title
     
+    @property
+    def html(self):
+        """HTML compilado do conteúdo: {{ page.html.content }}"""
+        return richtext.RenderedHTML(self)
+    
     def save(self, *args, **kwargs):
         if not self.meta_title:
             self.meta_title = self.title
         if not self.meta_description and self.subtitle:
             self.meta_description = self.subtitle
+        changed = richtext.render_fields(self)
+        if changed and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'rendered_html'}
         super().save(*args, **kwargs)
 
 
@@ -345,8 +368,33 @@ class SiteConfiguration(models.Model):
             raise ValidationError('Só pode existir uma configuração do site.')
         super().save(*args, **kwargs)
     
+    # Cache local do processo: (configuração, expira em)
+    _local_cache = None
+    CACHE_KEY = 'content:site_configuration'
+    
     @classmethod
     def get_config(cls):
-        """Método para obter a configuração atual"""
-        config, created = cls.objects.get_or_create(pk=1)
+        """Método para obter a configuração atual (em cache)"""
+        local = cls._local_cache
+        if local is not None and local[1] > time.monotonic():
+            return local[0]
+        
+        # Um cache local ao processo não seria invalidado nos outros workers (content.W001)
+        use_shared_cache = getattr(settings, 'SITE_CONFIG_SHARED_CACHE', False) and not cache_is_process_local()
+        config = cache.get(cls.CACHE_KEY) if use_shared_cache else None
+        if config is None:
+            config = cls.objects.filter(pk=1).first()
+            if config is None:
+                config, created = cls.objects.get_or_create(pk=1)
+            if use_shared_cache:
+                cache.set(cls.CACHE_KEY, config, None)
+        
+        timeout = getattr(settings, 'SITE_CONFIG_LOCAL_TIMEOUT', 60)
+        cls._local_cache = (config, time.monotonic() + timeout)
         return config
+    
+    @classmethod
+    def clear_cache(cls):
+        """Invalida o cache local e o compartilhado"""
+        cls._local_cache = None
+        cache.delete(cls.CACHE_KEY)
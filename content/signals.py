@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import SiteConfiguration
+
+
+@receiver([post_save, post_delete], sender=SiteConfiguration)
+def invalidate_site_configuration(sender, **kwargs):
+    """Descarta a configuração em cache quando ela é alterada"""
+    SiteConfiguration.clear_cache()
@@ -1,3 +1,45 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from .checks import check_site_configuration_cache
+from .models import SiteConfiguration
+
+
+class SiteConfigurationCacheTests(TestCase):
+    """
+    Configuração do site em cache, invalidada pelos sinais do modelo
+    """
+
+    def setUp(self):
+        SiteConfiguration.clear_cache()
+
+    def test_saving_configuration_invalidates_cached_copy(self):
+        config = SiteConfiguration.get_config()
+        with self.assertNumQueries(0):
+            SiteConfiguration.get_config()
+
+        config.site_name = 'Conexão Adventure RS'
+        config.save()
+        self.assertEqual(SiteConfiguration.get_config().site_name, 'Conexão Adventure RS')
+
+        config.delete()
+        self.assertEqual(SiteConfiguration.get_config().site_name, 'Conexão Adventure')
+
+    def test_footer_reads_cached_configuration(self):
+        config = SiteConfiguration.get_config()
+        config.address = 'Rua Marechal Deodoro, 100, Caxias do Sul - RS'
+        config.save()
+        url = reverse('content:home')
+        self.client.get(url, HTTP_HOST='localhost')
+
+        # Worker aquecido: só as aventuras em destaque vão ao banco
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertContains(response, 'Rua Marechal Deodoro, 100, Caxias do Sul - RS')
+
+    @override_settings(SITE_CONFIG_SHARED_CACHE=True)
+    def test_shared_cache_is_ignored_when_cache_is_process_local(self):
+        SiteConfiguration.get_config()
+        self.assertIsNone(cache.get(SiteConfiguration.CACHE_KEY))
+        self.assertEqual([warning.id for warning in check_site_configuration_cache(None)], ['content.W001'])
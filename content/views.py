@@ -7,7 +7,7 @@ def home(request):
     """Homepage do site"""
     try:
         # Buscar aventuras destacadas para exibir na home
-        featured_adventures = Adventure.objects.filter(
+        featured_adventures = Adventure.objects.for_listing().filter(
             is_active=True,
             is_featured=True
         ).order_by('-created_at')[:6]
@@ -1,5 +1,12 @@
+from datetime import timedelta
+
 from django.contrib import admin
-from .models import MaterialCategory, Material, MaterialDownload, MaterialAccess
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import (
+    MaterialCategory, Material, MaterialDownload, MaterialAccess,
+    MaterialDownloadDaily, CategoryDownloadDaily
+)
 
 
 @admin.register(MaterialCategory)
@@ -17,7 +24,10 @@ class MaterialAdmin(admin.ModelAdmin):
     list_filter = ['category', 'file_type', 'access_level', 'is_active', 'is_featured']
     search_fields = ['title', 'description', 'tags']
     list_editable = ['is_active', 'is_featured', 'order']
-    readonly_fields = ['download_count', 'file_size', 'created_at', 'updated_at']
+    readonly_fields = [
+        'download_count', 'file_size', 'checksum', 'page_count', 'duration_seconds',
+        'metadata_status', 'created_at', 'updated_at'
+    ]
     
     fieldsets = (
         ('Informações Básicas', {
@@ -33,7 +43,10 @@ class MaterialAdmin(admin.ModelAdmin):
             'fields': ('is_active', 'is_featured', 'order', 'tags')
         }),
         ('Metadados (Somente Leitura)', {
-            'fields': ('file_size', 'download_count', 'created_at', 'updated_at'),
+            'fields': (
+                'file_size', 'checksum', 'page_count', 'duration_seconds', 'metadata_status',
+                'download_count', 'created_at', 'updated_at'
+            ),
             'classes': ('collapse',)
         }),
     )
@@ -54,3 +67,52 @@ class MaterialAccessAdmin(admin.ModelAdmin):
     list_filter = ['is_active', 'granted_at', 'expires_at']
     search_fields = ['material__title', 'user__username']
     readonly_fields = ['granted_at', 'is_expired', 'is_valid']
+
+
+class DownloadRollupAdmin(admin.ModelAdmin):
+    """
+    Agregações geradas pelo comando rollup_material_downloads (somente leitura)
+    """
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(MaterialDownloadDaily)
+class MaterialDownloadDailyAdmin(DownloadRollupAdmin):
+    list_display = ['date', 'material', 'downloads', 'unique_users', 'unique_ips']
+    list_filter = ['material__category']
+    search_fields = ['material__title']
+    list_select_related = ['material']
+    REPORT_DAYS = 30
+
+    def changelist_view(self, request, extra_context=None):
+        # Relatório dos mais baixados lido só das agregações diárias
+        since = timezone.localdate() - timedelta(days=self.REPORT_DAYS)
+        extra_context = {
+            'report_days': self.REPORT_DAYS,
+            # Soma dos usuários únicos de cada dia: quem volta em dias diferentes conta
+            # uma vez por dia (usuários-dia, não usuários distintos no período)
+            # Agrupado pelo material: títulos repetidos continuam em linhas separadas
+            'top_materials': MaterialDownloadDaily.objects.filter(date__gte=since).values('material_id').annotate(
+                title=F('material__title'),
+                category_name=F('material__category__name'),
+                total=Sum('downloads'),
+                user_days=Sum('unique_users')
+            ).order_by('-total')[:10],
+            'top_categories': CategoryDownloadDaily.objects.filter(date__gte=since).values(
+                'category__name'
+            ).annotate(total=Sum('downloads')).order_by('-total'),
+            **(extra_context or {}),
+        }
+        return super().changelist_view(request, extra_context)
+
+
+@admin.register(CategoryDownloadDaily)
+class CategoryDownloadDailyAdmin(DownloadRollupAdmin):
+    list_display = ['date', 'category', 'downloads', 'materials']
+    list_filter = ['category']
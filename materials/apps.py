@@ -1,6 +1,15 @@
+import atexit
+
 from django.apps import AppConfig
 
 
 class MaterialsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'materials'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .services import MaterialDownloadService
+
+        # Downloads ainda no buffer são gravados quando o processo termina
+        atexit.register(MaterialDownloadService.flush)
@@ -0,0 +1,94 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from materials.models import Material, MaterialCategory
+from materials.services import MaterialCatalogService, MaterialSearchService
+
+WORDS = (
+    'trilha cachoeira rapel escalada montanha segurança equipamento mochila roteiro '
+    'canion serra gaúcha caminhada acampamento navegação primeiros socorros corda '
+    'capacete mosquetão nó ancoragem técnica iniciante avançado guia mapa bússola '
+    'hidratação alimentação clima inverno verão lanterna barraca saco dormir fogareiro '
+    'orientação altitude travessia rio correnteza boia colete remada caiaque bote '
+    'fotografia paisagem fauna flora preservação ambiental regulamento inscrição ação'
+).split()
+
+QUERIES = ['cachoeira', 'segurança rapel', 'primeiros socorros', 'acao', 'mosquetao ancoragem', 'caiaque']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a latência da busca LIKE com o índice textual (contagens das facetas e '
+        'primeira página) sobre materiais sintéticos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--materials', type=int, default=100000, help='Materiais sintéticos')
+        parser.add_argument('--repeat', type=int, default=5, help='Execuções de cada consulta')
+
+    def handle(self, *args, **options):
+        if not MaterialSearchService.is_available():
+            self.stdout.write(self.style.WARNING('Índice de busca indisponível neste banco.'))
+
+        tag = uuid.uuid4().hex[:8]
+        category = MaterialCategory.objects.create(name=f'Benchmark {tag}')
+        rng = random.Random(42)
+        try:
+            self.stdout.write(f'Criando {options["materials"]} materiais...')
+            with transaction.atomic():
+                for start in range(0, options['materials'], 5000):
+                    Material.objects.bulk_create([
+                        Material(
+                            title=' '.join(rng.choices(WORDS, k=4)).capitalize(),
+                            description=' '.join(rng.choices(WORDS, k=40)),
+                            tags=', '.join(rng.choices(WORDS, k=3)),
+                            category=category,
+                            file_type='pdf',
+                        )
+                        for _ in range(start, min(start + 5000, options['materials']))
+                    ])
+            # bulk_create não dispara os sinais: indexa tudo de uma vez
+            started = time.perf_counter()
+            MaterialSearchService.rebuild()
+            self.stdout.write(f'Índice reconstruído em {time.perf_counter() - started:.1f}s\n')
+
+            materials = Material.objects.filter(is_active=True, category=category)
+            for query in QUERIES:
+                like = self.measure(
+                    lambda: self.listing(MaterialSearchService._like_search(materials, query), False),
+                    options['repeat']
+                )
+                fts = self.measure(
+                    lambda: self.listing(MaterialSearchService.search(materials, query), True),
+                    options['repeat']
+                )
+                self.stdout.write(
+                    f'{query!r:<24} LIKE {like[0]:>8.1f} ms ({like[1]:>6} resultados)   '
+                    f'índice {fts[0]:>7.1f} ms ({fts[1]:>4} resultados)'
+                )
+        finally:
+            Material.objects.filter(category=category).delete()
+            category.delete()
+            MaterialSearchService.rebuild()
+
+    def listing(self, queryset, ranked):
+        # O que a biblioteca faz a cada busca: contagens das facetas (sem cache) e a primeira página
+        total = sum(row['total'] for row in queryset.order_by().values(
+            'category__slug', 'file_type', 'access_level'
+        ).annotate(total=Count('pk')))
+        MaterialCatalogService.page(queryset, ranked=ranked)
+        return total
+
+    def measure(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            total = run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), total
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from materials.services import MaterialUploadService
+
+
+class Command(BaseCommand):
+    help = 'Extrai os metadados (páginas, duração, thumbnail) dos materiais enviados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Materiais por lote')
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Fica em execução contínua, aguardando novos uploads'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Segundos de espera quando a fila está vazia (com --loop)'
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                processed = MaterialUploadService.process_batch(options['batch_size'])
+                total += processed
+                if processed:
+                    self.stdout.write(f'{processed} materiais processados.')
+                elif not options['loop']:
+                    break
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} materiais processados no total.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from materials.services import MaterialSearchService
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca textual dos materiais'
+
+    def handle(self, *args, **options):
+        if not MaterialSearchService.is_available():
+            self.stdout.write(self.style.WARNING('Índice de busca indisponível neste banco; a busca usa LIKE.'))
+            return
+        total = MaterialSearchService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} materiais indexados.'))
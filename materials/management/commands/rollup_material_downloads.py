@@ -0,0 +1,29 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from materials.services import MaterialDownloadRollupService
+
+
+class Command(BaseCommand):
+    help = 'Agrega os downloads de materiais por dia e aplica a retenção dos registros brutos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help='Recalcular a partir desta data (AAAA-MM-DD)')
+        parser.add_argument('--retention-days', type=int, help='Dias de downloads brutos mantidos')
+        parser.add_argument('--no-archive', action='store_true', help='Apagar sem arquivar em NDJSON')
+        parser.add_argument('--no-prune', action='store_true', help='Apenas agregar, sem aplicar a retenção')
+
+    def handle(self, *args, **options):
+        rows = MaterialDownloadRollupService.rollup(since=options['since'])
+        self.stdout.write(self.style.SUCCESS(f'✅ {rows} linhas diárias por material agregadas.'))
+
+        if options['no_prune']:
+            return
+        deleted, path = MaterialDownloadRollupService.prune(
+            retention_days=options['retention_days'],
+            archive=not options['no_archive']
+        )
+        if path:
+            self.stdout.write(self.style.SUCCESS(f'📦 {deleted} downloads arquivados em {path}.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'🧹 {deleted} downloads antigos removidos.'))
@@ -0,0 +1,71 @@
+from django.db import migrations
+
+POSTGRES_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    DO $$ BEGIN
+        CREATE TEXT SEARCH CONFIGURATION pt_unaccent (COPY = portuguese);
+        ALTER TEXT SEARCH CONFIGURATION pt_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+    EXCEPTION WHEN unique_violation THEN NULL;
+    END $$
+    """,
+    """
+    CREATE TABLE materials_material_search (
+        material_id bigint PRIMARY KEY REFERENCES materials_material (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX materials_material_search_document ON materials_material_search USING GIN (document)",
+]
+
+SQLITE_SQL = [
+    # remove_diacritics 2: "acao" encontra "ação" (e vice-versa)
+    """
+    CREATE VIRTUAL TABLE materials_material_search USING fts5(
+        title, tags, description,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_SQL
+    elif vendor == 'sqlite':
+        statements = SQLITE_SQL
+    else:
+        # Sem índice a busca usa LIKE (MaterialSearchService)
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+    schema_editor.execute(
+        "INSERT INTO materials_material_search (rowid, title, tags, description) "
+        "SELECT id, title, tags, description FROM materials_material"
+        if vendor == 'sqlite' else
+        "INSERT INTO materials_material_search (material_id, document) "
+        "SELECT id, "
+        "setweight(to_tsvector('pt_unaccent', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('pt_unaccent', coalesce(tags, '')), 'B') || "
+        "setweight(to_tsvector('pt_unaccent', coalesce(description, '')), 'C') "
+        "FROM materials_material"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute("DROP TABLE IF EXISTS materials_material_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.18 on 2026-10-17 12:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0003_material_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['is_active', '-is_featured', 'order', '-created_at', '-id'], name='material_catalog_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['is_active', 'category', 'file_type'], name='material_facets_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 3.2.18 on 2026-10-17 12:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0004_material_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryDownloadDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('downloads', models.PositiveIntegerField(default=0, verbose_name='Downloads')),
+                ('materials', models.PositiveIntegerField(default=0, verbose_name='Materiais Baixados')),
+            ],
+            options={
+                'verbose_name': 'Downloads Diários por Categoria',
+                'verbose_name_plural': 'Downloads Diários por Categoria',
+                'ordering': ['-date', '-downloads'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MaterialDownloadDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('downloads', models.PositiveIntegerField(default=0, verbose_name='Downloads')),
+                ('unique_users', models.PositiveIntegerField(default=0, verbose_name='Usuários Únicos')),
+                ('unique_ips', models.PositiveIntegerField(default=0, verbose_name='IPs Únicos')),
+            ],
+            options={
+                'verbose_name': 'Downloads Diários por Material',
+                'verbose_name_plural': 'Downloads Diários por Material',
+                'ordering': ['-date', '-downloads'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='materialdownload',
+            index=models.Index(fields=['downloaded_at'], name='material_download_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='materialdownloaddaily',
+            name='material',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_downloads', to='materials.material', verbose_name='Material'),
+        ),
+        migrations.AddField(
+            model_name='categorydownloaddaily',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_downloads', to='materials.materialcategory', verbose_name='Categoria'),
+        ),
+        migrations.AddIndex(
+            model_name='materialdownloaddaily',
+            index=models.Index(fields=['date'], name='material_daily_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='materialdownloaddaily',
+            unique_together={('material', 'date')},
+        ),
+        migrations.AddIndex(
+            model_name='categorydownloaddaily',
+            index=models.Index(fields=['date'], name='category_daily_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='categorydownloaddaily',
+            unique_together={('category', 'date')},
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.18 on 2026-10-17 12:55
+
+from django.db import migrations, models
+
+
+def queue_existing_files(apps, schema_editor):
+    # Arquivos já enviados entram na fila de metadados (checksum, páginas, duração)
+    Material = apps.get_model('materials', 'Material')
+    Material.objects.exclude(file='').exclude(file__isnull=True).update(metadata_status='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0005_download_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='checksum',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, verbose_name='SHA-256'),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='duration_seconds',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Duração (segundos)'),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='metadata_next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='metadata_status',
+            field=models.CharField(choices=[('none', 'Sem Arquivo'), ('pending', 'Pendente'), ('processing', 'Processando'), ('ready', 'Pronto'), ('failed', 'Falhou')], default='none', max_length=20, verbose_name='Metadados'),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='page_count',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Páginas'),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='file_type',
+            field=models.CharField(blank=True, choices=[('pdf', 'PDF'), ('video', 'Vídeo'), ('image', 'Imagem'), ('document', 'Documento'), ('presentation', 'Apresentação'), ('link', 'Link Externo')], help_text='Deixe em branco para detectar pelo arquivo enviado', max_length=20, verbose_name='Tipo de Arquivo'),
+        ),
+        migrations.RunPython(queue_existing_files, migrations.RunPython.noop),
+    ]
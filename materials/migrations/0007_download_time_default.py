@@ -0,0 +1,19 @@
+# Generated by Django 3.2.18 on 2026-10-17 14:18
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0006_material_upload_metadata'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='materialdownload',
+            name='downloaded_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.18 on 2026-10-17 14:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0007_download_time_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='original_filename',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Nome Original do Arquivo'),
+        ),
+    ]
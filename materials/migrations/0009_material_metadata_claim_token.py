@@ -0,0 +1,18 @@
+# Generated by Django 3.2.18 on 2026-10-17 14:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0008_material_original_filename'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='metadata_claim_token',
+            field=models.UUIDField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
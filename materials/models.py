@@ -1,6 +1,7 @@
 from django.db import models
 from django.core.validators import FileExtensionValidator
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 import os
 
 
@@ -66,6 +67,14 @@ class Material(models.Model):
         ('premium', 'Premium'),
     ]
     
+    METADATA_STATUS_CHOICES = [
+        ('none', 'Sem Arquivo'),
+        ('pending', 'Pendente'),
+        ('processing', 'Processando'),
+        ('ready', 'Pronto'),
+        ('failed', 'Falhou'),
+    ]
+    
     title = models.CharField(max_length=200, verbose_name="Título")
     description = models.TextField(verbose_name="Descrição")
     category = models.ForeignKey(
@@ -78,7 +87,9 @@ class Material(models.Model):
     file_type = models.CharField(
         max_length=20, 
         choices=FILE_TYPE_CHOICES,
-        verbose_name="Tipo de Arquivo"
+        blank=True,
+        verbose_name="Tipo de Arquivo",
+        help_text="Deixe em branco para detectar pelo arquivo enviado"
     )
     
     # Para arquivos locais
@@ -147,6 +158,46 @@ class Material(models.Model):
         default=0,
         verbose_name="Contagem de Downloads"
     )
+    checksum = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        editable=False,
+        verbose_name="SHA-256"
+    )
+    # O arquivo é gravado pelo hash do conteúdo; o download usa o nome enviado
+    original_filename = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name="Nome Original do Arquivo"
+    )
+    page_count = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Páginas"
+    )
+    duration_seconds = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Duração (segundos)"
+    )
+    
+    # Extração de metadados em segundo plano (comando process_material_uploads)
+    metadata_status = models.CharField(
+        max_length=20,
+        choices=METADATA_STATUS_CHOICES,
+        default='none',
+        verbose_name="Metadados"
+    )
+    metadata_next_attempt_at = models.DateTimeField(null=True, blank=True)
+    # Identifica o lote que reservou o material (MaterialUploadService._claim_batch)
+    metadata_claim_token = models.UUIDField(
+        null=True,
+        blank=True,
+        db_index=True,
+        editable=False
+    )
     
     # Tags para busca
     tags = models.CharField(
@@ -163,11 +214,26 @@ class Material(models.Model):
         verbose_name = "Material de Apoio"
         verbose_name_plural = "Materiais de Apoio"
         ordering = ['-is_featured', 'order', '-created_at']
+        indexes = [
+            # Paginação por keyset e facetas da listagem de materiais ativos
+            models.Index(
+                fields=['is_active', '-is_featured', 'order', '-created_at', '-id'],
+                name='material_catalog_idx'
+            ),
+            models.Index(fields=['is_active', 'category', 'file_type'], name='material_facets_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
     def save(self, *args, **kwargs):
+        from .services import MaterialUploadService
+        
+        if self.file and not self.file._committed:
+            # Upload novo: hash em blocos, deduplicação e metadados em segundo plano
+            MaterialUploadService.ingest(self)
+        if not self.file_type:
+            self.file_type = MaterialUploadService.guess_file_type(self)
         # Calcular tamanho do arquivo se não foi definido
         if self.file and not self.file_size:
             try:
@@ -255,12 +321,17 @@ class MaterialDownload(models.Model):
         verbose_name="User Agent"
     )
     
-    downloaded_at = models.DateTimeField(auto_now_add=True)
+    # Preenchido no registro do download, não na gravação do buffer
+    downloaded_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         verbose_name = "Download de Material"
         verbose_name_plural = "Downloads de Materiais"
         ordering = ['-downloaded_at']
+        indexes = [
+            # Agregação diária e retenção percorrem os downloads por data
+            models.Index(fields=['downloaded_at'], name='material_download_date_idx'),
+        ]
     
     def __str__(self):
         user_info = self.user.get_full_name() if self.user else (
@@ -324,3 +395,59 @@ class MaterialAccess(models.Model):
     def is_valid(self):
         """Verifica se o acesso está válido"""
         return self.is_active and not self.is_expired
+
+
+class MaterialDownloadDaily(models.Model):
+    """
+    Downloads agregados por material e dia (comando rollup_material_downloads).
+    Os relatórios leem daqui, sem percorrer os downloads individuais.
+    """
+    material = models.ForeignKey(
+        Material,
+        on_delete=models.CASCADE,
+        related_name='daily_downloads',
+        verbose_name="Material"
+    )
+    date = models.DateField(verbose_name="Data")
+    downloads = models.PositiveIntegerField(default=0, verbose_name="Downloads")
+    unique_users = models.PositiveIntegerField(default=0, verbose_name="Usuários Únicos")
+    unique_ips = models.PositiveIntegerField(default=0, verbose_name="IPs Únicos")
+
+    class Meta:
+        verbose_name = "Downloads Diários por Material"
+        verbose_name_plural = "Downloads Diários por Material"
+        unique_together = ['material', 'date']
+        ordering = ['-date', '-downloads']
+        indexes = [
+            models.Index(fields=['date'], name='material_daily_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.material.title} - {self.date:%d/%m/%Y}"
+
+
+class CategoryDownloadDaily(models.Model):
+    """
+    Downloads agregados por categoria e dia, calculados a partir de MaterialDownloadDaily
+    """
+    category = models.ForeignKey(
+        MaterialCategory,
+        on_delete=models.CASCADE,
+        related_name='daily_downloads',
+        verbose_name="Categoria"
+    )
+    date = models.DateField(verbose_name="Data")
+    downloads = models.PositiveIntegerField(default=0, verbose_name="Downloads")
+    materials = models.PositiveIntegerField(default=0, verbose_name="Materiais Baixados")
+
+    class Meta:
+        verbose_name = "Downloads Diários por Categoria"
+        verbose_name_plural = "Downloads Diários por Categoria"
+        unique_together = ['category', 'date']
+        ordering = ['-date', '-downloads']
+        indexes = [
+            models.Index(fields=['date'], name='category_daily_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.category.name} - {self.date:%d/%m/%Y}"
@@ -0,0 +1,677 @@
+import base64
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta, time as dt_time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from services import fulltext
+
+logger = logging.getLogger(__name__)
+
+
+class MaterialSearchService:
+    """
+    Busca textual dos materiais.
+
+    O índice fica em uma tabela separada (materials_material_search), criada pela
+    migração conforme o banco (services.fulltext): FTS5 com bm25 no SQLite,
+    tsvector com ts_rank_cd no PostgreSQL. Em outros bancos (ou sem o índice) a
+    busca volta ao LIKE nos campos.
+    """
+    # Título, tags, descrição, do mais para o menos relevante
+    INDEX = fulltext.FullTextIndex(
+        'materials_material_search', 'materials_material', 'material_id',
+        ('title', 'tags', 'description'), (10, 5, 1)
+    )
+
+    @classmethod
+    def is_available(cls):
+        return cls.INDEX.is_available()
+
+    @classmethod
+    def search(cls, queryset, query):
+        """
+        Filtra o queryset pelos termos da busca, ordenado por relevância.
+        O índice entra na própria consulta (junção pelo id): os filtros da listagem
+        (ativos, categoria) e as contagens das facetas valem sobre todos os resultados.
+        """
+        tokens = fulltext.tokenize(query)
+        if not tokens:
+            return queryset
+        if not cls.is_available():
+            return cls._like_search(queryset, query)
+        return cls.INDEX.match(queryset, tokens).order_by('search_rank', '-pk')
+
+    @classmethod
+    def index(cls, material):
+        """
+        Insere ou atualiza um material no índice
+        """
+        cls.INDEX.index(material.pk, [material.title, material.tags, material.description])
+
+    @classmethod
+    def remove(cls, material_id):
+        cls.INDEX.remove(material_id)
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Reconstrói o índice inteiro a partir da tabela de materiais.
+        Retorna o número de materiais indexados.
+        """
+        if not cls.is_available():
+            return 0
+        return cls.INDEX.rebuild()
+
+    @classmethod
+    def _like_search(cls, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(tags__icontains=query)
+        )
+
+
+class MaterialCatalogService:
+    """
+    Facetas e paginação da biblioteca de materiais.
+
+    As contagens por categoria, tipo de arquivo e nível de acesso saem de uma única
+    agregação agrupada, guardada em cache por assinatura do filtro e invalidada por
+    uma versão incrementada a cada alteração de material. As páginas usam keyset
+    (cursor com os valores da ordenação), com custo constante em qualquer página.
+    """
+    VERSION_KEY = 'materials:catalog:version'
+    FACETS_KEY = 'materials:facets:{}:{}'
+    ORDERING = ('-is_featured', 'order', '-created_at', '-pk')
+
+    @classmethod
+    def facets(cls, queryset, signature, category=None):
+        """
+        Contagens do queryset; as categorias ignoram o filtro de categoria
+        """
+        digest = hashlib.sha1(json.dumps(signature, sort_keys=True).encode()).hexdigest()
+        key = cls.FACETS_KEY.format(cls._version(), digest)
+        rows = cache.get(key)
+        if rows is None:
+            rows = [
+                (row['category__slug'], row['file_type'], row['access_level'], row['total'])
+                for row in queryset.order_by().values(
+                    'category__slug', 'file_type', 'access_level'
+                ).annotate(total=Count('pk'))
+            ]
+            cache.set(key, rows, getattr(settings, 'MATERIAL_FACETS_CACHE_SECONDS', 300))
+
+        facets = {'total': 0, 'categories': {}, 'file_types': {}, 'access_levels': {}}
+        for category_slug, file_type, access_level, total in rows:
+            facets['categories'][category_slug] = facets['categories'].get(category_slug, 0) + total
+            if category and category_slug != category:
+                continue
+            facets['total'] += total
+            facets['file_types'][file_type] = facets['file_types'].get(file_type, 0) + total
+            facets['access_levels'][access_level] = facets['access_levels'].get(access_level, 0) + total
+        return facets
+
+    @classmethod
+    def invalidate(cls):
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_KEY, 1, None)
+
+    @classmethod
+    def page(cls, queryset, cursor=None, size=None, ranked=False):
+        """
+        Retorna (materiais da página, cursor da próxima página ou None).
+        Resultados de busca (ranked) já vêm ordenados e limitados por relevância:
+        o cursor é a posição no ranking.
+        """
+        size = size or getattr(settings, 'MATERIALS_PER_PAGE', 24)
+        position = cls._decode(cursor)
+
+        if ranked:
+            offset = position if isinstance(position, int) else 0
+            items = list(queryset[offset:offset + size + 1])
+            next_cursor = cls._encode(offset + size) if len(items) > size else None
+            return items[:size], next_cursor
+
+        if isinstance(position, list):
+            queryset = queryset.filter(cls._after(*position))
+        items = list(queryset.order_by(*cls.ORDERING)[:size + 1])
+        next_cursor = None
+        if len(items) > size:
+            last = items[size - 1]
+            next_cursor = cls._encode([last.is_featured, last.order, last.created_at.isoformat(), last.pk])
+        return items[:size], next_cursor
+
+    @staticmethod
+    def _after(is_featured, order, created_at, pk):
+        # Equivalente a (-is_featured, order, -created_at, -pk) > valores do cursor
+        return (
+            Q(is_featured__lt=is_featured) |
+            Q(is_featured=is_featured, order__gt=order) |
+            Q(is_featured=is_featured, order=order, created_at__lt=created_at) |
+            Q(is_featured=is_featured, order=order, created_at=created_at, pk__lt=pk)
+        )
+
+    @staticmethod
+    def _encode(value):
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+    @staticmethod
+    def _decode(cursor):
+        """
+        Posição no ranking (int) ou valores da ordenação [is_featured, order,
+        created_at, pk]. Cursor adulterado ou inválido volta à primeira página (None).
+        """
+        if not cursor:
+            return None
+        try:
+            value = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        except ValueError:
+            return None
+
+        def is_int(item):
+            return isinstance(item, int) and not isinstance(item, bool) and -2 ** 63 < item < 2 ** 63
+
+        if is_int(value) and value >= 0:
+            return value
+        if not isinstance(value, list) or len(value) != 4:
+            return None
+        is_featured, order, created_at, pk = value
+        if not (isinstance(is_featured, bool) and is_int(order) and is_int(pk) and isinstance(created_at, str)):
+            return None
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except ValueError:
+            return None
+        if timezone.is_naive(created_at):
+            return None
+        return [is_featured, order, created_at, pk]
+
+    @classmethod
+    def _version(cls):
+        return cache.get_or_set(cls.VERSION_KEY, 1, None)
+
+
+class MaterialDownloadService:
+    """
+    Telemetria de downloads.
+
+    Cada download fica em um buffer do processo: o contador por material e o
+    registro MaterialDownload ainda não salvo, com o horário do download. O
+    buffer é gravado quando atinge MATERIAL_DOWNLOAD_BUFFER_SIZE downloads, a
+    cada MATERIAL_DOWNLOAD_FLUSH_SECONDS (thread do processo, mesmo sem novos
+    downloads) ou na saída do processo: um bulk_create dos registros e um UPDATE
+    com F() por incremento, sem o read-modify-write que perdia downloads simultâneos.
+    """
+    _lock = threading.Lock()
+    _counts = {}
+    _events = []
+    _last_flush = time.monotonic()
+    _flusher_pid = None
+
+    @classmethod
+    def record(cls, material, user=None, ip_address=None, user_agent=''):
+        """
+        Registra um download no buffer, gravando-o se estiver cheio ou antigo
+        """
+        from .models import MaterialDownload
+
+        cls.start_flusher()
+        event = MaterialDownload(
+            material_id=material.pk,
+            user=user,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            downloaded_at=timezone.now()
+        )
+        with cls._lock:
+            cls._events.append(event)
+            cls._counts[material.pk] = cls._counts.get(material.pk, 0) + 1
+            due = (
+                len(cls._events) >= getattr(settings, 'MATERIAL_DOWNLOAD_BUFFER_SIZE', 100)
+                or time.monotonic() - cls._last_flush >= getattr(settings, 'MATERIAL_DOWNLOAD_FLUSH_SECONDS', 10)
+            )
+        if due:
+            cls.flush()
+
+    @classmethod
+    def start_flusher(cls):
+        """
+        Inicia a thread de gravação periódica, uma por processo. Pelo pid, workers
+        criados por fork depois de o buffer existir também iniciam a sua.
+        """
+        with cls._lock:
+            if cls._flusher_pid == os.getpid():
+                return
+            cls._flusher_pid = os.getpid()
+        threading.Thread(target=cls._flush_periodically, name='material-downloads-flush', daemon=True).start()
+
+    @classmethod
+    def _flush_periodically(cls):
+        while True:
+            time.sleep(1)
+            if time.monotonic() - cls._last_flush < getattr(settings, 'MATERIAL_DOWNLOAD_FLUSH_SECONDS', 10):
+                continue
+            try:
+                cls.flush()
+            except Exception as e:
+                logger.error(f"Error in periodic material downloads flush: {str(e)}")
+            finally:
+                # Conexão própria da thread: não fica aberta entre as gravações
+                connection.close()
+
+    @classmethod
+    def flush(cls):
+        """
+        Grava o buffer no banco. Retorna o número de downloads gravados.
+        """
+        from .models import Material, MaterialDownload
+
+        with cls._lock:
+            events, counts = cls._events, cls._counts
+            cls._events, cls._counts = [], {}
+            cls._last_flush = time.monotonic()
+        if not events:
+            return 0
+
+        try:
+            with transaction.atomic():
+                # Materiais apagados enquanto estavam no buffer são descartados
+                existing = set(Material.objects.filter(pk__in=list(counts)).order_by().values_list('pk', flat=True))
+                events = [event for event in events if event.material_id in existing]
+                MaterialDownload.objects.bulk_create(events, batch_size=500)
+
+                by_increment = {}
+                for material_id, increment in counts.items():
+                    if material_id in existing:
+                        by_increment.setdefault(increment, []).append(material_id)
+                for increment, material_ids in by_increment.items():
+                    Material.objects.filter(pk__in=material_ids).update(
+                        download_count=F('download_count') + increment
+                    )
+        except DatabaseError as e:
+            # Devolve ao buffer para a próxima gravação
+            with cls._lock:
+                cls._events[:0] = events
+                for material_id, increment in counts.items():
+                    cls._counts[material_id] = cls._counts.get(material_id, 0) + increment
+            logger.error(f"Error flushing material downloads: {str(e)}")
+            return 0
+        return len(events)
+
+
+class MaterialDownloadRollupService:
+    """
+    Agregação diária dos downloads e retenção dos registros brutos.
+
+    Cada execução recalcula por completo os dias do intervalo (idempotente) em
+    MaterialDownloadDaily e, a partir dela, CategoryDownloadDaily. Registros
+    brutos mais antigos que a retenção são arquivados em NDJSON compactado e
+    apagados, mas só para dias que já foram agregados.
+    """
+
+    @classmethod
+    def rollup(cls, since=None, until=None):
+        """
+        Agrega os downloads de since até until (datas locais, inclusive).
+        Sem since, continua do último dia agregado. Retorna o número de linhas por material.
+        """
+        from .models import CategoryDownloadDaily, MaterialDownload, MaterialDownloadDaily
+
+        first_download = MaterialDownload.objects.aggregate(first=Min('downloaded_at'))['first']
+        if first_download is None:
+            return 0
+        until = until or timezone.localdate()
+        # Dias anteriores ao download mais antigo já foram podados: mantém o que foi agregado
+        since = max(
+            since or MaterialDownloadDaily.objects.aggregate(last=Max('date'))['last'] or date.min,
+            timezone.localdate(first_download)
+        )
+        if since > until:
+            return 0
+
+        rows = [
+            MaterialDownloadDaily(**row)
+            for row in MaterialDownload.objects.filter(
+                downloaded_at__gte=cls._start_of(since),
+                downloaded_at__lt=cls._start_of(until + timedelta(days=1))
+            ).order_by().annotate(date=TruncDate('downloaded_at')).values('material_id', 'date').annotate(
+                downloads=Count('pk'),
+                unique_users=Count('user_id', distinct=True),
+                unique_ips=Count('ip_address', distinct=True)
+            )
+        ]
+
+        with transaction.atomic():
+            MaterialDownloadDaily.objects.filter(date__gte=since, date__lte=until).delete()
+            MaterialDownloadDaily.objects.bulk_create(rows, batch_size=500)
+
+            CategoryDownloadDaily.objects.filter(date__gte=since, date__lte=until).delete()
+            CategoryDownloadDaily.objects.bulk_create(
+                [
+                    CategoryDownloadDaily(
+                        category_id=category_id,
+                        date=day,
+                        downloads=downloads,
+                        materials=materials
+                    )
+                    for category_id, day, downloads, materials in MaterialDownloadDaily.objects.filter(
+                        date__gte=since,
+                        date__lte=until
+                    ).order_by().values('material__category_id', 'date').annotate(
+                        downloads=Sum('downloads'),
+                        materials=Count('material_id')
+                    ).values_list('material__category_id', 'date', 'downloads', 'materials')
+                ],
+                batch_size=500
+            )
+        return len(rows)
+
+    @classmethod
+    def prune(cls, retention_days=None, archive=True, batch_size=2000):
+        """
+        Apaga (e arquiva, se pedido) os downloads brutos anteriores à retenção.
+        Retorna (registros apagados, caminho do arquivo ou None).
+        """
+        from .models import MaterialDownload, MaterialDownloadDaily
+
+        if retention_days is None:
+            retention_days = getattr(settings, 'MATERIAL_DOWNLOAD_RETENTION_DAYS', 180)
+        last_rollup = MaterialDownloadDaily.objects.aggregate(last=Max('date'))['last']
+        if last_rollup is None:
+            return 0, None
+        # O último dia agregado pode ter recebido downloads depois da agregação
+        cutoff = cls._start_of(min(timezone.localdate() - timedelta(days=retention_days), last_rollup))
+        expired = MaterialDownload.objects.filter(downloaded_at__lt=cutoff).order_by('pk')
+
+        path = None
+        last_pk = None
+        if archive:
+            path, last_pk = cls._archive(expired, cutoff, batch_size)
+            if last_pk is None:
+                return 0, None
+            expired = expired.filter(pk__lte=last_pk)
+
+        deleted = 0
+        while True:
+            ids = list(expired.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted += MaterialDownload.objects.filter(pk__in=ids).delete()[0]
+        return deleted, path
+
+    @classmethod
+    def _archive(cls, queryset, cutoff, batch_size):
+        # Grava em um arquivo temporário e só o renomeia quando completo
+        archive_root = getattr(
+            settings,
+            'MATERIAL_DOWNLOAD_ARCHIVE_ROOT',
+            os.path.join(settings.BASE_DIR, 'archive', 'material_downloads')
+        )
+        os.makedirs(archive_root, exist_ok=True)
+        path = os.path.join(
+            archive_root,
+            f"material_downloads_until_{timezone.localtime(cutoff):%Y%m%d}_{timezone.now():%Y%m%d%H%M%S}.ndjson.gz"
+        )
+        fields = ('pk', 'material_id', 'user_id', 'guest_name', 'guest_email', 'ip_address', 'user_agent', 'downloaded_at')
+        last_pk = None
+        with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as archive:
+            while True:
+                batch = queryset.filter(pk__gt=last_pk or 0).values_list(*fields)[:batch_size]
+                rows = list(batch)
+                if not rows:
+                    break
+                for row in rows:
+                    record = dict(zip(fields, row))
+                    record['downloaded_at'] = record['downloaded_at'].isoformat()
+                    archive.write(json.dumps(record, ensure_ascii=False) + '\n')
+                last_pk = rows[-1][0]
+        if last_pk is None:
+            os.remove(path + '.tmp')
+            return None, None
+        os.replace(path + '.tmp', path)
+        return path, last_pk
+
+    @staticmethod
+    def _start_of(day):
+        return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+class MaterialUploadService:
+    """
+    Ingestão dos arquivos de materiais.
+
+    No salvamento o upload é lido uma vez em blocos para o SHA-256 e gravado em
+    materials/<2 primeiros>/<hash>.<ext>; se o conteúdo já existe no storage, o
+    material só aponta para ele. Páginas, duração e thumbnail são extraídos
+    depois, em lotes, pelo comando process_material_uploads.
+    """
+    CHUNK_SIZE = 1024 * 1024
+    # Tempo que um material fica reservado antes de voltar para a fila (worker caiu)
+    LEASE_SECONDS = 600
+
+    EXTENSION_TYPES = {
+        '.pdf': 'pdf',
+        '.doc': 'document', '.docx': 'document', '.xls': 'document', '.xlsx': 'document',
+        '.ppt': 'presentation', '.pptx': 'presentation',
+        '.mp4': 'video', '.webm': 'video', '.avi': 'video', '.mov': 'video',
+        '.jpg': 'image', '.jpeg': 'image', '.png': 'image', '.gif': 'image', '.webp': 'image',
+    }
+    METADATA_FIELDS = ('page_count', 'duration_seconds', 'thumbnail')
+    PDF_COUNT_PATTERNS = (
+        re.compile(rb'/Type\s*/Pages\b[^>]*?/Count\s+(\d+)'),
+        re.compile(rb'/Count\s+(\d+)[^>]*?/Type\s*/Pages\b'),
+    )
+    PDF_PAGE_PATTERN = re.compile(rb'/Type\s*/Page\b')
+    PDF_OVERLAP = 4096
+
+    @classmethod
+    def ingest(cls, material):
+        """
+        Prepara um upload novo antes do save: checksum, nome pelo conteúdo e deduplicação
+        """
+        from .models import Material
+
+        upload = material.file
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in upload.chunks(cls.CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+        upload.seek(0)
+        checksum = digest.hexdigest()
+
+        material.original_filename = os.path.basename(upload.name)[:255]
+        extension = os.path.splitext(upload.name)[1].lower()
+        name = f"{checksum[:2]}/{checksum}{extension}"
+        field = material._meta.get_field('file')
+        stored_name = field.generate_filename(material, name)
+        if upload.storage.exists(stored_name):
+            # Mesmo conteúdo já enviado: reaproveita o arquivo sem gravar de novo
+            material.file = stored_name
+        else:
+            upload.name = name
+
+        material.checksum = checksum
+        material.file_size = size
+        material.page_count = material.duration_seconds = None
+        material.metadata_status = 'pending'
+        material.metadata_next_attempt_at = None
+
+        twin = Material.objects.filter(checksum=checksum, metadata_status='ready').exclude(
+            pk=material.pk
+        ).values(*cls.METADATA_FIELDS).first()
+        if twin:
+            material.page_count = twin['page_count']
+            material.duration_seconds = twin['duration_seconds']
+            if not material.thumbnail and twin['thumbnail']:
+                material.thumbnail = twin['thumbnail']
+            material.metadata_status = 'ready'
+
+    @classmethod
+    def guess_file_type(cls, material):
+        if material.file:
+            return cls.EXTENSION_TYPES.get(os.path.splitext(material.file.name)[1].lower(), 'document')
+        if material.external_url:
+            return 'link'
+        return ''
+
+    @classmethod
+    def process_batch(cls, batch_size=20):
+        """
+        Extrai os metadados de um lote de uploads pendentes. Retorna quantos foram processados.
+        """
+        from .models import Material
+
+        processed = 0
+        for material in cls._claim_batch(batch_size):
+            updates = {'metadata_status': 'ready', 'metadata_next_attempt_at': None}
+            try:
+                updates.update(cls.extract(material))
+            except Exception as e:
+                logger.error(f"Error extracting metadata of material {material.pk}: {str(e)}")
+                updates['metadata_status'] = 'failed'
+            # update() direto: metadados não mudam a busca nem as facetas
+            Material.objects.filter(pk=material.pk).update(**updates)
+            processed += 1
+        return processed
+
+    @classmethod
+    def extract(cls, material):
+        """
+        Metadados do arquivo: páginas (PDF), duração (MP4/MOV) e thumbnail (imagens)
+        """
+        updates = {}
+        file_type = cls.EXTENSION_TYPES.get(material.file_extension)
+        with material.file.open('rb') as file:
+            if not material.checksum:
+                # Arquivos enviados antes da ingestão por conteúdo
+                digest = hashlib.sha256()
+                for chunk in iter(lambda: file.read(cls.CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                updates['checksum'] = material.checksum = digest.hexdigest()
+                file.seek(0)
+            if material.file_extension == '.pdf':
+                updates['page_count'] = cls.pdf_page_count(file)
+            elif material.file_extension in ('.mp4', '.mov'):
+                updates['duration_seconds'] = cls.mp4_duration(file)
+            elif file_type == 'image' and not material.thumbnail:
+                updates['thumbnail'] = cls.image_thumbnail(material, file)
+        return {field: value for field, value in updates.items() if value is not None}
+
+    @classmethod
+    def pdf_page_count(cls, file):
+        # Sem biblioteca de PDF: usa o /Count da árvore de páginas (ou conta /Page).
+        # PDFs com object streams compactados podem não expor nenhum dos dois.
+        # Lido em blocos: os últimos PDF_OVERLAP bytes de cada bloco só são examinados
+        # com o bloco seguinte, para não perder nem contar duas vezes um marcador na divisa.
+        counts = []
+        pages = 0
+        pending = b''
+        while True:
+            chunk = file.read(cls.CHUNK_SIZE)
+            data = pending + chunk
+            limit = len(data) - cls.PDF_OVERLAP if chunk else len(data)
+            for pattern in cls.PDF_COUNT_PATTERNS:
+                counts += [int(match.group(1)) for match in pattern.finditer(data) if match.start() < limit]
+            pages += sum(1 for match in cls.PDF_PAGE_PATTERN.finditer(data) if match.start() < limit)
+            if not chunk:
+                break
+            pending = data[max(limit, 0):]
+        if counts:
+            return max(counts)
+        return pages or None
+
+    @classmethod
+    def mp4_duration(cls, file):
+        """
+        Duração em segundos lida do átomo mvhd (MP4/MOV), sem ler o vídeo
+        """
+        def boxes(end):
+            while file.tell() + 8 <= end:
+                start = file.tell()
+                size, kind = struct.unpack('>I4s', file.read(8))
+                if size == 1:
+                    size = struct.unpack('>Q', file.read(8))[0]
+                elif size == 0:
+                    size = end - start
+                if size < 8:
+                    return
+                yield kind, start, start + size
+                file.seek(start + size)
+
+        file_end = file.seek(0, os.SEEK_END)
+        file.seek(0)
+        for kind, start, end in boxes(file_end):
+            if kind != b'moov':
+                continue
+            file.seek(start + 8)
+            for child, child_start, child_end in boxes(end):
+                if child != b'mvhd':
+                    continue
+                version = file.read(1)[0]
+                file.read(3)
+                if version == 1:
+                    _, _, timescale, duration = struct.unpack('>QQIQ', file.read(28))
+                else:
+                    _, _, timescale, duration = struct.unpack('>IIII', file.read(16))
+                return round(duration / timescale) if timescale else None
+        return None
+
+    @classmethod
+    def image_thumbnail(cls, material, file):
+        from PIL import Image
+
+        size = getattr(settings, 'MATERIAL_THUMBNAIL_SIZE', 480)
+        with Image.open(file) as image:
+            image.thumbnail((size, size))
+            output = io.BytesIO()
+            image.convert('RGB').save(output, format='JPEG', quality=85)
+        thumbnail = material.thumbnail
+        thumbnail.save(f"{material.checksum or material.pk}.jpg", ContentFile(output.getvalue()), save=False)
+        return thumbnail.name
+
+    @classmethod
+    def _claim_batch(cls, batch_size):
+        """
+        Reserva um lote de materiais com metadados pendentes.
+        O UPDATE repete a condição de "pendente" e grava um token do lote: só voltam os
+        materiais que este UPDATE reservou, mesmo que outro worker tenha lido os mesmos.
+        """
+        from .models import Material
+
+        now = timezone.now()
+        ready = (
+            Q(metadata_status='pending') |
+            Q(metadata_status='processing', metadata_next_attempt_at__lte=now)
+        )
+        token = uuid.uuid4()
+        with transaction.atomic():
+            queryset = Material.objects.filter(ready).order_by('pk')
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            candidates = list(queryset.values_list('pk', flat=True)[:batch_size])
+
+            Material.objects.filter(ready, pk__in=candidates).update(
+                metadata_status='processing',
+                metadata_next_attempt_at=now + timedelta(seconds=cls.LEASE_SECONDS),
+                metadata_claim_token=token
+            )
+        return list(Material.objects.filter(metadata_claim_token=token).order_by('pk'))
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Material
+from .services import MaterialCatalogService, MaterialSearchService
+
+
+@receiver(post_save, sender=Material)
+def index_material(sender, instance, raw=False, **kwargs):
+    """Mantém o índice de busca em dia com o material salvo"""
+    if not raw:
+        MaterialSearchService.index(instance)
+    MaterialCatalogService.invalidate()
+
+
+@receiver(post_delete, sender=Material)
+def unindex_material(sender, instance, **kwargs):
+    MaterialSearchService.remove(instance.pk)
+    MaterialCatalogService.invalidate()
@@ -1,3 +1,469 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import Sum
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from .models import (
+    CategoryDownloadDaily, Material, MaterialCategory, MaterialDownload, MaterialDownloadDaily
+)
+from .services import (
+    MaterialCatalogService, MaterialDownloadRollupService, MaterialDownloadService, MaterialSearchService,
+    MaterialUploadService
+)
+
+
+class MaterialSearchTests(TestCase):
+    """
+    Busca textual com ranking e sem acentos
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = MaterialCategory.objects.create(name='Segurança')
+
+    def create_material(self, title, description='', tags=''):
+        return Material.objects.create(
+            title=title,
+            description=description,
+            tags=tags,
+            category=self.category,
+            file_type='pdf',
+        )
+
+    def search(self, query):
+        return list(MaterialSearchService.search(Material.objects.all(), query))
+
+    def test_search_is_accent_insensitive_and_ranked(self):
+        self.assertTrue(MaterialSearchService.is_available())
+        in_description = self.create_material('Checklist', description='Itens de segurança para rapel')
+        in_title = self.create_material('Segurança no rapel', description='Guia completo')
+        self.create_material('Roteiro de trilha', description='Mapa da caminhada')
+
+        self.assertEqual(self.search('seguranca rapel'), [in_title, in_description])
+        self.assertEqual(self.search('SEGURANÇA'), [in_title, in_description])
+        self.assertEqual(self.search('segur'), [in_title, in_description])
+
+    def test_index_follows_save_and_delete(self):
+        material = self.create_material('Nós e ancoragens', tags='corda, mosquetão')
+        self.assertEqual(self.search('mosquetao'), [material])
+
+        material.tags = 'capacete'
+        material.save()
+        self.assertEqual(self.search('mosquetao'), [])
+        self.assertEqual(self.search('capacete'), [material])
+
+        material.delete()
+        self.assertEqual(self.search('capacete'), [])
+
+    def test_rebuild_indexes_bulk_created_materials(self):
+        Material.objects.bulk_create([
+            Material(title=f'Caiaque {i}', description='-', category=self.category, file_type='video')
+            for i in range(3)
+        ])
+        self.assertEqual(self.search('caiaque'), [])
+        self.assertEqual(MaterialSearchService.rebuild(), 3)
+        self.assertEqual(len(self.search('caiaque')), 3)
+
+    def test_listing_filters_and_facets_cover_every_match(self):
+        # Inativos mais relevantes (no título) não tomam o lugar dos ativos
+        Material.objects.bulk_create(
+            [Material(title='Rafting', description='-', category=self.category, file_type='video', is_active=False)
+             for _ in range(50)] +
+            [Material(title=f'Guia {i}', description='rafting', category=self.category, file_type='pdf')
+             for i in range(600)]
+        )
+        MaterialSearchService.rebuild()
+
+        materials = MaterialSearchService.search(Material.objects.filter(is_active=True), 'rafting')
+        facets = MaterialCatalogService.facets(materials, {'search': 'rafting'})
+        self.assertEqual(facets['total'], 600)
+        self.assertEqual(facets['file_types'], {'pdf': 600})
+        page, cursor = MaterialCatalogService.page(materials, MaterialCatalogService._encode(576), ranked=True)
+        self.assertEqual((len(page), cursor), (24, None))
+
+
+class MaterialCatalogTests(TestCase):
+    """
+    Facetas em cache e paginação por cursor
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.guides = MaterialCategory.objects.create(name='Guias')
+        cls.videos = MaterialCategory.objects.create(name='Vídeos')
+        for i in range(7):
+            Material.objects.create(
+                title=f'Guia {i}',
+                description='-',
+                category=cls.guides,
+                file_type='pdf',
+                order=i % 3,
+                is_featured=(i == 5),
+            )
+        for i in range(3):
+            Material.objects.create(title=f'Vídeo {i}', description='-', category=cls.videos, file_type='video')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_facets_use_one_query_and_are_cached(self):
+        materials = Material.objects.filter(is_active=True)
+        with self.assertNumQueries(1):
+            facets = MaterialCatalogService.facets(materials, {'search': ''}, category=self.guides.slug)
+        self.assertEqual(facets['total'], 7)
+        self.assertEqual(facets['categories'], {self.guides.slug: 7, self.videos.slug: 3})
+        self.assertEqual(facets['file_types'], {'pdf': 7})
+
+        with self.assertNumQueries(0):
+            facets = MaterialCatalogService.facets(materials, {'search': ''})
+        self.assertEqual(facets['total'], 10)
+        self.assertEqual(facets['file_types'], {'pdf': 7, 'video': 3})
+
+        Material.objects.filter(title='Vídeo 0').get().delete()
+        facets = MaterialCatalogService.facets(materials, {'search': ''})
+        self.assertEqual(facets['file_types'], {'pdf': 7, 'video': 2})
+
+    def test_keyset_pages_follow_the_ordering(self):
+        materials = Material.objects.filter(is_active=True)
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = MaterialCatalogService.page(materials, cursor, size=3)
+            seen.extend(page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, list(materials.order_by(*MaterialCatalogService.ORDERING)))
+
+        # Cursor inválido volta para a primeira página
+        page, _ = MaterialCatalogService.page(materials, 'inválido', size=3)
+        self.assertEqual(page, seen[:3])
+
+    def test_list_view_shows_counts_and_next_page(self):
+        with self.settings(MATERIALS_PER_PAGE=4):
+            response = self.client.get('/materiais/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_materials'], 10)
+        self.assertEqual(response.context['videos_count'], 3)
+        self.assertEqual(len(response.context['materials']), 4)
+        self.assertContains(response, 'Carregar mais')
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        first = list(Material.objects.filter(is_active=True).order_by(*MaterialCatalogService.ORDERING)[:4])
+        tampered = [
+            [True, 0, 'nope', 1],
+            [True, 0, 5, 1],
+            [1, {}, '2020-01-01', 1],
+            [True, 0, '2020-01-01T00:00:00', 1],
+            [True, 0, timezone.now().isoformat(), 10 ** 30],
+            [True, 0, timezone.now().isoformat()],
+            {'offset': 4},
+            10 ** 30,
+        ]
+        for value in tampered + ['inválido', '%%%']:
+            cursor = value if isinstance(value, str) else MaterialCatalogService._encode(value)
+            with self.subTest(cursor=value), self.settings(MATERIALS_PER_PAGE=4):
+                response = self.client.get('/materiais/', {'cursor': cursor}, HTTP_HOST='localhost')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['materials']), first)
+
+
+@override_settings(MATERIAL_DOWNLOAD_BUFFER_SIZE=1000, MATERIAL_DOWNLOAD_FLUSH_SECONDS=3600)
+class MaterialDownloadTests(TestCase):
+    """
+    Contadores de download em buffer
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = MaterialCategory.objects.create(name='Downloads')
+        cls.material = Material.objects.create(
+            title='Guia de rapel',
+            description='-',
+            category=category,
+            file_type='link',
+            external_url='https://example.com/guia.pdf',
+            access_level='public',
+        )
+        cls.other = Material.objects.create(title='Mapa', description='-', category=category, file_type='pdf')
+
+    def setUp(self):
+        MaterialDownloadService.flush()
+
+    def test_parallel_downloads_are_not_lost(self):
+        def download(material):
+            for _ in range(50):
+                MaterialDownloadService.record(material, ip_address='127.0.0.1')
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(download, [self.material] * 6 + [self.other] * 2))
+
+        self.assertEqual(MaterialDownloadService.flush(), 400)
+        MaterialDownloadService.record(self.material)
+        MaterialDownloadService.flush()
+
+        self.material.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.material.download_count, 301)
+        self.assertEqual(self.other.download_count, 100)
+        self.assertEqual(MaterialDownload.objects.filter(material=self.material).count(), 301)
+
+    def test_download_view_buffers_until_flush(self):
+        response = self.client.get(f'/materiais/download/{self.material.pk}/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(MaterialDownload.objects.exists())
+
+        MaterialDownloadService.flush()
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.download_count, 1)
+        self.assertEqual(MaterialDownload.objects.get().ip_address, '127.0.0.1')
+
+    def test_flush_keeps_download_time(self):
+        MaterialDownloadService.record(self.material)
+        later = timezone.now() + timedelta(hours=1)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            MaterialDownloadService.flush()
+        self.assertLess(MaterialDownload.objects.get().downloaded_at, later)
+
+    def test_periodic_flusher_starts_once_per_process(self):
+        MaterialDownloadService.record(self.material)
+        MaterialDownloadService.record(self.other)
+        MaterialDownloadService.flush()
+        names = [thread.name for thread in threading.enumerate()]
+        self.assertEqual(names.count('material-downloads-flush'), 1)
+
+
+class MaterialDownloadRollupTests(TestCase):
+    """
+    Agregação diária dos downloads e retenção dos registros brutos
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = MaterialCategory.objects.create(name='Relatórios')
+        cls.guide = Material.objects.create(title='Guia', description='-', category=cls.category, file_type='pdf')
+        cls.map = Material.objects.create(title='Mapa', description='-', category=cls.category, file_type='pdf')
+        cls.user = get_user_model().objects.create_user('leitor', 'leitor@example.com', 'senha')
+        cls.today = timezone.localdate()
+
+    def setUp(self):
+        self.archive_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_root)
+
+    def download(self, material, days_ago, user=None, ip='10.0.0.1'):
+        record = MaterialDownload.objects.create(material=material, user=user, ip_address=ip)
+        moment = timezone.make_aware(datetime.combine(self.today - timedelta(days=days_ago), datetime.min.time()))
+        MaterialDownload.objects.filter(pk=record.pk).update(downloaded_at=moment + timedelta(hours=12))
+
+    def test_rollup_aggregates_by_material_and_category(self):
+        self.download(self.guide, 1, user=self.user)
+        self.download(self.guide, 1, user=self.user, ip='10.0.0.2')
+        self.download(self.guide, 1)
+        self.download(self.map, 1)
+        self.download(self.map, 0)
+
+        self.assertEqual(MaterialDownloadRollupService.rollup(), 3)
+        guide = MaterialDownloadDaily.objects.get(material=self.guide)
+        self.assertEqual(
+            (guide.date, guide.downloads, guide.unique_users, guide.unique_ips),
+            (self.today - timedelta(days=1), 3, 1, 2)
+        )
+        self.assertEqual(
+            list(CategoryDownloadDaily.objects.order_by('date').values_list('downloads', 'materials')),
+            [(4, 2), (1, 1)]
+        )
+
+        # Reexecutar recalcula o último dia agregado sem duplicar
+        self.download(self.map, 0)
+        MaterialDownloadRollupService.rollup()
+        self.assertEqual(MaterialDownloadDaily.objects.get(material=self.map, date=self.today).downloads, 2)
+        self.assertEqual(MaterialDownloadDaily.objects.count(), 3)
+
+    def test_prune_archives_only_rolled_up_days(self):
+        self.download(self.guide, 40, user=self.user)
+        self.download(self.map, 35)
+        self.download(self.map, 2)
+
+        with self.settings(MATERIAL_DOWNLOAD_ARCHIVE_ROOT=self.archive_root):
+            # Sem agregação nada é apagado
+            self.assertEqual(MaterialDownloadRollupService.prune(retention_days=30), (0, None))
+
+            MaterialDownloadRollupService.rollup()
+            deleted, path = MaterialDownloadRollupService.prune(retention_days=30)
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(MaterialDownload.objects.count(), 1)
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            records = [json.loads(line) for line in archive]
+        self.assertEqual(sorted(record['material_id'] for record in records), sorted([self.guide.pk, self.map.pk]))
+
+        # Dias podados continuam nas agregações, mesmo recalculando desde o início
+        MaterialDownloadRollupService.rollup(since=self.today - timedelta(days=60))
+        self.assertEqual(
+            MaterialDownloadDaily.objects.aggregate(total=Sum('downloads'))['total'],
+            3
+        )
+
+    def test_admin_report_reads_rollups(self):
+        self.download(self.guide, 1, user=self.user)
+        self.download(self.guide, 2, user=self.user)
+        MaterialDownloadRollupService.rollup()
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'senha')
+        self.client.force_login(admin)
+
+        response = self.client.get('/admin/materials/materialdownloaddaily/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        # O mesmo usuário em dois dias: dois usuários-dia
+        self.assertEqual(
+            (response.context['top_materials'][0]['total'], response.context['top_materials'][0]['user_days']), (2, 2)
+        )
+        self.assertContains(response, 'Usuários-dia')
+
+    def test_admin_report_keeps_materials_with_the_same_title_apart(self):
+        other_guide = Material.objects.create(title='Guia', description='-', category=self.category, file_type='pdf')
+        self.download(self.guide, 1)
+        self.download(self.guide, 1, ip='10.0.0.2')
+        self.download(other_guide, 1)
+        MaterialDownloadRollupService.rollup()
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'senha')
+        self.client.force_login(admin)
+
+        response = self.client.get('/admin/materials/materialdownloaddaily/', HTTP_HOST='localhost')
+        self.assertEqual(
+            [(row['material_id'], row['title'], row['total']) for row in response.context['top_materials']],
+            [(self.guide.pk, 'Guia', 2), (other_guide.pk, 'Guia', 1)]
+        )
+
+
+class MaterialUploadTests(TestCase):
+    """
+    Uploads endereçados pelo conteúdo e metadados extraídos em lote
+    """
+    PDF = b'%PDF-1.4\n1 0 obj << /Type /Pages /Kids [2 0 R 3 0 R 4 0 R] /Count 3 >> endobj\n%%EOF'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = MaterialCategory.objects.create(name='Uploads')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = self.settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media_root = media_root
+
+    def upload(self, name, content, **kwargs):
+        return Material.objects.create(
+            title=name,
+            description='-',
+            category=self.category,
+            file=SimpleUploadedFile(name, content),
+            **kwargs
+        )
+
+    @override_settings(MATERIAL_DOWNLOAD_BUFFER_SIZE=1000, MATERIAL_DOWNLOAD_FLUSH_SECONDS=3600)
+    def test_download_counts_only_responses_that_start_the_file(self):
+        material = self.upload('Roteiro.pdf', self.PDF, access_level='public')
+        MaterialDownloadService.flush()
+        url = f'/materiais/download/{material.pk}/'
+
+        etag = self.client.get(url, HTTP_HOST='localhost')['ETag']
+        for headers, status in [
+            ({'HTTP_IF_NONE_MATCH': etag}, 304),
+            ({'HTTP_RANGE': 'bytes=10-'}, 206),
+            ({'HTTP_RANGE': 'bytes=0-9'}, 206),
+        ]:
+            self.assertEqual(self.client.get(url, HTTP_HOST='localhost', **headers).status_code, status)
+
+        self.assertEqual(MaterialDownloadService.flush(), 2)
+        material.refresh_from_db()
+        self.assertEqual(material.download_count, 2)
+
+    def test_download_keeps_original_filename(self):
+        material = self.upload('Roteiro da travessia.pdf', self.PDF, access_level='public')
+        self.assertEqual(material.original_filename, 'Roteiro da travessia.pdf')
+        response = self.client.get(f'/materiais/download/{material.pk}/', HTTP_HOST='localhost')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="Roteiro da travessia.pdf"')
+
+    def test_pdf_page_count_reads_in_chunks(self):
+        # Marcadores atravessando a divisa dos blocos não se perdem nem contam duas vezes
+        pages = b''.join(b'%d 0 obj << /Type /Page >> endobj\n' % i for i in range(50))
+        with mock.patch.multiple(MaterialUploadService, CHUNK_SIZE=7, PDF_OVERLAP=80):
+            self.assertEqual(MaterialUploadService.pdf_page_count(io.BytesIO(b'%PDF-1.4\n' + pages)), 50)
+            self.assertEqual(MaterialUploadService.pdf_page_count(io.BytesIO(self.PDF + pages)), 3)
+
+    def test_uploads_are_stored_by_content_hash_and_deduplicated(self):
+        checksum = hashlib.sha256(self.PDF).hexdigest()
+        first = self.upload('Roteiro.pdf', self.PDF)
+        self.assertEqual(first.file.name, f'materials/{checksum[:2]}/{checksum}.pdf')
+        self.assertEqual((first.checksum, first.file_size, first.file_type), (checksum, len(self.PDF), 'pdf'))
+        self.assertEqual(first.metadata_status, 'pending')
+
+        second = self.upload('Cópia do roteiro.pdf', self.PDF)
+        self.assertEqual(second.file.name, first.file.name)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'materials', checksum[:2])), [f'{checksum}.pdf'])
+
+        self.assertEqual(MaterialUploadService.process_batch(), 2)
+        first.refresh_from_db()
+        self.assertEqual((first.metadata_status, first.page_count), ('ready', 3))
+
+        # Conteúdo já processado: metadados copiados sem passar pela fila
+        third = self.upload('Roteiro (1).pdf', self.PDF)
+        self.assertEqual((third.metadata_status, third.page_count), ('ready', 3))
+
+    def test_claim_skips_materials_taken_by_another_worker(self):
+        materials = [self.upload(f'Roteiro {i}.pdf', self.PDF + b'%d' % i) for i in range(3)]
+        values_list = QuerySet.values_list
+
+        def stale_read(queryset, *args, **kwargs):
+            # Outro worker reserva dois dos materiais entre a leitura e o UPDATE
+            pks = list(values_list(queryset, *args, **kwargs))
+            Material.objects.filter(pk__in=pks[:2]).update(
+                metadata_status='processing',
+                metadata_next_attempt_at=timezone.now() + timedelta(minutes=5),
+                metadata_claim_token=uuid.uuid4()
+            )
+            return pks
+
+        with mock.patch.object(QuerySet, 'values_list', autospec=True, side_effect=stale_read):
+            claimed = MaterialUploadService._claim_batch(10)
+        self.assertEqual([material.pk for material in claimed], [materials[2].pk])
+
+    def test_video_duration_and_image_thumbnail(self):
+        mvhd = struct.pack('>I4sB3sIIII', 28, b'mvhd', 0, b'\0\0\0', 0, 0, 1000, 95000)
+        video = (
+            struct.pack('>I4s', 16, b'ftyp') + b'isom\0\0\0\0' +
+            struct.pack('>I4s', 16, b'mdat') + b'\0' * 8 +
+            struct.pack('>I4s', 8 + len(mvhd), b'moov') + mvhd
+        )
+        image = io.BytesIO()
+        Image.new('RGB', (1000, 500), 'green').save(image, format='PNG')
+
+        video_material = self.upload('Trilha.mp4', video)
+        image_material = self.upload('Mapa.png', image.getvalue())
+        self.assertEqual((video_material.file_type, image_material.file_type), ('video', 'image'))
+
+        MaterialUploadService.process_batch()
+        video_material.refresh_from_db()
+        image_material.refresh_from_db()
+        self.assertEqual(video_material.duration_seconds, 95)
+        with Image.open(image_material.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (480, 240))
@@ -1,8 +1,9 @@
 from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponse, Http404, FileResponse
+from django.http import HttpResponse, Http404
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
-from .models import Material, MaterialCategory, MaterialDownload
+from .models import Material, MaterialCategory
+from services.delivery import serve_file, starts_download
+from .services import MaterialCatalogService, MaterialDownloadService, MaterialSearchService
 
 
 def MaterialListView(request):
@@ -14,32 +15,44 @@ def MaterialListView(request):
     materials = Material.objects.filter(is_active=True).select_related('category')
     
     # Filtros de pesquisa se houver
-    search_query = request.GET.get('search', '')
+    search_query = request.GET.get('search', '').strip()
     category_filter = request.GET.get('category', '')
+    if category_filter == 'all':
+        category_filter = ''
     
     if search_query:
-        materials = materials.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(tags__icontains=search_query)
-        )
+        # Índice textual (FTS5/tsvector), ordenado por relevância
+        materials = MaterialSearchService.search(materials, search_query)
+    
+    # Contagens de todas as facetas em uma consulta (em cache por filtro)
+    facets = MaterialCatalogService.facets(
+        materials,
+        {'search': search_query.lower()},
+        category=category_filter
+    )
     
-    if category_filter and category_filter != 'all':
+    if category_filter:
         materials = materials.filter(category__slug=category_filter)
     
-    # Contar estatísticas
-    total_materials = materials.count()
-    videos_count = materials.filter(file_type='video').count()
-    documents_count = materials.filter(file_type__in=['pdf', 'document']).count()
+    page, next_cursor = MaterialCatalogService.page(
+        materials,
+        request.GET.get('cursor'),
+        ranked=bool(search_query)
+    )
+    
+    for category in categories:
+        category.material_count = facets['categories'].get(category.slug, 0)
     
     context = {
-        'materials': materials,
+        'materials': page,
+        'next_cursor': next_cursor,
         'categories': categories,
         'search_query': search_query,
         'category_filter': category_filter,
-        'total_materials': total_materials,
-        'videos_count': videos_count,
-        'documents_count': documents_count,
+        'facets': facets,
+        'total_materials': facets['total'],
+        'videos_count': facets['file_types'].get('video', 0),
+        'documents_count': facets['file_types'].get('pdf', 0) + facets['file_types'].get('document', 0),
     }
     
     return render(request, 'materials/list.html', context)
@@ -66,28 +79,23 @@ def MaterialDownloadView(request, pk):
     if not material.can_access(request.user):
         raise Http404("Material não encontrado ou acesso negado")
     
-    # Registrar o download
-    download_record = MaterialDownload.objects.create(
-        material=material,
-        user=request.user if request.user.is_authenticated else None,
-        ip_address=request.META.get('REMOTE_ADDR'),
-        user_agent=request.META.get('HTTP_USER_AGENT', '')
-    )
-    
-    # Incrementar contador de downloads
-    material.download_count += 1
-    material.save(update_fields=['download_count'])
-    
-    # Se for arquivo local, servir o arquivo
+    # Se for arquivo local, servir pelo backend de entrega (Range, X-Accel/X-Sendfile)
     if material.file:
-        return FileResponse(
-            material.file.open(),
-            as_attachment=True,
-            filename=material.file.name.split('/')[-1]
-        )
+        response = serve_file(request, material.file, filename=material.original_filename or None)
     # Se for link externo, redirecionar
     elif material.external_url:
         from django.shortcuts import redirect
-        return redirect(material.external_url)
+        response = redirect(material.external_url)
+    else:
+        raise Http404("Arquivo não encontrado")
     
-    raise Http404("Arquivo não encontrado")
+    # Registrar o download (buffer gravado em lote, contador com F());
+    # revalidações (304) e trechos seguintes de um Range não são novos downloads
+    if not material.file or starts_download(request, response):
+        MaterialDownloadService.record(
+            material,
+            user=request.user if request.user.is_authenticated else None,
+            ip_address=request.META.get('REMOTE_ADDR'),
+            user_agent=request.META.get('HTTP_USER_AGENT', '')
+        )
+    return response
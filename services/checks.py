@@ -0,0 +1,17 @@
+"""
+Apoio às verificações de configuração (system checks) dos apps
+"""
+from django.conf import settings
+
+# Backends cujo conteúdo fica na memória de cada processo
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_process_local(alias='default'):
+    """
+    Se o cache não é compartilhado entre os workers (invalidações não se propagam)
+    """
+    return settings.CACHES.get(alias, {}).get('BACKEND') in PROCESS_LOCAL_CACHES
@@ -0,0 +1,105 @@
+"""
+Infraestrutura de banco de dados: roteamento primário/réplicas e ajustes
+de conexão do SQLite.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+# Leituras podem ir para uma réplica apenas quando habilitado explicitamente
+# (requisições GET/HEAD pelo ReplicaReadMiddleware ou use_replicas())
+_replica_reads = ContextVar('replica_reads', default=False)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+@contextmanager
+def use_replicas(enabled=True):
+    """
+    Permite (ou impede) leituras em réplicas dentro do bloco
+    """
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Escritas e migrações sempre no banco principal. Leituras vão para uma
+    réplica quando permitido, exceto:
+    - modelos de DATABASE_PRIMARY_APPS (reservas, pagamentos, sessões...);
+    - leituras dentro de uma transação, que acompanham as escritas.
+    """
+
+    def __init__(self):
+        self.replicas = [alias for alias in settings.DATABASES if alias != 'default']
+
+    def db_for_read(self, model, **hints):
+        if (
+            not self.replicas
+            or not _replica_reads.get()
+            or model._meta.app_label in getattr(settings, 'DATABASE_PRIMARY_APPS', ())
+            or connections['default'].in_atomic_block
+        ):
+            return 'default'
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas espelham o principal: objetos de qualquer alias se relacionam
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaReadMiddleware:
+    """
+    Libera leituras em réplicas para requisições seguras (listagens e páginas de
+    detalhe). Depois de uma escrita o navegador fica alguns segundos preso ao
+    banco principal, para não ler dados atrasados da réplica.
+    """
+    COOKIE_NAME = 'db_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replica_reads = (
+            request.method in SAFE_METHODS
+            and self.COOKIE_NAME not in request.COOKIES
+        )
+        with use_replicas(replica_reads):
+            response = self.get_response(request)
+
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                self.COOKIE_NAME,
+                '1',
+                max_age=getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 5),
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """
+    Aplica o journal mode configurado (WAL por padrão) a cada nova conexão SQLite.
+    Com WAL, leitores não bloqueiam o escritor e vice-versa.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    journal_mode = getattr(settings, 'SQLITE_JOURNAL_MODE', 'wal')
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+        if journal_mode.lower() == 'wal':
+            # Seguro com WAL: só o último commit pode se perder em queda de energia
+            cursor.execute('PRAGMA synchronous=NORMAL')
@@ -0,0 +1,197 @@
+"""
+Entrega de arquivos enviados (materiais, documentos dos eventos).
+
+O backend configurado em FILE_DELIVERY_BACKEND monta a resposta:
+- StreamingDelivery: o próprio Django serve o arquivo, com suporte a Range;
+- XAccelRedirectDelivery: o nginx serve o arquivo de uma location interna;
+- XSendfileDelivery: o Apache (mod_xsendfile) ou lighttpd serve o arquivo.
+Requisições condicionais (ETag/Last-Modified) são respondidas antes, sem abrir o arquivo.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.module_loading import import_string
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def serve_file(request, field_file, filename=None, as_attachment=True):
+    """
+    Resposta de download para um FieldFile, com validação condicional
+    """
+    storage = field_file.storage
+    name = field_file.name
+    size = storage.size(name)
+    modified = storage.get_modified_time(name)
+    last_modified = int(modified.timestamp())
+    etag = f'"{size:x}-{int(modified.timestamp() * 1000000):x}"'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = get_file_delivery().build(request, field_file, size, etag, last_modified)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Content-Disposition'] = content_disposition(
+        filename or os.path.basename(name),
+        as_attachment
+    )
+    return response
+
+
+def starts_download(request, response):
+    """
+    Se a resposta de serve_file inicia um download: o arquivo inteiro ou um trecho
+    a partir do byte 0. Revalidações (304) e os trechos seguintes não contam.
+    """
+    if request.method != 'GET':
+        return False
+    if response.status_code == 206:
+        return response['Content-Range'].startswith('bytes 0-')
+    if response.status_code != 200:
+        return False
+    if response.has_header('X-Accel-Redirect') or response.has_header('X-Sendfile'):
+        # O Range é atendido pelo servidor web: vale o que o cliente pediu
+        match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+        if not match or not any(match.groups()):
+            return True
+        return match.group(1).isdigit() and int(match.group(1)) == 0
+    return True
+
+
+def content_disposition(filename, as_attachment=True):
+    disposition = 'attachment' if as_attachment else 'inline'
+    try:
+        filename.encode('ascii')
+        return f'{disposition}; filename="{filename}"'
+    except UnicodeEncodeError:
+        return f"{disposition}; filename*=utf-8''{quote(filename)}"
+
+
+def get_file_delivery():
+    """
+    Instancia o backend configurado em FILE_DELIVERY_BACKEND
+    """
+    backend_path = getattr(settings, 'FILE_DELIVERY_BACKEND', 'services.delivery.StreamingDelivery')
+    return import_string(backend_path)()
+
+
+class BaseFileDelivery:
+    """
+    Monta a resposta de um arquivo que precisa ser enviado por inteiro ou em parte
+    """
+
+    def build(self, request, field_file, size, etag, last_modified):
+        raise NotImplementedError
+
+    @staticmethod
+    def content_type(name):
+        return mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+class StreamingDelivery(BaseFileDelivery):
+    """
+    Serve o arquivo pelo Django. Downloads completos usam o wsgi.file_wrapper
+    (sendfile no gunicorn); pedidos com Range recebem 206 só com o trecho pedido.
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def build(self, request, field_file, size, etag, last_modified):
+        byte_range = self.requested_range(request, size, etag, last_modified)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        content_type = self.content_type(field_file.name)
+        if byte_range is None:
+            response = FileResponse(field_file.storage.open(field_file.name, 'rb'), content_type=content_type)
+            response.block_size = self.CHUNK_SIZE
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                self.read_range(field_file, start, end),
+                status=206,
+                content_type=content_type
+            )
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    def read_range(self, field_file, start, end):
+        with field_file.storage.open(field_file.name, 'rb') as file:
+            file.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = file.read(min(self.CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    @staticmethod
+    def requested_range(request, size, etag, last_modified):
+        """
+        (início, fim) do Range pedido, None para o arquivo inteiro ou False se inválido
+        """
+        header = request.META.get('HTTP_RANGE', '').strip()
+        if not header or request.method != 'GET':
+            return None
+
+        # If-Range: o trecho só vale se o cliente ainda tiver a mesma versão
+        if_range = request.META.get('HTTP_IF_RANGE', '').strip()
+        if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+            return None
+
+        match = RANGE_RE.match(header)
+        if not match or not any(match.groups()):
+            # Vários intervalos (multipart/byteranges) não são suportados: arquivo inteiro
+            return None
+        first, last = match.groups()
+        if not first:
+            # bytes=-N: os últimos N bytes
+            suffix = int(last)
+            if suffix == 0:
+                return False
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size or start > end:
+            return False
+        return start, end
+
+
+class XAccelRedirectDelivery(BaseFileDelivery):
+    """
+    Entrega pelo nginx: o caminho interno é FILE_DELIVERY_INTERNAL_URL + nome
+    do arquivo, uma location "internal" apontando para MEDIA_ROOT. Range e
+    sendfile ficam com o nginx.
+    """
+
+    def build(self, request, field_file, size, etag, last_modified):
+        response = HttpResponse(content_type=self.content_type(field_file.name))
+        prefix = getattr(settings, 'FILE_DELIVERY_INTERNAL_URL', '/protected/')
+        response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + field_file.name)
+        return response
+
+
+class XSendfileDelivery(BaseFileDelivery):
+    """
+    Entrega pelo servidor web com o cabeçalho X-Sendfile (caminho absoluto).
+    Storages sem caminho local voltam ao streaming pelo Django.
+    """
+
+    def build(self, request, field_file, size, etag, last_modified):
+        try:
+            path = field_file.storage.path(field_file.name)
+        except NotImplementedError:
+            return StreamingDelivery().build(request, field_file, size, etag, last_modified)
+        response = HttpResponse(content_type=self.content_type(field_file.name))
+        response['X-Sendfile'] = path
+        return response
@@ -0,0 +1,24 @@
+"""
+Arquivos derivados gravados direto no disco (variantes de imagens, QR Codes PIX).
+"""
+import os
+import tempfile
+
+
+def atomic_write(path, data):
+    """
+    Grava data em path por um arquivo temporário no mesmo diretório e os.replace:
+    leitores concorrentes veem o arquivo antigo ou o novo, nunca um arquivo parcial
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
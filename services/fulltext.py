@@ -0,0 +1,138 @@
+"""
+Índices de busca textual em tabelas separadas, criadas pelas migrações dos apps:
+- SQLite: tabela virtual FTS5 (tokenizer unicode61 sem acentos) com rowid = id do
+  objeto e uma coluna por campo, ranking bm25;
+- PostgreSQL: coluna tsvector (configuração pt_unaccent) com pesos A, B, C... na
+  ordem dos campos, ranking ts_rank_cd e índice GIN.
+Em outros bancos (ou sem a tabela) is_available() é False e cada serviço volta ao LIKE.
+"""
+import re
+
+from django.db import connection
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    return [token.lower() for token in TOKEN_RE.findall(query)]
+
+
+def fts5_query(tokens):
+    # Cada termo entre aspas (sem operadores do usuário) e como prefixo
+    return ' AND '.join('"{}"*'.format(token.replace('"', '')) for token in tokens)
+
+
+def tsquery(tokens):
+    return ' & '.join(f"{token}:*" for token in tokens)
+
+
+class FullTextIndex:
+    """
+    Índice textual de um modelo. `columns` vai do campo mais relevante ao menos
+    relevante; `weights` são os pesos do bm25 na mesma ordem. No PostgreSQL o id do
+    objeto fica em `id_column`.
+    """
+
+    def __init__(self, table, source_table, id_column, columns, weights):
+        self.table = table
+        self.source_table = source_table
+        self.id_column = id_column
+        self.columns = tuple(columns)
+        self.weights = tuple(weights)
+        self._available = None
+
+    def is_available(self):
+        if self._available is None:
+            self._available = (
+                connection.vendor in ('sqlite', 'postgresql')
+                and self.table in connection.introspection.table_names()
+            )
+        return self._available
+
+    def match(self, queryset, tokens):
+        """
+        Junta o índice à própria consulta (todos os termos, como prefixo), com a
+        relevância em search_rank: menor é mais relevante nos dois bancos.
+        """
+        object_id = f"{connection.ops.quote_name(queryset.model._meta.db_table)}.{connection.ops.quote_name('id')}"
+        if connection.vendor == 'postgresql':
+            query = tsquery(tokens)
+            return queryset.extra(
+                tables=[self.table],
+                where=[
+                    f"{self.table}.{self.id_column} = {object_id}",
+                    f"{self.table}.document @@ to_tsquery('pt_unaccent', %s)",
+                ],
+                params=[query],
+                # Negativo: maior relevância primeiro na ordem crescente, como no bm25
+                select={'search_rank': f"-ts_rank_cd({self.table}.document, to_tsquery('pt_unaccent', %s))"},
+                select_params=[query],
+            )
+        weights = ', '.join(str(float(weight)) for weight in self.weights)
+        return queryset.extra(
+            tables=[self.table],
+            where=[f"{self.table}.rowid = {object_id}", f"{self.table} MATCH %s"],
+            params=[fts5_query(tokens)],
+            select={'search_rank': f"bm25({self.table}, {weights})"},
+        )
+
+    def index(self, pk, values):
+        """
+        Insere ou atualiza um objeto no índice (values na ordem de columns)
+        """
+        if not self.is_available():
+            return
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                placeholders = ['%s'] * len(self.columns)
+                cursor.execute(
+                    f"INSERT INTO {self.table} ({self.id_column}, document) "
+                    f"VALUES (%s, {self.pg_document(placeholders)}) "
+                    f"ON CONFLICT ({self.id_column}) DO UPDATE SET document = EXCLUDED.document",
+                    [pk, *values]
+                )
+            else:
+                columns = ', '.join(self.columns)
+                placeholders = ', '.join(['%s'] * len(self.columns))
+                cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [pk])
+                cursor.execute(
+                    f"INSERT INTO {self.table} (rowid, {columns}) VALUES (%s, {placeholders})",
+                    [pk, *values]
+                )
+
+    def remove(self, pk):
+        if not self.is_available():
+            return
+        column = self.id_column if connection.vendor == 'postgresql' else 'rowid'
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE {column} = %s", [pk])
+
+    def rebuild(self):
+        """
+        Reconstrói o índice inteiro a partir da tabela do modelo. Retorna o total indexado.
+        """
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f"TRUNCATE {self.table}")
+                cursor.execute(
+                    f"INSERT INTO {self.table} ({self.id_column}, document) "
+                    f"SELECT id, {self.pg_document(self.columns)} FROM {self.source_table}"
+                )
+            else:
+                columns = ', '.join(self.columns)
+                cursor.execute(f"DELETE FROM {self.table}")
+                cursor.execute(
+                    f"INSERT INTO {self.table} (rowid, {columns}) SELECT id, {columns} FROM {self.source_table}"
+                )
+                cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+            cursor.execute(f"SELECT COUNT(*) FROM {self.table}")
+            return cursor.fetchone()[0]
+
+    def pg_document(self, expressions):
+        """
+        tsvector com peso A, B, C... para cada expressão, na ordem das colunas
+        """
+        return ' || '.join(
+            f"setweight(to_tsvector('pt_unaccent', coalesce({expression}, '')), '{weight}')"
+            for expression, weight in zip(expressions, 'ABCD')
+        )
@@ -0,0 +1,122 @@
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta, time as dt_time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, connections
+from django.test import override_settings
+from django.utils import timezone
+
+from adventures.models import Adventure, Category
+from bookings.models import AdventureEvent
+from bookings.services import SeatReservationService
+from services.db import use_replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga do banco configurado: listagens concorrentes com reservas de vagas, '
+        'comparando journal modes (SQLite) ou conexões persistentes (PostgreSQL)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help='Threads simultâneas')
+        parser.add_argument('--requests', type=int, default=100, help='Requisições por thread')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Fração de requisições com escrita')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            modes = [
+                ('SQLite rollback journal', {'SQLITE_JOURNAL_MODE': 'delete'}, None),
+                ('SQLite WAL', {'SQLITE_JOURNAL_MODE': 'wal'}, None),
+            ]
+        else:
+            modes = [
+                ('CONN_MAX_AGE=0', {}, 0),
+                ('CONN_MAX_AGE=60', {}, 60),
+            ]
+
+        tag = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name=f'Benchmark {tag}')
+        adventures = [
+            Adventure.objects.create(
+                title=f'Benchmark {tag} {i}',
+                category=category,
+                short_description='Carga de teste',
+                description='-',
+                difficulty='iniciante',
+                duration_hours=1,
+                location='-',
+                meeting_point='-',
+                base_price=Decimal('100.00'),
+                what_includes='-',
+                what_to_bring='-',
+                safety_requirements='-',
+                main_image='adventures/main/benchmark.jpg',
+            )
+            for i in range(12)
+        ]
+        events = [
+            AdventureEvent.objects.create(
+                adventure=adventure,
+                date=timezone.now().date() + timedelta(days=30),
+                start_time=dt_time(8, 0),
+                max_participants=1000000,
+            )
+            for adventure in adventures
+        ]
+        event_ids = [event.pk for event in events]
+
+        def simulate(count):
+            latencies = []
+            errors = 0
+            for _ in range(count):
+                started = time.perf_counter()
+                try:
+                    if random.random() < options['write_ratio']:
+                        event_id = random.choice(event_ids)
+                        SeatReservationService.reserve(event_id, 1)
+                        SeatReservationService.release(event_id, 1)
+                    else:
+                        # Leituras de listagem podem ir para réplicas, como no middleware
+                        with use_replicas():
+                            list(Adventure.objects.for_listing().filter(category=category))
+                except OperationalError:
+                    errors += 1
+                finally:
+                    # Fim da "requisição": respeita CONN_MAX_AGE como o request_finished
+                    close_old_connections()
+                latencies.append(time.perf_counter() - started)
+            connections.close_all()
+            return latencies, errors
+
+        try:
+            for label, overrides, conn_max_age in modes:
+                connections.close_all()
+                previous_max_age = connections.databases['default']['CONN_MAX_AGE']
+                if conn_max_age is not None:
+                    connections.databases['default']['CONN_MAX_AGE'] = conn_max_age
+                try:
+                    with override_settings(**overrides):
+                        # Aplica o journal mode antes das threads abrirem conexões
+                        connection.ensure_connection()
+                        started = time.perf_counter()
+                        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                            results = list(executor.map(simulate, [options['requests']] * options['workers']))
+                        elapsed = time.perf_counter() - started
+                finally:
+                    connections.databases['default']['CONN_MAX_AGE'] = previous_max_age
+                    connections.close_all()
+
+                latencies = sorted(latency for result in results for latency in result[0])
+                errors = sum(result[1] for result in results)
+                p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+                self.stdout.write(
+                    f'{label:<26} {len(latencies) / elapsed:>8.1f} req/s   '
+                    f'p95 {p95:>7.1f} ms   erros {errors}'
+                )
+        finally:
+            category.delete()
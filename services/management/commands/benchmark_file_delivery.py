@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.db.models.fields.files import FieldFile
+from django.test import RequestFactory, override_settings
+
+from materials.models import Material
+from services.delivery import serve_file
+
+BACKENDS = [
+    ('Django (arquivo inteiro)', 'services.delivery.StreamingDelivery', None),
+    ('Django (Range de 4 MB)', 'services.delivery.StreamingDelivery', 4 * 1024 * 1024),
+    ('X-Accel-Redirect', 'services.delivery.XAccelRedirectDelivery', None),
+    ('X-Sendfile', 'services.delivery.XSendfileDelivery', None),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Vazão de downloads simultâneos de um arquivo grande pelos backends de entrega '
+        '(tempo que o worker Django fica ocupado por download)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=64, help='Tamanho do arquivo em MB')
+        parser.add_argument('--workers', type=int, default=8, help='Downloads simultâneos')
+        parser.add_argument('--downloads', type=int, default=4, help='Downloads por worker')
+
+    def handle(self, *args, **options):
+        root = tempfile.mkdtemp()
+        try:
+            storage = FileSystemStorage(location=root)
+            name = 'materials/files/benchmark.mp4'
+            os.makedirs(os.path.dirname(storage.path(name)))
+            with open(storage.path(name), 'wb') as file:
+                for _ in range(options['size_mb']):
+                    file.write(os.urandom(1024 * 1024))
+            size = storage.size(name)
+
+            field_file = FieldFile(Material(), Material._meta.get_field('file'), name)
+            field_file.storage = storage
+            factory = RequestFactory()
+
+            def download(chunk_size):
+                sent = 0
+                ranges = [(0, size - 1)] if chunk_size is None else [
+                    (start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size)
+                ]
+                for start, end in ranges:
+                    headers = {} if chunk_size is None else {'HTTP_RANGE': f'bytes={start}-{end}'}
+                    response = serve_file(factory.get('/', **headers), field_file)
+                    if response.streaming:
+                        for chunk in response.streaming_content:
+                            sent += len(chunk)
+                    else:
+                        sent += len(response.content)
+                    response.close()
+                return sent
+
+            for label, backend, chunk_size in BACKENDS:
+                with override_settings(FILE_DELIVERY_BACKEND=backend):
+                    started = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                        sent = sum(executor.map(
+                            download,
+                            [chunk_size] * (options['workers'] * options['downloads'])
+                        ))
+                    elapsed = time.perf_counter() - started
+
+                total = options['workers'] * options['downloads']
+                self.stdout.write(
+                    f'{label:<26} {total / elapsed:>10.1f} downloads/s   '
+                    f'{sent / elapsed / 1024 / 1024:>9.1f} MB/s pelo Django'
+                )
+        finally:
+            shutil.rmtree(root)
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark concluído'))
@@ -0,0 +1,39 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from services import richtext
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompila o HTML sanitizado dos campos de texto rico (executar depois de mudar '
+        'as regras em services.richtext ou de alterações em massa no banco)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', help='Só este modelo (app_label.Model; pode repetir)')
+        parser.add_argument('--force', action='store_true', help='Recompila mesmo o HTML em dia')
+        parser.add_argument('--batch-size', type=int, default=200, help='Registros por lote')
+
+    def handle(self, *args, **options):
+        models = [model for model in apps.get_models() if hasattr(model, 'RICH_TEXT_FIELDS')]
+        if options['model']:
+            try:
+                models = [apps.get_model(label) for label in options['model']]
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e))
+            for model in models:
+                if not hasattr(model, 'RICH_TEXT_FIELDS'):
+                    raise CommandError(f'{model._meta.label} não tem campos de texto rico')
+
+        total = 0
+        for model in models:
+            updated = richtext.rerender(
+                model._default_manager.all(),
+                force=options['force'],
+                batch_size=options['batch_size']
+            )
+            total += updated
+            self.stdout.write(f'{model._meta.label}: {updated} registros recompilados.')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} registros com HTML recompilado.'))
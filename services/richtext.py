@@ -0,0 +1,235 @@
+"""
+HTML compilado dos campos de texto rico (CKEditor/Summernote).
+
+O HTML do editor é sanitizado (bleach), as imagens enviadas para o MEDIA_URL
+passam a usar as variantes responsivas (WebP/JPEG) e imagens e iframes ganham
+loading="lazy". A compilação roda ao salvar e fica no próprio registro, no
+campo JSON `rendered_html`, com o hash da origem e das regras; as páginas só
+leem o HTML pronto.
+
+Modelos participantes declaram RICH_TEXT_FIELDS, um campo
+rendered_html = models.JSONField(default=dict, editable=False) e chamam
+render_fields(self) no save. No template: {{ objeto.html.campo }}.
+Ao mudar as regras, incremente RULES_VERSION e rode render_rich_text.
+"""
+import hashlib
+from functools import partial
+from urllib.parse import urlparse
+
+import bleach
+from bleach.html5lib_shim import Filter
+from django.conf import settings
+from django.utils.safestring import mark_safe
+
+# Versão das regras abaixo: entra no hash, então mudar invalida todo o HTML compilado
+RULES_VERSION = 1
+
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'div', 'em', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'iframe', 'img', 'li', 'ol', 'p',
+    'pre', 's', 'small', 'span', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th',
+    'thead', 'tr', 'u', 'ul',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title', 'target', 'rel'],
+    'img': ['src', 'alt', 'title', 'width', 'height'],
+    'iframe': ['src', 'width', 'height', 'title', 'allow', 'allowfullscreen', 'frameborder'],
+    'td': ['colspan', 'rowspan'],
+    'th': ['colspan', 'rowspan', 'scope'],
+    '*': ['class'],
+}
+ALLOWED_PROTOCOLS = ['http', 'https', 'mailto', 'tel']
+EMBED_HOSTS = [
+    'www.youtube.com', 'www.youtube-nocookie.com', 'youtube.com',
+    'player.vimeo.com', 'www.google.com', 'maps.google.com',
+]
+# Largura da variante usada no src (o navegador escolhe pelo srcset)
+IMAGE_WIDTH = 1024
+IMAGE_SIZES = '(max-width: 768px) 100vw, 800px'
+
+
+def rules_hash():
+    """
+    Assinatura das regras em vigor (versão, hosts de embed e larguras das variantes)
+    """
+    from adventures.services import ImageVariantService
+
+    return f'{RULES_VERSION}:{",".join(embed_hosts())}:{ImageVariantService.widths()}'
+
+
+def source_hash(source, rules=None):
+    return hashlib.sha1(f'{rules or rules_hash()}\n{source or ""}'.encode()).hexdigest()
+
+
+def embed_hosts():
+    return sorted(getattr(settings, 'RICH_TEXT_EMBED_HOSTS', EMBED_HOSTS))
+
+
+def compile_html(source):
+    """
+    HTML sanitizado e reescrito. Retorna (html, completo); completo é False se
+    alguma imagem ainda não tem variantes (a geração fica agendada).
+    """
+    state = {'complete': True}
+    hosts = set(embed_hosts())
+
+    def allow_attribute(tag, name, value):
+        if tag == 'iframe' and name == 'src':
+            parsed = urlparse(value)
+            return parsed.scheme == 'https' and parsed.hostname in hosts
+        return name in ALLOWED_ATTRIBUTES.get(tag, []) or name in ALLOWED_ATTRIBUTES['*']
+
+    cleaner = bleach.Cleaner(
+        tags=ALLOWED_TAGS,
+        attributes=allow_attribute,
+        protocols=ALLOWED_PROTOCOLS,
+        strip=True,
+        strip_comments=True,
+        filters=[partial(ResponsiveMediaFilter, state=state)],
+    )
+    return cleaner.clean(source or ''), state['complete']
+
+
+class ResponsiveMediaFilter(Filter):
+    """
+    Filtro do html5lib aplicado depois da sanitização: lazy-loading em imagens
+    e iframes, <picture> com as variantes para imagens do MEDIA_URL e remoção
+    de iframes sem src permitido
+    """
+
+    def __init__(self, source, state):
+        super().__init__(source)
+        self.state = state
+
+    def __iter__(self):
+        skipping = 0
+        for token in super().__iter__():
+            name = token.get('name')
+            if name == 'iframe' and token['type'] in ('StartTag', 'EmptyTag', 'EndTag'):
+                if token['type'] != 'EndTag' and (None, 'src') not in token['data']:
+                    skipping += token['type'] == 'StartTag'
+                    continue
+                if token['type'] == 'EndTag' and skipping:
+                    skipping -= 1
+                    continue
+                if token['type'] != 'EndTag':
+                    token['data'][(None, 'loading')] = 'lazy'
+            elif skipping:
+                continue
+            elif name == 'img' and token['type'] in ('StartTag', 'EmptyTag'):
+                yield from self.image(token)
+                continue
+            yield token
+
+    def image(self, token):
+        from adventures.services import ImageVariantService
+
+        token['data'][(None, 'loading')] = 'lazy'
+        token['data'][(None, 'decoding')] = 'async'
+        src = token['data'].get((None, 'src'), '')
+        media_url = settings.MEDIA_URL
+        if not src.startswith(media_url) or media_url in ('', '/'):
+            yield token
+            return
+
+        name = src[len(media_url):]
+        manifest = ImageVariantService.manifest(name)
+        if manifest is None:
+            # Com IMAGE_VARIANT_ASYNC=False as variantes são geradas aqui mesmo
+            ImageVariantService.enqueue(name)
+            manifest = ImageVariantService.manifest(name)
+            if manifest is None:
+                self.state['complete'] = False
+        if not manifest or not manifest['widths']:
+            yield token
+            return
+
+        token['data'][(None, 'src')] = ImageVariantService.best_url(name, IMAGE_WIDTH)
+        token['data'][(None, 'srcset')] = ImageVariantService.srcset(name, 'jpg')
+        token['data'][(None, 'sizes')] = IMAGE_SIZES
+        yield {'type': 'StartTag', 'name': 'picture', 'namespace': token.get('namespace'), 'data': {}}
+        yield {
+            'type': 'EmptyTag',
+            'name': 'source',
+            'namespace': token.get('namespace'),
+            'data': {
+                (None, 'type'): 'image/webp',
+                (None, 'srcset'): ImageVariantService.srcset(name, 'webp'),
+                (None, 'sizes'): IMAGE_SIZES,
+            },
+        }
+        yield token
+        yield {'type': 'EndTag', 'name': 'picture', 'namespace': token.get('namespace'), 'data': {}}
+
+
+def render_fields(instance, fields=None, force=False, rules=None):
+    """
+    Recompila em instance.rendered_html os campos cuja origem (ou regra) mudou.
+    Retorna os nomes dos campos recompilados.
+    """
+    rules = rules or rules_hash()
+    rendered = dict(instance.rendered_html or {})
+    changed = []
+    for field in fields or instance.RICH_TEXT_FIELDS:
+        source = getattr(instance, field)
+        digest = source_hash(source, rules)
+        entry = rendered.get(field)
+        if not force and entry and entry['hash'] == digest and entry.get('complete', True):
+            continue
+        html, complete = compile_html(source)
+        rendered[field] = {'hash': digest, 'html': html, 'complete': complete}
+        changed.append(field)
+    if changed:
+        instance.rendered_html = rendered
+    return changed
+
+
+def rendered(instance, field):
+    """
+    HTML compilado do campo. Se a origem mudou sem passar pelo save (update em
+    massa, regras novas) ou faltavam variantes de imagem, recompila e grava.
+    """
+    entry = (instance.rendered_html or {}).get(field)
+    source = getattr(instance, field)
+    if entry and entry.get('complete', True) and entry['hash'] == source_hash(source):
+        return mark_safe(entry['html'])
+    render_fields(instance, [field])
+    current = instance.rendered_html[field]
+    # Enquanto as variantes não ficam prontas o HTML é recompilado sem gravar
+    if instance.pk and (current['complete'] or not entry or entry['hash'] != current['hash']):
+        type(instance)._default_manager.filter(pk=instance.pk).update(rendered_html=instance.rendered_html)
+    return mark_safe(current['html'])
+
+
+def rerender(queryset, force=False, batch_size=200):
+    """
+    Recompila em lotes os registros com HTML desatualizado. Retorna quantos mudaram.
+    """
+    model = queryset.model
+    rules = rules_hash()
+    updated = 0
+    last_pk = None
+    queryset = queryset.only('pk', 'rendered_html', *model.RICH_TEXT_FIELDS).order_by('pk')
+    while True:
+        batch = list((queryset.filter(pk__gt=last_pk) if last_pk is not None else queryset)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        changed = [instance for instance in batch if render_fields(instance, force=force, rules=rules)]
+        model._default_manager.bulk_update(changed, ['rendered_html'])
+        updated += len(changed)
+    return updated
+
+
+class RenderedHTML:
+    """
+    Acesso aos campos compilados no template: {{ adventure.html.description }}
+    """
+
+    def __init__(self, instance):
+        self.instance = instance
+
+    def __getitem__(self, field):
+        if field not in self.instance.RICH_TEXT_FIELDS:
+            raise KeyError(field)
+        return rendered(self.instance, field)
@@ -0,0 +1,251 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db.models.fields.files import FieldFile
+from django.core.files.storage import default_storage
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.http import HttpResponse
+
+from PIL import Image
+
+from adventures.models import Adventure
+from bookings.models import Booking, EventDocument
+from content.models import EditablePage
+from . import fulltext, richtext
+from .files import atomic_write
+from .db import PrimaryReplicaRouter, ReplicaReadMiddleware, use_replicas
+from .delivery import serve_file, starts_download
+
+
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    """
+    Roteamento de leituras entre o banco principal e as réplicas
+    """
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.router.replicas = ['replica_1']
+
+    @override_settings(DATABASE_PRIMARY_APPS=['bookings'])
+    def test_reads_use_replicas_only_when_enabled(self):
+        self.assertEqual(self.router.db_for_read(Adventure), 'default')
+        with use_replicas():
+            self.assertEqual(self.router.db_for_read(Adventure), 'replica_1')
+            self.assertEqual(self.router.db_for_read(Booking), 'default')
+            self.assertEqual(self.router.db_for_write(Adventure), 'default')
+
+    @override_settings(DATABASE_PRIMARY_APPS=[])
+    def test_middleware_pins_primary_after_writes(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Adventure))
+            return HttpResponse()
+
+        middleware = ReplicaReadMiddleware(view)
+        factory = RequestFactory()
+
+        middleware(factory.get('/'))
+        response = middleware(factory.post('/'))
+        sticky = factory.get('/')
+        sticky.COOKIES[ReplicaReadMiddleware.COOKIE_NAME] = response.cookies[ReplicaReadMiddleware.COOKIE_NAME].value
+        middleware(sticky)
+
+        self.assertEqual(seen, ['replica_1', 'default', 'default'])
+
+
+class FullTextTests(SimpleTestCase):
+    """
+    Consultas e documentos dos índices textuais compartilhados
+    """
+
+    def test_queries_quote_every_token_as_prefix(self):
+        tokens = fulltext.tokenize('Trilha "Ação" OR cânion')
+        self.assertEqual(tokens, ['trilha', 'ação', 'or', 'cânion'])
+        self.assertEqual(fulltext.fts5_query(tokens), '"trilha"* AND "ação"* AND "or"* AND "cânion"*')
+        self.assertEqual(fulltext.tsquery(tokens[:2]), 'trilha:* & ação:*')
+
+    def test_postgres_document_weights_follow_column_order(self):
+        index = fulltext.FullTextIndex('app_model_search', 'app_model', 'model_id', ('title', 'tags'), (10, 5))
+        self.assertEqual(
+            index.pg_document(index.columns),
+            "setweight(to_tsvector('pt_unaccent', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('pt_unaccent', coalesce(tags, '')), 'B')"
+        )
+
+
+class AtomicWriteTests(SimpleTestCase):
+    """
+    Gravação atômica dos arquivos derivados
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_replaces_file_and_cleans_up_on_failure(self):
+        path = f'{self.root}/variants/ab/manifest.json'
+        atomic_write(path, b'{"widths": [320]}')
+        atomic_write(path, b'{"widths": [640]}')
+        with open(path, 'rb') as file:
+            self.assertEqual(file.read(), b'{"widths": [640]}')
+
+        with mock.patch('os.replace', side_effect=OSError('disco cheio')):
+            with self.assertRaises(OSError):
+                atomic_write(path, b'{}')
+        with open(path, 'rb') as file:
+            self.assertEqual(file.read(), b'{"widths": [640]}')
+        self.assertEqual(os.listdir(f'{self.root}/variants/ab'), ['manifest.json'])
+
+
+class FileDeliveryTests(SimpleTestCase):
+    """
+    Entrega de arquivos com Range, validação condicional e X-Accel/X-Sendfile
+    """
+    CONTENT = bytes(range(256)) * 40
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        storage = FileSystemStorage(location=self.root)
+        name = storage.save('event_documents/termo de responsabilidade.pdf', ContentFile(self.CONTENT))
+        self.file = FieldFile(EventDocument(), EventDocument._meta.get_field('file'), name)
+        self.file.storage = storage
+        self.factory = RequestFactory()
+
+    def test_full_and_ranged_downloads(self):
+        response = serve_file(self.factory.get('/'), self.file)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('attachment; filename="termo de responsabilidade.pdf"', response['Content-Disposition'])
+
+        response = serve_file(self.factory.get('/', HTTP_RANGE='bytes=100-299'), self.file)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-299/{len(self.CONTENT)}')
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[100:300])
+
+        response = serve_file(self.factory.get('/', HTTP_RANGE='bytes=-10'), self.file)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[-10:])
+
+        response = serve_file(self.factory.get('/', HTTP_RANGE=f'bytes={len(self.CONTENT)}-'), self.file)
+        self.assertEqual(response.status_code, 416)
+
+        # If-Range com outra versão: arquivo inteiro
+        response = serve_file(self.factory.get('/', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"antigo"'), self.file)
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_requests(self):
+        response = serve_file(self.factory.get('/'), self.file)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        response = serve_file(self.factory.get('/', HTTP_IF_NONE_MATCH=etag), self.file)
+        self.assertEqual(response.status_code, 304)
+        response = serve_file(self.factory.get('/', HTTP_IF_MODIFIED_SINCE=last_modified), self.file)
+        self.assertEqual(response.status_code, 304)
+
+    def test_web_server_backends(self):
+        with override_settings(
+            FILE_DELIVERY_BACKEND='services.delivery.XAccelRedirectDelivery',
+            FILE_DELIVERY_INTERNAL_URL='/protected/'
+        ):
+            response = serve_file(self.factory.get('/'), self.file)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/event_documents/termo%20de%20responsabilidade.pdf')
+        self.assertEqual(response.content, b'')
+
+        with override_settings(FILE_DELIVERY_BACKEND='services.delivery.XSendfileDelivery'):
+            response = serve_file(self.factory.get('/'), self.file)
+        self.assertEqual(response['X-Sendfile'], self.file.path)
+
+    def test_only_responses_from_the_first_byte_start_a_download(self):
+        def starts(backend='services.delivery.StreamingDelivery', **headers):
+            request = self.factory.get('/', **headers)
+            with override_settings(FILE_DELIVERY_BACKEND=backend):
+                return starts_download(request, serve_file(request, self.file))
+
+        etag = serve_file(self.factory.get('/'), self.file)['ETag']
+        self.assertTrue(starts())
+        self.assertTrue(starts(HTTP_RANGE='bytes=0-99'))
+        self.assertFalse(starts(HTTP_RANGE='bytes=100-'))
+        self.assertFalse(starts(HTTP_IF_NONE_MATCH=etag))
+        self.assertFalse(starts('services.delivery.XAccelRedirectDelivery', HTTP_RANGE='bytes=100-'))
+        self.assertTrue(starts('services.delivery.XSendfileDelivery', HTTP_RANGE='bytes=0-'))
+
+
+class RichTextTests(TestCase):
+    """
+    HTML dos editores sanitizado e compilado uma vez, no save
+    """
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(
+            MEDIA_ROOT=media_root,
+            IMAGE_VARIANT_ROOT=f'{media_root}/variants',
+            IMAGE_VARIANT_ASYNC=False,
+            IMAGE_VARIANT_WIDTHS=[320, 640],
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_compile_sanitizes_and_lazy_loads_embeds(self):
+        html, complete = richtext.compile_html(
+            '<p onclick="roubar()">Trilha <b>leve</b><script>alert(1)</script></p>'
+            '<a href="javascript:alert(1)">link</a>'
+            '<iframe src="https://www.youtube.com/embed/abc"></iframe>'
+            '<iframe src="https://exemplo.com/x">conteúdo</iframe>'
+        )
+        self.assertTrue(complete)
+        self.assertEqual(
+            html,
+            '<p>Trilha <b>leve</b>alert(1)</p><a>link</a>'
+            '<iframe src="https://www.youtube.com/embed/abc" loading="lazy"></iframe>'
+        )
+
+    def test_media_images_use_responsive_variants(self):
+        image = io.BytesIO()
+        Image.new('RGB', (800, 600), 'green').save(image, format='JPEG')
+        name = default_storage.save('django-summernote/trilha.jpg', ContentFile(image.getvalue()))
+
+        html, complete = richtext.compile_html(f'<img src="/media/{name}" alt="Trilha">')
+        self.assertTrue(complete)
+        self.assertIn('<picture><source type="image/webp" srcset="/media/variants/', html)
+        self.assertIn('320w.webp 320w, ', html)
+        self.assertIn('loading="lazy"', html)
+
+        # Variantes ainda na fila: HTML com o original, recompilado na próxima leitura
+        with mock.patch('adventures.services.ImageVariantService.enqueue') as enqueue:
+            html, complete = richtext.compile_html('<img src="/media/django-summernote/nova.jpg">')
+        enqueue.assert_called_once_with('django-summernote/nova.jpg')
+        self.assertFalse(complete)
+        self.assertNotIn('<picture>', html)
+
+    def test_compiled_html_is_stored_and_refreshed_by_source_hash(self):
+        page = EditablePage.objects.create(
+            page_type='termos', title='Termos', content='<p>Versão 1<script>x</script></p>'
+        )
+        page = EditablePage.objects.get(pk=page.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(page.html['content'], '<p>Versão 1x</p>')
+
+        # Alteração sem passar pelo save: recompila na leitura e grava
+        EditablePage.objects.filter(pk=page.pk).update(content='<p>Versão 2</p>')
+        page = EditablePage.objects.get(pk=page.pk)
+        self.assertEqual(page.html['content'], '<p>Versão 2</p>')
+        self.assertEqual(
+            EditablePage.objects.get(pk=page.pk).rendered_html['content']['html'], '<p>Versão 2</p>'
+        )
+
+        self.assertEqual(richtext.rerender(EditablePage.objects.all()), 0)
+        with mock.patch.object(richtext, 'RULES_VERSION', richtext.RULES_VERSION + 1):
+            self.assertEqual(richtext.rerender(EditablePage.objects.all()), 1)
+
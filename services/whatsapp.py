@@ -2,9 +2,8 @@ class WhatsAppService:
     @staticmethod
     def send_message(phone_number, message):
         """
-        Por enquanto, apenas simula o envio de mensagem.
-        Você pode implementar a integração real com WhatsApp aqui.
+        Enfileira a mensagem no outbox de WhatsApp (bookings.WhatsAppMessage).
+        O envio é feito pelo comando send_whatsapp_messages.
         """
-        print(f"Simulando envio de mensagem WhatsApp para {phone_number}: {message}")
-        # TODO: Implementar integração real com WhatsApp
-        return True 
\ No newline at end of file
+        from bookings.services import WhatsAppService as BookingWhatsAppService
+        return BookingWhatsAppService.send_message(phone_number, message) is not None
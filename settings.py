@@ -63,6 +63,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'content.context_processors.site_content',
             ],
         },
     },
@@ -72,13 +73,76 @@ WSGI_APPLICATION = 'wsgi.application'
 
 # Database
 # Database configuration
-DATABASES = {
+# Banco principal: SQLite (padrão, para instalações pequenas) ou PostgreSQL
+# (DB_ENGINE=postgresql, requer o pacote psycopg2)
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    # Atrás do pgbouncer em modo transaction pooling, cursores do lado do
+    # servidor não sobrevivem entre transações
+    DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', 'False') == 'True'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'conexao'),
+            'USER': os.getenv('DB_USER', 'conexao'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '6432' if DB_PGBOUNCER else '5432'),
+            # Conexões persistentes: evita um handshake por requisição
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
+        }
+    }
+    # Réplicas de leitura (hosts separados por vírgula)
+    for index, host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1):
+        DATABASES[f'replica_{index}'] = {
+            **DATABASES['default'],
+            'HOST': host.strip(),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            'OPTIONS': {
+                # Segundos aguardando o lock de escrita antes de "database is locked"
+                'timeout': int(os.getenv('DB_BUSY_TIMEOUT', 20)),
+            },
+        }
+    }
+
+# journal_mode aplicado a cada conexão SQLite (services.db)
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'wal')
+
+# Leituras de listagens e páginas de detalhe nas réplicas (services.db);
+# reservas, pagamentos, sessões e usuários sempre no banco principal
+DATABASE_ROUTERS = ['services.db.PrimaryReplicaRouter']
+DATABASE_PRIMARY_APPS = ['auth', 'sessions', 'users', 'bookings']
+# Segundos em que o navegador lê do principal depois de uma escrita
+DATABASE_REPLICA_STICKY_SECONDS = 5
+if len(DATABASES) > 1:
+    MIDDLEWARE.append('services.db.ReplicaReadMiddleware')
+
+# Cache
+# LocMemCache é local a cada processo; em produção com vários workers use
+# memcached (ex: CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache)
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
+# Configuração do site (SiteConfiguration) em cache
+# Segundos que cada worker mantém a configuração em memória
+SITE_CONFIG_LOCAL_TIMEOUT = int(os.getenv('SITE_CONFIG_LOCAL_TIMEOUT', 60))
+# Compartilha a configuração entre workers pelo cache acima (ignorado com cache
+# local ao processo, como o LocMemCache: check --deploy avisa com content.W001)
+SITE_CONFIG_SHARED_CACHE = os.getenv('SITE_CONFIG_SHARED_CACHE', 'False') == 'True'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -125,6 +189,92 @@ DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', '')
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# WhatsApp
+# Sem WHATSAPP_API_URL as mensagens são apenas simuladas (link do WhatsApp Web)
+WHATSAPP_API_URL = os.getenv('WHATSAPP_API_URL', '')
+WHATSAPP_API_TOKEN = os.getenv('WHATSAPP_API_TOKEN', '')
+WHATSAPP_API_TIMEOUT = 10
+WHATSAPP_OUTBOX_CONCURRENCY = int(os.getenv('WHATSAPP_OUTBOX_CONCURRENCY', 8))
+WHATSAPP_PER_DESTINATION_CONCURRENCY = 1
+WHATSAPP_MAX_ATTEMPTS = 5
+WHATSAPP_RETRY_BASE_SECONDS = 30
+
+# Reservas
+# Minutos que uma vaga fica bloqueada enquanto a inscrição não é aprovada
+SEAT_HOLD_MINUTES = int(os.getenv('SEAT_HOLD_MINUTES', 15))
+# Dias à frente respondidos pelo calendário de disponibilidade
+AVAILABILITY_CALENDAR_DAYS = 90
+# Dias à frente gerados pelas agendas recorrentes sem data de fim
+EVENT_SCHEDULE_HORIZON_DAYS = 180
+
+# Pagamentos PIX
+# Provedor consultado pelo comando reconcile_pix_payments
+PIX_PROVIDER = os.getenv('PIX_PROVIDER', 'bookings.pix_providers.FakePIXProvider')
+# Segundos que o status de um pagamento fica em cache para o endpoint de consulta
+PIX_STATUS_CACHE_SECONDS = int(os.getenv('PIX_STATUS_CACHE_SECONDS', 5))
+# QR Codes renderizados em disco (png ou svg) e endereçados pelo conteúdo
+PIX_QR_FORMAT = os.getenv('PIX_QR_FORMAT', 'png')
+PIX_QR_BOX_SIZE = 4
+PIX_QR_ROOT = os.path.join(MEDIA_ROOT, 'pix_qr')
+
+# Variantes responsivas das imagens das aventuras (WebP e JPEG)
+IMAGE_VARIANT_WIDTHS = [320, 640, 1024, 1600]
+IMAGE_VARIANT_ROOT = os.path.join(MEDIA_ROOT, 'variants')
+# Threads que geram as variantes depois do upload (False: gera na própria requisição)
+IMAGE_VARIANT_ASYNC = os.getenv('IMAGE_VARIANT_ASYNC', 'True') == 'True'
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', 2))
+# Upload em lote da galeria: threads de validação/gravação e tamanho máximo por imagem
+ADVENTURE_IMAGE_INGEST_WORKERS = int(os.getenv('ADVENTURE_IMAGE_INGEST_WORKERS', 4))
+ADVENTURE_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+
+# Busca de aventuras
+# Limites das faixas de preço exibidas nas facetas
+ADVENTURE_PRICE_RANGES = [100, 250, 500]
+# Validade das contagens das facetas (as vagas dos eventos mudam sem invalidar)
+ADVENTURE_FACETS_CACHE_SECONDS = 60
+# Orçamento de latência (ms, p95) verificado pelo benchmark_adventure_search
+ADVENTURE_SEARCH_BUDGET_MS = 150
+
+# Busca por proximidade
+# Caracteres do geohash gravado em cada aventura (9: células de ~5 m)
+GEOHASH_PRECISION = 9
+GEO_SEARCH_DEFAULT_RADIUS_KM = 50
+GEO_SEARCH_MAX_RADIUS_KM = 500
+# Aventuras devolvidas por busca
+GEO_SEARCH_LIMIT = 20
+
+# Página de detalhes das aventuras: validade do HTML em cache (invalidado por versão)
+ADVENTURE_PAGE_CACHE_SECONDS = 3600
+
+# Textos ricos (services.richtext): hosts aceitos em <iframe> no HTML sanitizado
+RICH_TEXT_EMBED_HOSTS = [
+    'www.youtube.com', 'www.youtube-nocookie.com', 'youtube.com', 'player.vimeo.com', 'www.google.com', 'maps.google.com'
+]
+
+# Materiais
+# Materiais por página da biblioteca (paginação por cursor)
+MATERIALS_PER_PAGE = 24
+# Validade das contagens por categoria/tipo (invalidadas a cada alteração)
+MATERIAL_FACETS_CACHE_SECONDS = 300
+# Downloads acumulados em memória antes de gravar (quantidade ou segundos)
+MATERIAL_DOWNLOAD_BUFFER_SIZE = int(os.getenv('MATERIAL_DOWNLOAD_BUFFER_SIZE', 100))
+MATERIAL_DOWNLOAD_FLUSH_SECONDS = int(os.getenv('MATERIAL_DOWNLOAD_FLUSH_SECONDS', 10))
+# Downloads brutos mantidos (dias); os mais antigos ficam só nas agregações diárias
+MATERIAL_DOWNLOAD_RETENTION_DAYS = int(os.getenv('MATERIAL_DOWNLOAD_RETENTION_DAYS', 180))
+MATERIAL_DOWNLOAD_ARCHIVE_ROOT = os.getenv(
+    'MATERIAL_DOWNLOAD_ARCHIVE_ROOT',
+    os.path.join(BASE_DIR, 'archive', 'material_downloads')
+)
+# Lado maior (px) das thumbnails geradas dos materiais enviados
+MATERIAL_THUMBNAIL_SIZE = 480
+
+# Entrega de arquivos (materiais e documentos dos eventos)
+# services.delivery.StreamingDelivery (Django, com Range), XAccelRedirectDelivery (nginx)
+# ou XSendfileDelivery (Apache/lighttpd)
+FILE_DELIVERY_BACKEND = os.getenv('FILE_DELIVERY_BACKEND', 'services.delivery.StreamingDelivery')
+# Location interna do nginx que aponta para MEDIA_ROOT (X-Accel-Redirect)
+FILE_DELIVERY_INTERNAL_URL = os.getenv('FILE_DELIVERY_INTERNAL_URL', '/protected/')
+
 # CKEditor Configuration
 CKEDITOR_UPLOAD_PATH = 'uploads/'
 CKEDITOR_IMAGE_BACKEND = 'pillow'
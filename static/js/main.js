@@ -1183,7 +1183,7 @@ function initializePhotoGallery() {
 
     let currentPhotoIndex = 0;
     const photoData = Array.from(thumbnails).map(thumb => ({
-        src: thumb.querySelector('img').src,
+        src: thumb.querySelector('img').dataset.full || thumb.querySelector('img').src,
         alt: thumb.querySelector('img').alt
     }));
 
@@ -6,7 +6,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.forms import SetPasswordForm
 from django.http import HttpResponseRedirect
-from .models import CustomUser, UserProfile, Badge, Reward, UserBadge, UserReward
+from .models import CustomUser, UserProfile, Badge, Reward, UserBadge, UserReward, UserStats
+from .services import UserStatsService
 
 
 @admin.register(Badge)
@@ -39,6 +40,17 @@ class UserRewardAdmin(admin.ModelAdmin):
     raw_id_fields = ('user', 'reward')
 
 
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        'user', 'approved_count', 'pending_count', 'completed_count',
+        'total_spent', 'last_adventure_date', 'updated_at'
+    )
+    search_fields = ('user__email', 'user__first_name', 'user__last_name')
+    raw_id_fields = ('user',)
+    readonly_fields = ('updated_at',)
+
+
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
     """
@@ -95,6 +107,12 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
     
+    def get_changelist_instance(self, request):
+        # Estatísticas da página inteira em uma consulta
+        changelist = super().get_changelist_instance(request)
+        UserStatsService.resolve(changelist.result_list)
+        return changelist
+    
     def get_full_name(self, obj):
         return obj.get_full_name() or obj.email
     get_full_name.short_description = "Nome Completo"
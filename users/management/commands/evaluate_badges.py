@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from users.services import BadgeService
+
+
+class Command(BaseCommand):
+    help = 'Reavalia as insígnias de todos os usuários (ex.: após importação de dados)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Usuários avaliados por lote')
+
+    def handle(self, *args, **options):
+        users, awarded = BadgeService.award_all(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ {users} usuários avaliados, {awarded} insígnias concedidas.')
+        )
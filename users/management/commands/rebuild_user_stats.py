@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from users.services import UserStatsService
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói as estatísticas de reservas (UserStats) de todos os usuários'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Usuários por lote')
+
+    def handle(self, *args, **options):
+        total = UserStatsService.rebuild_all(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✅ Estatísticas reconstruídas para {total} usuários.'))
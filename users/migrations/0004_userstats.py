@@ -0,0 +1,33 @@
+# Generated by Django 3.2.18 on 2026-10-17 12:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0003_customuser_is_customer_customuser_is_guide_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='auth.user', verbose_name='Usuário')),
+                ('pending_count', models.PositiveIntegerField(default=0, verbose_name='Reservas Pendentes')),
+                ('approved_count', models.PositiveIntegerField(default=0, verbose_name='Reservas Aprovadas')),
+                ('rejected_count', models.PositiveIntegerField(default=0, verbose_name='Reservas Rejeitadas')),
+                ('cancelled_count', models.PositiveIntegerField(default=0, verbose_name='Reservas Canceladas')),
+                ('completed_count', models.PositiveIntegerField(default=0, verbose_name='Aventuras Concluídas')),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Total Pago')),
+                ('last_adventure_date', models.DateField(blank=True, null=True, verbose_name='Última Aventura')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estatísticas do Usuário',
+                'verbose_name_plural': 'Estatísticas dos Usuários',
+            },
+        ),
+    ]
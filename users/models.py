@@ -1,6 +1,6 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.db import models
 from django.core.validators import RegexValidator
 from django.utils.translation import gettext_lazy as _
 
@@ -236,68 +236,59 @@ class CustomUser(AbstractUser):
         """Retorna nome completo do usuário"""
         return f"{self.first_name} {self.last_name}".strip()
     
+    @property
+    def booking_stats(self):
+        """Retorna as estatísticas de reservas do usuário (UserStats)"""
+        if not hasattr(self, '_booking_stats'):
+            from .services import UserStatsService
+            UserStatsService.resolve([self])
+        return self._booking_stats
+    
     @property
     def total_adventures(self):
         """Retorna total de aventuras do usuário"""
-        return self.bookings.filter(status='approved').count()
+        return self.booking_stats.approved_count
     
     @property
     def completed_adventures_count(self):
         """Retorna o número de aventuras completadas"""
-        return self.bookings.filter(status='completed').count()
+        return self.booking_stats.completed_count
     
     @property
     def badges(self):
         """Retorna todas as insígnias do usuário"""
         return Badge.objects.filter(userbadge__user=self)
     
+    @staticmethod
+    def level_for_points(total_points):
+        """Retorna o nível do aventureiro e o progresso (0-100) para uma pontuação"""
+        if total_points >= 1000:
+            return 'mestre_aventuras', 100
+        elif total_points >= 500:
+            return 'guerreiro_alturas', int((total_points - 500) / 500 * 100)
+        elif total_points >= 200:
+            return 'explorador_selva', int((total_points - 200) / 300 * 100)
+        return 'iniciante_trilha', int(total_points / 200 * 100)
+    
     def add_points(self, points, adventure=None):
         """Adiciona pontos ao usuário e atualiza seu progresso"""
         self.total_points += points
         self.available_points += points
         
         # Atualiza o nível do aventureiro com base nos pontos
-        if self.total_points >= 1000:
-            self.adventurer_level = 'mestre_aventuras'
-            self.level_progress = 100
-        elif self.total_points >= 500:
-            self.adventurer_level = 'guerreiro_alturas'
-            self.level_progress = ((self.total_points - 500) / 500) * 100
-        elif self.total_points >= 200:
-            self.adventurer_level = 'explorador_selva'
-            self.level_progress = ((self.total_points - 200) / 300) * 100
-        else:
-            self.level_progress = (self.total_points / 200) * 100
+        self.adventurer_level, self.level_progress = self.level_for_points(self.total_points)
         
-        self.save()
+        self.save(update_fields=[
+            'total_points', 'available_points', 'adventurer_level', 'level_progress', 'updated_at'
+        ])
         
         # Verifica e concede insígnias
         self.check_and_award_badges(adventure)
     
     def check_and_award_badges(self, adventure=None):
         """Verifica e concede insígnias baseado nas conquistas do usuário"""
-        for badge in Badge.objects.all():
-            # Pula se já tem a insígnia
-            if UserBadge.objects.filter(user=self, badge=badge).exists():
-                continue
-            
-            awarded = False
-            if badge.requirement_type == 'adventures_completed':
-                if self.completed_adventures_count >= badge.requirement_value.get('count', 0):
-                    awarded = True
-            elif badge.requirement_type == 'points_earned':
-                if self.total_points >= badge.requirement_value.get('points', 0):
-                    awarded = True
-            elif badge.requirement_type == 'specific_adventure' and adventure:
-                if str(adventure.id) == str(badge.requirement_value.get('adventure_id')):
-                    awarded = True
-            elif badge.requirement_type == 'payment_method' and adventure:
-                if adventure.payment_method == badge.requirement_value.get('method'):
-                    awarded = True
-            
-            if awarded:
-                UserBadge.objects.create(user=self, badge=badge)
-                self.add_points(badge.points)  # Pontos bônus da insígnia
+        from .services import BadgeService
+        return BadgeService.award(self, adventure)
     
     def redeem_reward(self, reward):
         """Resgata uma recompensa usando pontos disponíveis"""
@@ -308,6 +299,54 @@ class CustomUser(AbstractUser):
         return None
 
 
+class UserStats(models.Model):
+    """
+    Projeção desnormalizada das reservas e pagamentos de cada usuário.
+    Mantida incrementalmente pelos sinais de reservas e pagamentos
+    (ver users/signals.py) e reconstruída pelo comando rebuild_user_stats.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name="Usuário"
+    )
+    pending_count = models.PositiveIntegerField(default=0, verbose_name="Reservas Pendentes")
+    approved_count = models.PositiveIntegerField(default=0, verbose_name="Reservas Aprovadas")
+    rejected_count = models.PositiveIntegerField(default=0, verbose_name="Reservas Rejeitadas")
+    cancelled_count = models.PositiveIntegerField(default=0, verbose_name="Reservas Canceladas")
+    completed_count = models.PositiveIntegerField(default=0, verbose_name="Aventuras Concluídas")
+    total_spent = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name="Total Pago"
+    )
+    last_adventure_date = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name="Última Aventura"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Status da reserva -> contador
+    STATUS_FIELDS = {
+        'pending': 'pending_count',
+        'approved': 'approved_count',
+        'rejected': 'rejected_count',
+        'cancelled': 'cancelled_count',
+        'completed': 'completed_count',
+    }
+
+    class Meta:
+        verbose_name = "Estatísticas do Usuário"
+        verbose_name_plural = "Estatísticas dos Usuários"
+
+    def __str__(self):
+        return f"Estatísticas de {self.user}"
+
+
 class UserProfile(models.Model):
     """
     Perfil adicional do usuário com informações extras
@@ -0,0 +1,374 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import (
+    Case, CharField, Count, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import Badge, CustomUser, UserBadge, UserStats
+
+
+class UserStatsService:
+    """
+    Manutenção da projeção UserStats.
+
+    Transições individuais de reservas e pagamentos aplicam incrementos com F();
+    operações em lote reconstroem as linhas dos usuários afetados a partir das
+    reservas e pagamentos. Linhas ausentes são criadas na primeira leitura.
+    """
+
+    @classmethod
+    def get(cls, user_id):
+        """
+        Retorna as estatísticas de um usuário
+        """
+        return cls.get_many([user_id]).get(user_id) or UserStats(user_id=user_id)
+
+    @classmethod
+    def get_many(cls, user_ids):
+        """
+        Retorna {user_id: UserStats} com uma consulta, criando as linhas ausentes
+        """
+        stats = UserStats.objects.in_bulk(list(user_ids))
+        missing = [pk for pk in user_ids if pk not in stats]
+        if missing:
+            stats.update(cls.rebuild(missing))
+        return stats
+
+    @classmethod
+    def for_profiles(cls, users):
+        """
+        Retorna {CustomUser.pk: UserStats} dos perfis informados. A projeção segue
+        as reservas, que apontam para o usuário de autenticação; o perfil
+        corresponde a ele pelo username (os ids das duas tabelas não se relacionam).
+        """
+        usernames = {user.username: user.pk for user in users}
+        stats = {
+            usernames[user_stats.username]: user_stats
+            for user_stats in UserStats.objects.filter(
+                user__username__in=list(usernames)
+            ).annotate(username=F('user__username'))
+        }
+        missing = [username for username, pk in usernames.items() if pk not in stats]
+        if missing:
+            owners = dict(get_user_model().objects.filter(
+                username__in=missing
+            ).values_list('pk', 'username'))
+            for user_id, user_stats in cls.rebuild(owners).items():
+                stats[usernames[owners[user_id]]] = user_stats
+        return stats
+
+    @classmethod
+    def resolve(cls, users):
+        """
+        Anexa as estatísticas (booking_stats) de vários perfis (CustomUser) de uma vez
+        """
+        pending = [user for user in users if user.pk and not hasattr(user, '_booking_stats')]
+        if pending:
+            stats = cls.for_profiles(pending)
+            for user in pending:
+                # Perfil sem usuário de autenticação: ainda não tem reservas
+                user._booking_stats = stats.get(user.pk) or UserStats()
+        return users
+
+    @classmethod
+    def booking_status_changed(cls, user_id, old_status, new_status, event_date=None):
+        """
+        Aplica a transição de status de uma reserva (None = criada/apagada)
+        """
+        from bookings.models import Booking
+
+        deltas = {}
+        if old_status in UserStats.STATUS_FIELDS:
+            field = UserStats.STATUS_FIELDS[old_status]
+            deltas[field] = Greatest(F(field) - 1, 0)
+        if new_status in UserStats.STATUS_FIELDS:
+            field = UserStats.STATUS_FIELDS[new_status]
+            deltas[field] = F(field) + 1
+
+        if old_status == 'completed':
+            # A última aventura pode ter sido esta: recalcula só a data
+            deltas['last_adventure_date'] = Subquery(
+                Booking.objects.filter(
+                    user_id=OuterRef('user_id'),
+                    status='completed'
+                ).order_by().values('user_id').annotate(last=Max('event__date')).values('last')
+            )
+        elif new_status == 'completed' and event_date:
+            deltas['last_adventure_date'] = Case(
+                When(
+                    Q(last_adventure_date__isnull=True) | Q(last_adventure_date__lt=event_date),
+                    then=Value(event_date)
+                ),
+                default=F('last_adventure_date')
+            )
+        cls._apply(user_id, deltas)
+
+    @classmethod
+    def payment_status_changed(cls, user_id, old_status, new_status, amount):
+        """
+        Aplica a transição de status de um pagamento ao total pago
+        """
+        if old_status != 'approved' and new_status == 'approved':
+            cls._apply(user_id, {'total_spent': F('total_spent') + amount})
+        elif old_status == 'approved' and new_status != 'approved':
+            cls._apply(user_id, {'total_spent': F('total_spent') - amount})
+
+    @classmethod
+    def rebuild_for_payments(cls, payment_ids):
+        """
+        Reconstrói as estatísticas dos donos de pagamentos alterados em lote
+        """
+        from bookings.models import Payment
+
+        user_ids = set(Payment.objects.filter(pk__in=payment_ids).values_list('booking__user_id', flat=True))
+        return cls.rebuild(user_ids)
+
+    @classmethod
+    def rebuild_all(cls, batch_size=1000):
+        """
+        Reconstrói as estatísticas de todos os usuários. Retorna o total de linhas.
+        """
+        total = 0
+        last_id = 0
+        User = get_user_model()
+        while True:
+            user_ids = list(User.objects.filter(pk__gt=last_id).order_by('pk').values_list(
+                'pk', flat=True
+            )[:batch_size])
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            total += len(cls.rebuild(user_ids))
+        return total
+
+    @classmethod
+    def rebuild(cls, user_ids):
+        """
+        Recalcula as estatísticas de um lote de usuários a partir das reservas e
+        pagamentos. Retorna {user_id: UserStats}.
+        """
+        from bookings.models import Booking, Payment
+
+        now = timezone.now()
+        stats = {
+            pk: UserStats(user_id=pk, updated_at=now)
+            for pk in get_user_model().objects.filter(pk__in=list(user_ids)).values_list('pk', flat=True)
+        }
+        if not stats:
+            return {}
+
+        counts = {
+            field: Count('pk', filter=Q(status=status))
+            for status, field in UserStats.STATUS_FIELDS.items()
+        }
+        for row in Booking.objects.filter(user_id__in=stats).order_by().values('user_id').annotate(
+            last_adventure_date=Max('event__date', filter=Q(status='completed')),
+            **counts
+        ):
+            user_stats = stats[row.pop('user_id')]
+            for field, value in row.items():
+                setattr(user_stats, field, value)
+
+        for user_id, total in Payment.objects.filter(
+            booking__user_id__in=stats,
+            status='approved'
+        ).order_by().values('booking__user_id').annotate(total=Sum('amount')).values_list(
+            'booking__user_id', 'total'
+        ):
+            stats[user_id].total_spent = total
+
+        existing = set(UserStats.objects.filter(user_id__in=stats).values_list('user_id', flat=True))
+        with transaction.atomic():
+            UserStats.objects.bulk_create(
+                [user_stats for pk, user_stats in stats.items() if pk not in existing],
+                ignore_conflicts=True
+            )
+            UserStats.objects.bulk_update(
+                [user_stats for pk, user_stats in stats.items() if pk in existing],
+                fields=[
+                    *UserStats.STATUS_FIELDS.values(),
+                    'total_spent', 'last_adventure_date', 'updated_at'
+                ]
+            )
+        return stats
+
+    @classmethod
+    def _apply(cls, user_id, deltas):
+        # Sem linha ainda: ela será calculada por completo na primeira leitura
+        if deltas:
+            UserStats.objects.filter(user_id=user_id).update(updated_at=timezone.now(), **deltas)
+
+
+class BadgeService:
+    """
+    Motor de regras das insígnias.
+
+    As regras são avaliadas em memória contra um retrato das estatísticas de um
+    lote de usuários, montado com um número fixo de consultas. Insígnias novas são
+    gravadas com bulk_create e os pontos bônus aplicados em um único UPDATE, sem
+    a recursão entre add_points e check_and_award_badges.
+    """
+
+    @classmethod
+    def award(cls, user, adventure=None):
+        """
+        Avalia as insígnias de um usuário e retorna as conquistadas agora
+        """
+        awarded = cls.evaluate([user.pk], adventure=adventure)
+        badges = awarded.get(user.pk, [])
+        if badges:
+            user.refresh_from_db(fields=[
+                'total_points', 'available_points', 'adventurer_level', 'level_progress'
+            ])
+        return badges
+
+    @classmethod
+    def award_all(cls, batch_size=500):
+        """
+        Reavalia as insígnias de todos os usuários (ex.: após uma importação).
+        Retorna (usuários avaliados, insígnias concedidas).
+        """
+        badges = list(Badge.objects.all())
+        users = awarded = 0
+        last_id = 0
+        while True:
+            user_ids = list(CustomUser.objects.filter(pk__gt=last_id).order_by('pk').values_list(
+                'pk', flat=True
+            )[:batch_size])
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            users += len(user_ids)
+            awarded += sum(len(new) for new in cls.evaluate(user_ids, badges=badges).values())
+        return users, awarded
+
+    @classmethod
+    def evaluate(cls, user_ids, adventure=None, badges=None):
+        """
+        Avalia as regras para um lote de usuários e grava as insígnias conquistadas.
+        Retorna {user_id: [insígnias novas]}.
+        """
+        if badges is None:
+            badges = list(Badge.objects.all())
+        if not badges or not user_ids:
+            return {}
+
+        snapshots = cls.snapshot(user_ids, badges)
+        owned = set(UserBadge.objects.filter(user_id__in=user_ids).values_list('user_id', 'badge_id'))
+
+        awarded = {}
+        for user_id, stats in snapshots.items():
+            if adventure is not None:
+                stats['adventure_ids'].add(adventure.pk)
+
+            pending = [badge for badge in badges if (user_id, badge.pk) not in owned]
+            new_badges = []
+            # Pontos bônus podem liberar insígnias de pontuação: repete até estabilizar
+            while pending:
+                earned = [badge for badge in pending if cls.matches(badge, stats)]
+                if not earned:
+                    break
+                for badge in earned:
+                    stats['total_points'] += badge.points
+                    pending.remove(badge)
+                new_badges.extend(earned)
+
+            if new_badges:
+                awarded[user_id] = new_badges
+
+        if awarded:
+            cls._save(awarded, snapshots)
+        return awarded
+
+    @classmethod
+    def snapshot(cls, user_ids, badges=()):
+        """
+        Estatísticas usadas pelas regras, para um lote de usuários
+        """
+        from bookings.models import Booking, Payment
+
+        requirement_types = {badge.requirement_type for badge in badges}
+        profiles = list(CustomUser.objects.filter(pk__in=user_ids).order_by().only(
+            'pk', 'username', 'total_points'
+        ))
+        user_stats = UserStatsService.for_profiles(profiles)
+        snapshots = {
+            user.pk: {
+                'total_points': user.total_points,
+                'completed_adventures': user_stats[user.pk].completed_count if user.pk in user_stats else 0,
+                'adventure_ids': set(),
+                'payment_methods': set(),
+            }
+            for user in profiles
+        }
+        # Reservas e pagamentos são do usuário de autenticação correspondente
+        owners = {stats.user_id: pk for pk, stats in user_stats.items()}
+        if 'specific_adventure' in requirement_types:
+            for user_id, adventure_id in Booking.objects.filter(
+                user_id__in=owners,
+                status='completed'
+            ).order_by().values_list('user_id', 'event__adventure_id').distinct():
+                snapshots[owners[user_id]]['adventure_ids'].add(adventure_id)
+        if 'payment_method' in requirement_types:
+            for user_id, method in Payment.objects.filter(
+                booking__user_id__in=owners,
+                status='approved'
+            ).order_by().values_list('booking__user_id', 'payment_method').distinct():
+                snapshots[owners[user_id]]['payment_methods'].add(method)
+        return snapshots
+
+    @classmethod
+    def matches(cls, badge, stats):
+        """
+        Verifica se as estatísticas atendem ao requisito da insígnia
+        """
+        requirement = badge.requirement_value or {}
+        if badge.requirement_type == 'adventures_completed':
+            return stats['completed_adventures'] >= int(requirement.get('count', 0))
+        if badge.requirement_type == 'points_earned':
+            return stats['total_points'] >= int(requirement.get('points', 0))
+        if badge.requirement_type == 'specific_adventure':
+            return str(requirement.get('adventure_id')) in {str(pk) for pk in stats['adventure_ids']}
+        if badge.requirement_type == 'payment_method':
+            return requirement.get('method') in stats['payment_methods']
+        return False
+
+    @classmethod
+    def _save(cls, awarded, snapshots):
+        bonus = {
+            user_id: sum(badge.points for badge in badges)
+            for user_id, badges in awarded.items()
+        }
+        levels = {
+            user_id: CustomUser.level_for_points(snapshots[user_id]['total_points'])
+            for user_id in awarded
+        }
+
+        with transaction.atomic():
+            UserBadge.objects.bulk_create(
+                [
+                    UserBadge(user_id=user_id, badge=badge)
+                    for user_id, badges in awarded.items()
+                    for badge in badges
+                ],
+                ignore_conflicts=True
+            )
+
+            bonus_case = Case(
+                *[When(pk=user_id, then=Value(points)) for user_id, points in bonus.items()],
+                default=Value(0),
+                output_field=IntegerField()
+            )
+            CustomUser.objects.filter(pk__in=awarded).update(
+                total_points=F('total_points') + bonus_case,
+                available_points=F('available_points') + bonus_case,
+                adventurer_level=Case(
+                    *[When(pk=user_id, then=Value(level)) for user_id, (level, _) in levels.items()],
+                    output_field=CharField()
+                ),
+                level_progress=Case(
+                    *[When(pk=user_id, then=Value(progress)) for user_id, (_, progress) in levels.items()],
+                    output_field=IntegerField()
+                ),
+            )
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from bookings.models import Booking, Payment
+from bookings.signals import payment_status_changed
+from .services import UserStatsService
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, **kwargs):
+    """Atualiza as estatísticas do usuário quando o status da reserva muda"""
+    old_status = None if created else instance._loaded_status
+    if old_status != instance.status:
+        event_date = instance.event.date if instance.status == 'completed' else None
+        UserStatsService.booking_status_changed(instance.user_id, old_status, instance.status, event_date)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    UserStatsService.booking_status_changed(instance.user_id, instance._loaded_status, None)
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, created, **kwargs):
+    """Atualiza o total pago quando um pagamento é aprovado ou deixa de ser"""
+    old_status = None if created else instance._loaded_status
+    if 'approved' in (old_status, instance.status) and old_status != instance.status:
+        user_id = Booking.objects.filter(pk=instance.booking_id).values_list('user_id', flat=True).first()
+        if user_id:
+            UserStatsService.payment_status_changed(user_id, old_status, instance.status, instance.amount)
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted(sender, instance, **kwargs):
+    if instance._loaded_status == 'approved':
+        user_id = Booking.objects.filter(pk=instance.booking_id).values_list('user_id', flat=True).first()
+        if user_id:
+            UserStatsService.payment_status_changed(user_id, 'approved', None, instance.amount)
+
+
+@receiver(payment_status_changed)
+def payments_changed_in_bulk(sender, payment_ids, status, **kwargs):
+    """Aprovações em lote também alteram as reservas: reconstrói os usuários afetados"""
+    UserStatsService.rebuild_for_payments(payment_ids)
@@ -1,3 +1,193 @@
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+
+from adventures.models import Adventure, Category
+from bookings.models import AdventureEvent, Booking, Payment
+from bookings.services import PaymentService
+from .models import Badge, CustomUser, UserBadge, UserStats
+from .services import BadgeService, UserStatsService
+
+
+class GamificationTestCase(TestCase):
+    """
+    Aventura, insígnias e usuários com reservas concluídas
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Trilhas')
+        cls.adventure = Adventure.objects.create(
+            title='Trilha do Cânion',
+            category=category,
+            short_description='Descrição curta',
+            description='Descrição',
+            difficulty='iniciante',
+            duration_hours=4,
+            location='Cambará do Sul',
+            meeting_point='Portal do parque',
+            base_price=Decimal('150.00'),
+            what_includes='Guia',
+            what_to_bring='Água',
+            safety_requirements='Calçado fechado',
+            main_image='adventures/main/capa.jpg',
+        )
+        cls.first_adventure = Badge.objects.create(
+            name='Primeira Aventura', description='-', icon='lucide-flag', points=60,
+            requirement_type='adventures_completed', requirement_value={'count': 1},
+        )
+        cls.collector = Badge.objects.create(
+            name='Colecionador de Pontos', description='-', icon='lucide-star', points=20,
+            requirement_type='points_earned', requirement_value={'points': 100},
+        )
+        cls.pix = Badge.objects.create(
+            name='Aventureiro Premium', description='-', icon='lucide-credit-card', points=15,
+            requirement_type='payment_method', requirement_value={'method': 'pix'},
+        )
+        cls.canyon = Badge.objects.create(
+            name='Cânion', description='-', icon='lucide-map', points=5,
+            requirement_type='specific_adventure', requirement_value={'adventure_id': cls.adventure.pk},
+        )
+        # Usuário de autenticação sem perfil: os ids de User e CustomUser não coincidem
+        User.objects.create(username='equipe')
+
+    def create_user(self, index, total_points=50):
+        user = CustomUser.objects.create(
+            username=f'aventureiro{index}',
+            email=f'aventureiro{index}@example.com',
+            total_points=total_points,
+            available_points=total_points,
+        )
+        # As reservas são do usuário de autenticação com o mesmo username
+        user.owner = User.objects.create(username=user.username)
+        return user
+
+    def complete_adventure(self, user, days, payment_method='pix', status='completed'):
+        event, _ = AdventureEvent.objects.get_or_create(
+            adventure=self.adventure,
+            date=timezone.now().date() - timedelta(days=days),
+            start_time=time(8, 0),
+            defaults={'max_participants': 10},
+        )
+        booking = Booking.objects.create(
+            user=user.owner, event=event, total_price=Decimal('150.00'), status=status,
+            contact_phone='54993216261',
+        )
+        return Payment.objects.create(
+            booking=booking, payment_method=payment_method, amount=booking.total_price,
+            status='approved' if status == 'completed' else 'pending',
+        )
+
+
+class BadgeServiceTests(GamificationTestCase):
+    """
+    Avaliação das insígnias em lote, sem consultas por insígnia
+    """
+
+    def test_award_cascades_bonus_points_in_constant_queries(self):
+        user = self.create_user(1)
+        self.complete_adventure(user, days=10)
+        UserStatsService.get(user.owner.pk)
+
+        # insígnias, perfil, estatísticas (pelo username), aventuras, pagamentos, insígnias já obtidas,
+        # savepoint, bulk_create, update de pontos, release e refresh do usuário
+        with self.assertNumQueries(11):
+            awarded = user.check_and_award_badges()
+
+        self.assertEqual(
+            {badge.pk for badge in awarded},
+            {self.first_adventure.pk, self.collector.pk, self.pix.pk, self.canyon.pk}
+        )
+        # 50 + 60 + 15 + 5 liberam "Colecionador de Pontos" (+20)
+        self.assertEqual(user.total_points, 150)
+        self.assertEqual(user.available_points, 150)
+        self.assertEqual(user.level_progress, 75)
+
+        self.assertEqual(user.check_and_award_badges(), [])
+        self.assertEqual(UserBadge.objects.filter(user=user).count(), 4)
+
+    def test_award_all_evaluates_every_user(self):
+        users = [self.create_user(i, total_points=0) for i in range(5)]
+        for user in users[:3]:
+            self.complete_adventure(user, days=5, payment_method='credit_card')
+
+        self.assertEqual(BadgeService.award_all(batch_size=2), (5, 6))
+        for user in users[:3]:
+            user.refresh_from_db()
+            self.assertEqual(user.total_points, 65)
+            self.assertEqual(user.adventurer_level, 'iniciante_trilha')
+        self.assertFalse(UserBadge.objects.filter(user__in=users[3:]).exists())
+
+
+class UserStatsTests(GamificationTestCase):
+    """
+    Projeção de estatísticas mantida incrementalmente
+    """
+
+    def assertStatsMatchRebuild(self, user):
+        stats = UserStats.objects.get(user_id=user.owner.pk)
+        rebuilt = UserStatsService.rebuild([user.owner.pk])[user.owner.pk]
+        for field in [*UserStats.STATUS_FIELDS.values(), 'total_spent', 'last_adventure_date']:
+            self.assertEqual(getattr(stats, field), getattr(rebuilt, field), field)
+        return stats
+
+    def test_transitions_keep_projection_in_sync(self):
+        user = self.create_user(1)
+        UserStatsService.get(user.owner.pk)
+
+        payment = self.complete_adventure(user, days=30)
+        self.complete_adventure(user, days=10)
+        pending = self.complete_adventure(user, days=5, status='pending')
+
+        stats = self.assertStatsMatchRebuild(user)
+        self.assertEqual(stats.completed_count, 2)
+        self.assertEqual(stats.pending_count, 1)
+        self.assertEqual(stats.total_spent, Decimal('300.00'))
+        self.assertEqual(stats.last_adventure_date, timezone.now().date() - timedelta(days=10))
+
+        booking = Booking.objects.get(user=user.owner, status='completed', event__date=stats.last_adventure_date)
+        booking.status = 'cancelled'
+        booking.save()
+        payment.status = 'refunded'
+        payment.save()
+
+        stats = self.assertStatsMatchRebuild(user)
+        self.assertEqual(stats.cancelled_count, 1)
+        self.assertEqual(stats.total_spent, Decimal('150.00'))
+        self.assertEqual(stats.last_adventure_date, timezone.now().date() - timedelta(days=30))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PaymentService.approve_payments([pending.pk])
+        stats = self.assertStatsMatchRebuild(user)
+        self.assertEqual(stats.approved_count, 1)
+        self.assertEqual(stats.pending_count, 0)
+
+    def test_admin_reads_stats_for_whole_page(self):
+        for i in range(3):
+            self.complete_adventure(self.create_user(i), days=10)
+        UserStatsService.rebuild_all()
+
+        users = list(CustomUser.objects.all())
+        with self.assertNumQueries(1):
+            UserStatsService.resolve(users)
+            self.assertEqual([user.completed_adventures_count for user in users], [1, 1, 1])
+
+    def test_profile_stats_follow_auth_user_by_username(self):
+        # Ids desencontrados: o perfil 1 não é o usuário de autenticação 1
+        other = User.objects.get(username='equipe')
+        profile = self.create_user(1)
+        self.assertEqual(profile.pk, other.pk)
+        self.complete_adventure(profile, days=10)
+        Booking.objects.create(
+            user=other, event=AdventureEvent.objects.get(), total_price=Decimal('150.00'), status='approved'
+        )
+        orphan = CustomUser.objects.create(username='sem-reservas', email='sem-reservas@example.com')
 
-# Create your tests here.
+        users = [profile, orphan]
+        UserStatsService.resolve(users)
+        self.assertEqual((profile.completed_adventures_count, profile.total_adventures), (1, 0))
+        self.assertEqual((orphan.completed_adventures_count, orphan.total_adventures), (0, 0))
+        self.assertEqual(set(UserStats.objects.values_list('user_id', flat=True)), {profile.owner.pk})
@@ -6,6 +6,7 @@ from django.contrib import messages
 from django.urls import reverse
 from django.db.models import Q
 from .models import CustomUser, UserProfile, Badge, Reward, UserBadge, UserReward
+from .services import UserStatsService
 from django.utils import timezone
 
 
@@ -293,9 +294,8 @@ def UserDashboardView(request):
             cpf=request.user.cpf
         ).select_related('event__adventure').order_by('-created_at')
         
-        # Estatísticas
-        total_adventures = bookings.filter(status='approved').count()
-        pending_bookings = bookings.filter(status='pending').count()
+        # Estatísticas (projeção mantida incrementalmente, uma leitura)
+        user_stats = UserStatsService.get(request.user.pk)
         pending_pre_registrations = pre_registrations.filter(status='pending').count()
         
         # Próximas aventuras
@@ -309,8 +309,11 @@ def UserDashboardView(request):
             'pre_registrations': pre_registrations,
             'upcoming_bookings': upcoming_bookings,
             'stats': {
-                'total_adventures': total_adventures,
-                'pending_bookings': pending_bookings,
+                'total_adventures': user_stats.approved_count,
+                'pending_bookings': user_stats.pending_count,
+                'completed_adventures': user_stats.completed_count,
+                'total_spent': user_stats.total_spent,
+                'last_adventure_date': user_stats.last_adventure_date,
                 'pending_pre_registrations': pending_pre_registrations,
             }
         }
@@ -324,6 +327,9 @@ def UserDashboardView(request):
             'stats': {
                 'total_adventures': 0,
                 'pending_bookings': 0,
+                'completed_adventures': 0,
+                'total_spent': 0,
+                'last_adventure_date': None,
                 'pending_pre_registrations': 0,
             }
         }